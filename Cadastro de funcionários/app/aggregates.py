@@ -0,0 +1,480 @@
+# app/aggregates.py
+import sys
+from contextlib import contextmanager
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+
+from sqlalchemy import and_, column, func, select, table, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.database import backend
+from app.helpers import CENT, to_money
+from app.models import Employee
+from app.refdata import reference_data
+
+# --- Agregados de RH (quadro e folha por departamento/cargo) ---
+# O painel (/dashboard) lê uma tabela-resumo em vez de fazer GROUP BY em
+# 'employees' a cada acesso. Há uma linha por departamento, uma por cargo e
+# uma com o total ('all'); a chave 0 representa "sem departamento/cargo".
+# Folha e mediana ficam em centavos (inteiros): somas e subtrações a cada
+# gravação são exatas, sem o resíduo que um REAL acumularia.
+# Triggers no banco mantêm contagem e soma em dia em qualquer gravação
+# (formulários, API em lote, importação). Na importação o trigger de INSERT
+# é pausado e as linhas novas entram de uma vez no fim (ver deferred_aggregates);
+# no PostgreSQL os triggers funcionam de outro jeito (seção PostgreSQL abaixo).
+# Linhas com exclusão lógica (deleted_at) já saem do painel na exclusão;
+# apagá-las depois (tarefa 'purge_deleted') não conta de novo.
+# A mediana não dá para atualizar incrementalmente: cada linha guarda em
+# 'changes' quantas alterações já sofreu e em 'median_at' em qual delas a
+# mediana foi calculada; só as desatualizadas são recalculadas, pelo índice,
+# em segundo plano (JobRunner, a cada AGGREGATES_REFRESH_SECONDS, e a tarefa
+# 'rebuild_aggregates'). A leitura do painel só lê: a mediana pode estar
+# até esse intervalo atrasada; quadro e folha, nunca.
+# Recalcular tudo do zero: python -m app.aggregates rebuild
+
+STATS_TABLE = "employee_stats"
+STATS_PAUSE_TABLE = "employee_stats_pause"
+
+DIMENSIONS = {
+    # dimensão -> coluna de 'employees' usada como chave
+    "department": "department_id",
+    "position": "position_id",
+    "all": None,
+}
+
+def _key(prefix: str, dimension: str) -> str:
+    """Expressão SQL da chave da dimensão para a linha 'new'/'old' do trigger"""
+    source = DIMENSIONS[dimension]
+    return f"coalesce({prefix}.{source}, 0)" if source else "0"
+
+def _cents(salary: str) -> str:
+    """Salário (REAL no SQLite, NUMERIC no PostgreSQL) em centavos inteiros; vazio conta como 0"""
+    return f"CAST(round(coalesce({salary}, 0) * 100) AS BIGINT)"
+
+def _increment(prefix: str) -> str:
+    rows = ",\n            ".join(
+        f"('{dimension}', {_key(prefix, dimension)}, 1, {_cents(prefix + '.salary')}, 1)"
+        for dimension in DIMENSIONS
+    )
+    return f"""
+        INSERT INTO {STATS_TABLE}(dimension, key, headcount, payroll_cents, changes)
+        VALUES {rows}
+        ON CONFLICT(dimension, key) DO UPDATE SET
+            headcount = headcount + 1,
+            payroll_cents = payroll_cents + excluded.payroll_cents,
+            changes = changes + 1;
+    """
+
+def _decrement(prefix: str) -> str:
+    match = " OR ".join(
+        f"(dimension = '{dimension}' AND key = {_key(prefix, dimension)})" for dimension in DIMENSIONS
+    )
+    return f"""
+        UPDATE {STATS_TABLE} SET
+            headcount = headcount - 1,
+            payroll_cents = payroll_cents - {_cents(prefix + '.salary')},
+            changes = changes + 1
+        WHERE {match};
+        DELETE FROM {STATS_TABLE} WHERE headcount <= 0;
+    """
+
+STATS_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+        dimension TEXT NOT NULL,
+        key INTEGER NOT NULL,
+        headcount INTEGER NOT NULL DEFAULT 0,
+        payroll_cents INTEGER NOT NULL DEFAULT 0,
+        changes INTEGER NOT NULL DEFAULT 0,
+        median_cents INTEGER,
+        median_at INTEGER,
+        PRIMARY KEY (dimension, key)
+    ) WITHOUT ROWID
+    """,
+    # Só tem linha durante uma importação em lote (dentro da própria transação)
+    f"CREATE TABLE IF NOT EXISTS {STATS_PAUSE_TABLE} (id INTEGER PRIMARY KEY)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employee_stats_ai AFTER INSERT ON employees
+    WHEN new.deleted_at IS NULL AND NOT EXISTS (SELECT 1 FROM {STATS_PAUSE_TABLE}) BEGIN
+        {_increment("new")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employee_stats_ad AFTER DELETE ON employees
+    WHEN old.deleted_at IS NULL BEGIN
+        {_decrement("old")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employee_stats_au AFTER UPDATE OF salary, department_id, position_id ON employees
+    WHEN old.deleted_at IS NULL AND new.deleted_at IS NULL BEGIN
+        {_decrement("old")}
+        {_increment("new")}
+    END
+    """,
+    # Exclusão lógica e restauração
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employee_stats_sd AFTER UPDATE OF deleted_at ON employees
+    WHEN old.deleted_at IS NULL AND new.deleted_at IS NOT NULL BEGIN
+        {_decrement("old")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employee_stats_rs AFTER UPDATE OF deleted_at ON employees
+    WHEN old.deleted_at IS NOT NULL AND new.deleted_at IS NULL BEGIN
+        {_increment("new")}
+    END
+    """,
+]
+
+# Mediana: percorre só o trecho do índice do departamento/cargo, já ordenado por salário
+SALARY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_employees_department_salary ON employees (department_id, salary)",
+    "CREATE INDEX IF NOT EXISTS ix_employees_position_salary ON employees (position_id, salary)",
+    "CREATE INDEX IF NOT EXISTS ix_employees_salary ON employees (salary)",
+]
+
+STATS_TRIGGERS = ("employee_stats_ai", "employee_stats_ad", "employee_stats_au", "employee_stats_sd", "employee_stats_rs")
+
+# --- PostgreSQL ---
+# A mesma tabela-resumo, mas os triggers não a alteram direto: no
+# PostgreSQL cada UPDATE de uma linha cria uma versão nova dela, e a linha
+# 'all' mudaria a cada gravação, com o lock preso até o commit (as escritas
+# concorrentes fariam fila nela, e um lote de 5000 alterações numa transação
+# percorreria 5000 versões). Os triggers só acrescentam diferenças em
+# STATS_DELTA_TABLE; o recálculo periódico soma e apaga as pendentes num
+# statement só (fold_stats_deltas), e a leitura do painel soma as que
+# ainda estiverem lá, sem gravar nada. INSERT e DELETE usam triggers por
+# statement, com todas as linhas numa tabela de transição (importação,
+# limpeza: um GROUP BY por statement, sem pausa nem deferred_aggregates);
+# o UPDATE, que chega uma linha por statement, usa trigger por linha.
+
+STATS_DELTA_TABLE = "employee_stats_delta"
+
+def _pg_group_delta(source: str, sign: int) -> str:
+    """Diferenças das linhas ativas de 'source' (tabela de transição), por dimensão"""
+    selects = []
+    for dimension, column_name in DIMENSIONS.items():
+        key = f"coalesce({column_name}, 0)" if column_name else "0"
+        group = "GROUP BY 2" if column_name else "HAVING count(*) > 0"
+        selects.append(
+            f"SELECT '{dimension}', {key}, {sign} * count(*), {sign} * coalesce(sum({_cents('salary')}), 0) "
+            f"FROM {source} WHERE deleted_at IS NULL {group}"
+        )
+    union = "\n            UNION ALL ".join(selects)
+    return f"""
+        INSERT INTO {STATS_DELTA_TABLE}(dimension, key, headcount, payroll_cents)
+            {union};
+    """
+
+def _pg_row_delta(prefix: str, sign: int) -> str:
+    """Diferenças de uma linha ('old'/'new') do trigger por linha"""
+    rows = ",\n                ".join(
+        f"('{dimension}', {_key(prefix, dimension)}, {sign}, {sign} * {_cents(prefix + '.salary')})"
+        for dimension in DIMENSIONS
+    )
+    return f"""
+            INSERT INTO {STATS_DELTA_TABLE}(dimension, key, headcount, payroll_cents) VALUES
+                {rows};
+    """
+
+PG_STATS_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+        dimension TEXT NOT NULL,
+        key INTEGER NOT NULL,
+        headcount INTEGER NOT NULL DEFAULT 0,
+        payroll_cents BIGINT NOT NULL DEFAULT 0,
+        changes INTEGER NOT NULL DEFAULT 0,
+        median_cents BIGINT,
+        median_at INTEGER,
+        PRIMARY KEY (dimension, key)
+    )
+    """,
+    # Só INSERTs (sem chave, sem conflito) até a próxima leitura do painel
+    f"""
+    CREATE TABLE IF NOT EXISTS {STATS_DELTA_TABLE} (
+        dimension TEXT NOT NULL,
+        key INTEGER NOT NULL,
+        headcount INTEGER NOT NULL,
+        payroll_cents BIGINT NOT NULL
+    )
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION employee_stats_statement() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            {_pg_group_delta("new_rows", 1)}
+        ELSE
+            {_pg_group_delta("old_rows", -1)}
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION employee_stats_row() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF old.deleted_at IS NULL THEN
+            {_pg_row_delta("old", -1)}
+        END IF;
+        IF new.deleted_at IS NULL THEN
+            {_pg_row_delta("new", 1)}
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    *(f"DROP TRIGGER IF EXISTS {name} ON employees" for name in STATS_TRIGGERS),
+    """
+    CREATE TRIGGER employee_stats_ai AFTER INSERT ON employees
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION employee_stats_statement()
+    """,
+    """
+    CREATE TRIGGER employee_stats_ad AFTER DELETE ON employees
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION employee_stats_statement()
+    """,
+    # Inclui exclusão lógica e restauração (deleted_at)
+    """
+    CREATE TRIGGER employee_stats_au AFTER UPDATE OF salary, department_id, position_id, deleted_at ON employees
+    FOR EACH ROW WHEN (
+        (old.salary, old.department_id, old.position_id, old.deleted_at IS NULL)
+        IS DISTINCT FROM (new.salary, new.department_id, new.position_id, new.deleted_at IS NULL)
+    )
+    EXECUTE FUNCTION employee_stats_row()
+    """,
+]
+
+# Soma as diferenças pendentes na tabela-resumo. O DELETE ... RETURNING trava
+# as linhas que leva: dois recálculos ao mesmo tempo não somam a mesma diferença
+PG_FOLD_DELTAS = [
+    f"""
+    WITH moved AS (DELETE FROM {STATS_DELTA_TABLE} RETURNING dimension, key, headcount, payroll_cents)
+    INSERT INTO {STATS_TABLE}(dimension, key, headcount, payroll_cents, changes)
+    SELECT dimension, key, sum(headcount), sum(payroll_cents), count(*) FROM moved GROUP BY dimension, key
+    ON CONFLICT(dimension, key) DO UPDATE SET
+        headcount = {STATS_TABLE}.headcount + excluded.headcount,
+        payroll_cents = {STATS_TABLE}.payroll_cents + excluded.payroll_cents,
+        changes = {STATS_TABLE}.changes + excluded.changes
+    """,
+    f"DELETE FROM {STATS_TABLE} WHERE headcount <= 0",
+]
+
+def fold_stats_deltas(db: Session):
+    """Leva as diferenças dos triggers do PostgreSQL para a tabela-resumo (no SQLite, nada a fazer)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for statement in PG_FOLD_DELTAS:
+        db.execute(text(statement))
+
+def _group_insert(where: str, on_conflict: str) -> list[str]:
+    """INSERT ... SELECT ... GROUP BY para cada dimensão"""
+    statements = []
+    for dimension, source in DIMENSIONS.items():
+        key = f"coalesce({source}, 0)" if source else "0"
+        group = "GROUP BY 2" if source else "HAVING count(*) > 0"
+        statements.append(
+            f"INSERT INTO {STATS_TABLE}(dimension, key, headcount, payroll_cents, changes) "
+            f"SELECT '{dimension}', {key}, count(*), coalesce(sum({_cents('salary')}), 0), count(*) FROM employees "
+            f"WHERE deleted_at IS NULL AND ({where}) {group} {on_conflict}"
+        )
+    return statements
+
+def rebuild_aggregates(conn: Connection):
+    """Recalcula a tabela-resumo inteira a partir de 'employees'"""
+    conn.exec_driver_sql(f"DELETE FROM {STATS_TABLE}")
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(f"DELETE FROM {STATS_DELTA_TABLE}")
+    for statement in _group_insert("true", ""):
+        conn.exec_driver_sql(statement)
+
+def create_aggregates(conn: Connection):
+    """Cria a tabela-resumo, os triggers e os índices e faz a carga inicial (migração 3)"""
+    if conn.dialect.name == "postgresql":
+        ddl = PG_STATS_DDL
+    elif conn.dialect.name == "sqlite":
+        ddl = STATS_DDL
+    else:
+        return
+    for statement in ddl + SALARY_INDEXES:
+        conn.exec_driver_sql(statement)
+    rebuild_aggregates(conn)
+
+def recreate_aggregates(conn: Connection):
+    """
+    Apaga e recria a tabela-resumo e os triggers e recalcula (o IF NOT EXISTS
+    manteria os antigos). Usado pelas migrações que mudam triggers ou colunas.
+    """
+    if conn.dialect.name == "sqlite":
+        for name in STATS_TRIGGERS:
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    elif conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {STATS_DELTA_TABLE}")
+    else:
+        return
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {STATS_TABLE}")
+    create_aggregates(conn)
+
+@contextmanager
+def deferred_aggregates(db: Session):
+    """
+    Pausa o trigger de INSERT durante uma importação em lote e soma as linhas
+    novas com um INSERT ... SELECT ... GROUP BY por dimensão no final.
+    Mesmas regras de deferred_search_index: só INSERTs, na mesma transação.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        yield
+        return
+    start_id = db.scalar(
+        select(func.coalesce(func.max(Employee.id), 0)).execution_options(include_deleted=True)
+    )
+    db.execute(text(f"INSERT INTO {STATS_PAUSE_TABLE} DEFAULT VALUES"))
+    yield
+    on_conflict = (
+        "ON CONFLICT(dimension, key) DO UPDATE SET "
+        "headcount = headcount + excluded.headcount, "
+        "payroll_cents = payroll_cents + excluded.payroll_cents, "
+        "changes = changes + excluded.changes"
+    )
+    for statement in _group_insert("id > :start_id", on_conflict):
+        db.execute(text(statement), {"start_id": start_id})
+    db.execute(text(f"DELETE FROM {STATS_PAUSE_TABLE}"))
+
+# --- Leitura (painel) ---
+
+_stats = table(
+    STATS_TABLE,
+    column("dimension"), column("key"), column("headcount"), column("payroll_cents"),
+    column("changes"), column("median_cents"), column("median_at"),
+)
+
+_deltas = table(
+    STATS_DELTA_TABLE,
+    column("dimension"), column("key"), column("headcount"), column("payroll_cents"),
+)
+
+class GroupStats(NamedTuple):
+    key: int
+    label: str
+    headcount: int
+    payroll: Decimal
+    average_salary: Decimal
+    median_salary: Decimal | None  # None = ainda não calculada (grupo novo)
+
+def _money(cents: int | None) -> Decimal:
+    """Centavos da tabela-resumo -> Decimal com 2 casas"""
+    return Decimal(cents or 0).scaleb(-2)
+
+def _median(db: Session, dimension: str, key: int, headcount: int) -> int:
+    """Mediana em centavos, pelo índice (department_id|position_id, salary); salário vazio conta como 0"""
+    query = select(Employee.salary).order_by(Employee.salary)
+    source = DIMENSIONS[dimension]
+    if source:
+        attribute = getattr(Employee, source)
+        query = query.where(attribute == key if key else attribute.is_(None))
+    count = 1 if headcount % 2 else 2
+    values = [to_money(value or 0) for value in db.scalars(query.offset((headcount - 1) // 2).limit(count))]
+    if not values:
+        return 0
+    # Média dos dois do meio, arredondada para o centavo (meio para cima)
+    return int((sum(values) / len(values) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def refresh_medians(db: Session) -> int:
+    """
+    Recalcula só as medianas desatualizadas; retorna quantas foram recalculadas.
+    Chamado pelo JobRunner e pela tarefa 'rebuild_aggregates' (quem chama faz o commit).
+    """
+    fold_stats_deltas(db)
+    stale = db.execute(
+        select(_stats.c.dimension, _stats.c.key, _stats.c.headcount, _stats.c.changes)
+        .where(_stats.c.median_at.is_distinct_from(_stats.c.changes))
+    ).all()
+    for dimension, key, headcount, changes in stale:
+        db.execute(
+            update(_stats)
+            .where(_stats.c.dimension == dimension, _stats.c.key == key)
+            .values(median_cents=_median(db, dimension, key, headcount), median_at=changes)
+        )
+    return len(stale)
+
+def _dashboard_query():
+    """Linhas da tabela-resumo; no PostgreSQL, somadas às diferenças ainda não incorporadas"""
+    if backend.name != "postgresql":
+        return select(_stats.c.dimension, _stats.c.key, _stats.c.headcount, _stats.c.payroll_cents, _stats.c.median_cents)
+    pending = (
+        select(
+            _deltas.c.dimension, _deltas.c.key,
+            func.sum(_deltas.c.headcount).label("headcount"),
+            func.sum(_deltas.c.payroll_cents).label("payroll_cents"),
+        )
+        .group_by(_deltas.c.dimension, _deltas.c.key)
+        .subquery()
+    )
+    joined = _stats.outerjoin(
+        pending, and_(_stats.c.dimension == pending.c.dimension, _stats.c.key == pending.c.key), full=True
+    )
+    return select(
+        func.coalesce(_stats.c.dimension, pending.c.dimension),
+        func.coalesce(_stats.c.key, pending.c.key),
+        func.coalesce(_stats.c.headcount, 0) + func.coalesce(pending.c.headcount, 0),
+        func.coalesce(_stats.c.payroll_cents, 0) + func.coalesce(pending.c.payroll_cents, 0),
+        _stats.c.median_cents,
+    ).select_from(joined)
+
+async def load_dashboard(db) -> dict:
+    """
+    Lê o painel: totais gerais e uma lista por departamento e por cargo.
+    Custo proporcional à quantidade de departamentos/cargos, não de funcionários.
+    Só lê (as medianas são recalculadas em segundo plano, ver refresh_medians).
+    """
+    refs = await reference_data.get(db)
+    labels = {
+        "department": lambda key: refs.department_names.get(key, f"Departamento {key}") if key else "Sem departamento",
+        "position": lambda key: refs.position_titles.get(key, f"Cargo {key}") if key else "Sem cargo",
+        "all": lambda key: "Total",
+    }
+    groups = {dimension: [] for dimension in DIMENSIONS}
+    rows = await db.execute(_dashboard_query())
+    for dimension, key, headcount, payroll_cents, median_cents in rows:
+        if dimension not in groups or headcount <= 0:
+            continue
+        payroll = _money(payroll_cents)
+        groups[dimension].append(GroupStats(
+            key=key,
+            label=labels[dimension](key),
+            headcount=headcount,
+            payroll=payroll,
+            average_salary=(payroll / headcount).quantize(CENT, rounding=ROUND_HALF_UP),
+            median_salary=_money(median_cents) if median_cents is not None else None,
+        ))
+
+    zero = _money(0)
+    total = groups["all"][0] if groups["all"] else GroupStats(0, "Total", 0, zero, zero, zero)
+    return {
+        "total": total,
+        "departments": sorted(groups["department"], key=lambda g: g.label.casefold()),
+        "positions": sorted(groups["position"], key=lambda g: g.label.casefold()),
+    }
+
+# --- Linha de comando ---
+
+def main(argv: list[str]) -> int:
+    from app.database import engine
+
+    command = argv[0] if argv else "rebuild"
+    if command != "rebuild":
+        print("Uso: python -m app.aggregates rebuild")
+        return 2
+    with engine.begin() as conn:
+        rebuild_aggregates(conn)
+    with Session(engine) as db:
+        count = refresh_medians(db)
+        db.commit()
+    print(f"Agregados recalculados ({count} grupos).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,502 @@
+# app/audit.py
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, delete, event, func, insert, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import config
+from app.database import create_db_engine, engine
+from app.helpers import to_money
+from app.models import Department, Employee, Position, Project, employee_project_association as membership
+
+logger = logging.getLogger(__name__)
+
+# --- Histórico de alterações (auditoria) ---
+# Eventos da Session registram, campo a campo, o que mudou em funcionários,
+# departamentos, cargos e membros de projetos, e quem mudou:
+#   - unidade de trabalho do ORM (db.add, db.delete, atributos): after_flush,
+#     pelo histórico dos atributos;
+#   - statements em massa (API em lote, importação, membros de projetos):
+#     do_orm_execute, lendo as linhas afetadas antes, na mesma transação.
+# As entradas ficam na sessão até o commit (rollback descarta) e então vão
+# para uma fila. Uma thread por worker grava a fila em lotes na tabela
+# 'audit_log', só com INSERTs (o request não espera por isso). A tabela
+# pode ficar em outro banco (AUDIT_DATABASE_URL) e é limpa pelo prazo de
+# retenção: python -m app.audit compact
+
+_metadata = MetaData()
+
+# Append-only: um índice só, o da consulta do histórico. A limpeza usa a
+# ordem da chave primária (ids crescem com o tempo), sem índice em 'at'.
+audit_log = Table(
+    "audit_log",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("at", DateTime, nullable=False),          # UTC
+    Column("actor", String(50), nullable=True),      # usuário logado (None = script/CLI)
+    Column("entity", String(20), nullable=False),    # employee, department, position
+    Column("entity_id", Integer, nullable=True),
+    Column("action", String(20), nullable=False),    # create, update, delete, project_add, project_remove
+    Column("changes", Text, nullable=False),         # JSON: {campo: [antes, depois]}
+    Index("ix_audit_log_entity", "entity", "entity_id", "id"),
+)
+
+audit_engine: Engine = create_db_engine(config.AUDIT_DATABASE_URL) if config.AUDIT_DATABASE_URL else engine
+
+def create_audit_log():
+    """Cria a tabela no banco da auditoria (chamado pelo setup_schema)"""
+    with audit_engine.begin() as conn:
+        audit_log.create(conn, checkfirst=True)
+
+# --- Captura ---
+
+# Modelo -> (nome no log, campos registrados)
+AUDITED = {
+    Employee: ("employee", ("name", "email", "phone", "salary", "department_id", "position_id")),
+    Department: ("department", ("name",)),
+    Position: ("position", ("title",)),
+}
+_AUDITED_TABLES = {model.__table__.name: (model, entity, fields) for model, (entity, fields) in AUDITED.items()}
+
+_PENDING_KEY = "audit_pending"
+_CHUNK = 500  # ids por IN (...) nas leituras do "antes"
+
+_actor: ContextVar[str | None] = ContextVar("audit_actor", default=None)
+
+def set_actor(username: str | None):
+    """Usuário responsável pelas alterações do request atual (app/auth.py)"""
+    _actor.set(username)
+
+class AuditEntry(NamedTuple):
+    at: datetime
+    actor: str | None
+    entity: str
+    entity_id: int | None
+    action: str
+    changes: dict
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _record(session: Session, entity: str, entity_id: int | None, action: str, changes: dict):
+    if "salary" in changes:
+        # Mesmo formato venha do formulário, da API ou da planilha: '10' -> '10.00'
+        changes["salary"] = [to_money(value) for value in changes["salary"]]
+    session.info.setdefault(_PENDING_KEY, []).append(
+        AuditEntry(_now(), _actor.get(), entity, entity_id, action, changes)
+    )
+
+def _snapshot(values, fields, created: bool) -> dict:
+    """{campo: [None, valor]} na criação, {campo: [valor, None]} na exclusão"""
+    changes = {}
+    for field in fields:
+        value = values.get(field)
+        if value is not None:
+            changes[field] = [None, value] if created else [value, None]
+    return changes
+
+def _diff(old, new: dict, fields) -> dict:
+    """Só os campos que mudaram de fato: {campo: [antes, depois]}"""
+    return {
+        field: [old[field], new[field]]
+        for field in fields
+        if field in new and old[field] != new[field]
+    }
+
+def _soft_delete_action(old, new) -> str | None:
+    """Mudança em 'deleted_at' (app/softdelete.py): vira 'delete' ou 'restore' no log"""
+    if old is None and new is not None:
+        return "delete"
+    if old is not None and new is None:
+        return "restore"
+    return None
+
+def _record_memberships(session: Session, pairs, action: str):
+    for employee_id, project_id in pairs:
+        _record(session, "employee", employee_id, action, {"project_id": project_id})
+
+@event.listens_for(Session, "after_flush")
+def _capture_flush(session: Session, flush_context):
+    """Alterações feitas pela unidade de trabalho do ORM"""
+    if not config.AUDIT_ENABLED:
+        return
+    for obj in session.new:
+        spec = AUDITED.get(type(obj))
+        if spec is not None:
+            values = inspect(obj).dict
+            _record(session, spec[0], values.get("id"), "create", _snapshot(values, spec[1], created=True))
+
+    memberships = {}  # (employee_id, project_id) -> ação; os dois lados da relação mudam juntos
+    for obj in session.dirty:
+        state = inspect(obj)
+        if isinstance(obj, Employee):
+            history = state.attrs.projects.history
+            for project in history.added:
+                memberships[(obj.id, project.id)] = "project_add"
+            for project in history.deleted:
+                memberships[(obj.id, project.id)] = "project_remove"
+        elif isinstance(obj, Project):
+            history = state.attrs.employees.history
+            for employee in history.added:
+                memberships[(employee.id, obj.id)] = "project_add"
+            for employee in history.deleted:
+                memberships[(employee.id, obj.id)] = "project_remove"
+
+        spec = AUDITED.get(type(obj))
+        if spec is None:
+            continue
+        history = state.attrs.deleted_at.history
+        if history.added:
+            action = _soft_delete_action(history.deleted[0] if history.deleted else None, history.added[0])
+            if action is not None:
+                _record(session, spec[0], state.dict.get("id"), action, _snapshot(state.dict, spec[1], created=action == "restore"))
+                continue
+        changes = {}
+        for field in spec[1]:
+            history = state.attrs[field].history
+            if history.added:
+                old = history.deleted[0] if history.deleted else None
+                if old != history.added[0]:
+                    changes[field] = [old, history.added[0]]
+        if changes:
+            _record(session, spec[0], state.dict.get("id"), "update", changes)
+
+    for (employee_id, project_id), action in memberships.items():
+        _record(session, "employee", employee_id, action, {"project_id": project_id})
+
+    for obj in session.deleted:
+        spec = AUDITED.get(type(obj))
+        if spec is not None:
+            state = inspect(obj)
+            _record(session, spec[0], state.identity[0], "delete", _snapshot(state.dict, spec[1], created=False))
+
+@event.listens_for(Session, "do_orm_execute")
+def _capture_statement(orm_state):
+    """INSERT/UPDATE/DELETE em massa (não passam pelo after_flush)"""
+    if not config.AUDIT_ENABLED or not (orm_state.is_insert or orm_state.is_update or orm_state.is_delete):
+        return None
+    statement = orm_state.statement
+    table_name = getattr(getattr(statement, "table", None), "name", None)
+    if table_name == membership.name:
+        return _capture_membership(orm_state, statement)
+    spec = _AUDITED_TABLES.get(table_name)
+    if spec is None:
+        return None
+    model, entity, fields = spec
+    session = orm_state.session
+    columns = [model.__table__.c[field] for field in fields]
+    params = orm_state.parameters
+    rows = params if isinstance(params, list) else [params] if params else []
+
+    if orm_state.is_delete:
+        query = select(model.__table__.c.id, *columns).where(statement.whereclause)
+        for row in session.execute(query).mappings():
+            _record(session, entity, row["id"], "delete", _snapshot(row, fields, created=False))
+        return None
+
+    if orm_state.is_update:
+        if rows:
+            # UPDATE em massa pela chave primária: [{"id": 1, "name": ...}, ...]
+            # ("b_id" no executemany com conferência de versão de app/batch.py)
+            id_key = "id" if "id" in rows[0] else "b_id"
+            old = {}
+            ids = [row[id_key] for row in rows]
+            for start in range(0, len(ids), _CHUNK):
+                query = select(model.__table__.c.id, *columns).where(model.__table__.c.id.in_(ids[start:start + _CHUNK]))
+                old.update((row["id"], row) for row in session.execute(query).mappings())
+            for row in rows:
+                if row[id_key] in old:
+                    changes = _diff(old[row[id_key]], row, fields)
+                    if changes:
+                        _record(session, entity, row[id_key], "update", changes)
+        else:
+            # UPDATE ... WHERE com .values(): valores novos pelos parâmetros compilados
+            compiled = statement.compile().params
+            query = select(model.__table__.c.id, *columns).where(statement.whereclause)
+            if "deleted_at" in compiled:
+                # Exclusão lógica / restauração em massa
+                action = "delete" if compiled["deleted_at"] is not None else "restore"
+                for row in session.execute(query).mappings():
+                    _record(session, entity, row["id"], action, _snapshot(row, fields, created=action == "restore"))
+                return None
+            new = {key: value for key, value in compiled.items() if key in fields}
+            for row in session.execute(query).mappings():
+                changes = _diff(row, new, fields)
+                if changes:
+                    _record(session, entity, row["id"], "update", changes)
+        return None
+
+    # INSERT: os ids só existem depois de executar; sem RETURNING, o hook o pede
+    # (a importação em lote ignora o resultado)
+    if statement.select is not None:
+        # INSERT ... SELECT da tabela temporária do COPY (app/backends.py): ids e valores pelo RETURNING
+        frozen = orm_state.invoke_statement(
+            statement=statement.returning(model.__table__.c.id, *columns)
+        ).freeze()
+        for row in frozen().mappings():
+            _record(session, entity, row["id"], "create", _snapshot(row, fields, created=True))
+        return frozen()
+    if not rows:
+        rows = [{key: value for key, value in statement.compile().params.items() if key in fields}]
+    if not statement.returning_column_descriptions:
+        statement = statement.returning(model.__table__.c.id, sort_by_parameter_order=True)
+    frozen = orm_state.invoke_statement(statement=statement).freeze()
+    result = frozen()
+    id_position = list(result.keys()).index("id")
+    for values, inserted in zip(rows, result.all()):
+        _record(session, entity, inserted[id_position], "create", _snapshot(values, fields, created=True))
+    return frozen()
+
+def _capture_membership(orm_state, statement):
+    session = orm_state.session
+    if orm_state.is_delete:
+        query = select(membership.c.employee_id, membership.c.project_id).where(statement.whereclause)
+        _record_memberships(session, session.execute(query).all(), "project_remove")
+    elif orm_state.is_insert:
+        if statement.select is not None:
+            # INSERT ... SELECT (app/memberships.py): as linhas que o SELECT vai inserir
+            rows = session.execute(statement.select).mappings()
+            _record_memberships(session, ((row["employee_id"], row["project_id"]) for row in rows), "project_add")
+        else:
+            params = orm_state.parameters
+            rows = params if isinstance(params, list) else [params]
+            _record_memberships(session, ((row["employee_id"], row["project_id"]) for row in rows), "project_add")
+    return None
+
+@event.listens_for(Session, "after_commit")
+def _enqueue(session: Session):
+    entries = session.info.pop(_PENDING_KEY, None)
+    if entries:
+        audit_writer.put(entries)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard(session: Session, transaction):
+    # Fim da transação sem commit (rollback, close): nada foi gravado
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+# --- Gravação em lote ---
+
+_STOP = object()
+
+class AuditWriter:
+    """
+    Fila + thread que grava as entradas em lotes (um INSERT executemany por
+    lote). A thread nasce na primeira entrada de cada processo, então também
+    funciona nos workers criados por fork (serve.py).
+    """
+
+    def __init__(self, batch_size: int = config.AUDIT_BATCH_SIZE, flush_interval_ms: int = config.AUDIT_FLUSH_INTERVAL_MS):
+        self.batch_size = batch_size
+        self.interval = flush_interval_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._next_compact = None
+        self._written = 0
+        self._dropped = 0
+        self._batches = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()  # a fila herdada no fork é do processo pai
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def put(self, entries: list[AuditEntry]):
+        self._ensure_started()
+        self._queue.put(entries)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Espera a fila atual ser gravada (ex: antes de ler o histórico)"""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 10.0):
+        """Grava o que ainda está na fila e encerra a thread (desligamento do worker)"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self._written,
+            "batches": self._batches,
+            "dropped": self._dropped,
+        }
+
+    def _run(self):
+        interval = config.AUDIT_COMPACT_INTERVAL_HOURS * 3600
+        self._next_compact = time.monotonic() + interval if interval > 0 else None
+        while True:
+            wait = None if self._next_compact is None else max(0.0, self._next_compact - time.monotonic())
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                self._compact(interval)
+                continue
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.extend(item)
+                if stop or waiters or len(batch) >= self.batch_size:
+                    # Desligando ou alguém esperando: grava o que já tem, sem esperar o intervalo
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    continue
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            for start in range(0, len(batch), self.batch_size):
+                self._write(batch[start:start + self.batch_size])
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write(self, batch: list[AuditEntry]):
+        rows = [
+            {
+                "at": entry.at,
+                "actor": entry.actor,
+                "entity": entry.entity,
+                "entity_id": entry.entity_id,
+                "action": entry.action,
+                "changes": json.dumps(entry.changes, default=str, ensure_ascii=False, separators=(",", ":")),
+            }
+            for entry in batch
+        ]
+        for attempt in range(3):
+            try:
+                with audit_engine.begin() as conn:
+                    conn.execute(insert(audit_log), rows)
+                self._written += len(rows)
+                self._batches += 1
+                return
+            except Exception:
+                logger.exception("Falha ao gravar %d entradas de auditoria (tentativa %d)", len(rows), attempt + 1)
+                time.sleep(0.5 * 2 ** attempt)
+        self._dropped += len(rows)
+        logger.error("%d entradas de auditoria perdidas", len(rows))
+
+    def _compact(self, interval: float):
+        try:
+            removed = compact()
+            if removed:
+                logger.info("Auditoria: %d entradas fora do prazo de retenção apagadas", removed)
+        except Exception:
+            logger.exception("Falha na limpeza do log de auditoria")
+        self._next_compact = time.monotonic() + interval
+
+audit_writer = AuditWriter()
+
+# --- Leitura ---
+
+class HistoryPage(NamedTuple):
+    entries: list[dict]
+    next_before: int | None  # cursor da próxima página (entradas mais antigas)
+
+def _decode(row) -> dict:
+    changes = json.loads(row.changes)
+    if "salary" in changes:
+        changes["salary"] = [to_money(value) for value in changes["salary"]]
+    return {
+        "id": row.id,
+        "at": row.at,
+        "actor": row.actor,
+        "action": row.action,
+        "changes": changes,
+    }
+
+def load_history(
+    entity: str,
+    entity_id: int,
+    before: int | None = None,
+    limit: int = config.AUDIT_HISTORY_PAGE_SIZE,
+) -> HistoryPage:
+    """Entradas de uma entidade, da mais recente para a mais antiga (keyset pelo id)"""
+    # As alterações feitas neste worker que ainda estão na fila
+    audit_writer.flush(timeout=1.0)
+    query = select(audit_log).where(audit_log.c.entity == entity, audit_log.c.entity_id == entity_id)
+    if before is not None:
+        query = query.where(audit_log.c.id < before)
+    query = query.order_by(audit_log.c.id.desc()).limit(limit + 1)
+    with audit_engine.connect() as conn:
+        rows = conn.execute(query).all()
+    entries = [_decode(row) for row in rows[:limit]]
+    next_before = entries[-1]["id"] if len(rows) > limit else None
+    return HistoryPage(entries, next_before)
+
+# --- Retenção ---
+
+def compact(retention_days: int = config.AUDIT_RETENTION_DAYS, chunk_size: int = config.AUDIT_COMPACT_CHUNK_ROWS) -> int:
+    """Apaga as entradas mais antigas que o prazo, em transações curtas; retorna quantas"""
+    if retention_days <= 0:
+        return 0
+    cutoff = _now() - timedelta(days=retention_days)
+    removed = 0
+    while True:
+        with audit_engine.begin() as conn:
+            # As mais antigas estão no início da chave primária: a varredura para logo
+            ids = conn.scalars(
+                select(audit_log.c.id).where(audit_log.c.at < cutoff).order_by(audit_log.c.id).limit(chunk_size)
+            ).all()
+            if ids:
+                conn.execute(delete(audit_log).where(audit_log.c.id.in_(ids)))
+        removed += len(ids)
+        if len(ids) < chunk_size:
+            return removed
+
+# --- Linha de comando ---
+
+def main(argv: list[str]) -> int:
+    command = argv[0] if argv else "stats"
+    if command == "compact":
+        days = int(argv[1]) if len(argv) > 1 else config.AUDIT_RETENTION_DAYS
+        create_audit_log()
+        removed = compact(days)
+        print(f"{removed} entradas com mais de {days} dias apagadas.")
+        return 0
+    if command == "stats":
+        create_audit_log()
+        with audit_engine.connect() as conn:
+            count, oldest, newest = conn.execute(select(func.count(), func.min(audit_log.c.at), func.max(audit_log.c.at))).one()
+        print(f"Banco: {audit_engine.url.render_as_string(hide_password=True)}")
+        print(f"Entradas: {count} (de {oldest or '-'} até {newest or '-'}, UTC)")
+        print(f"Retenção: {config.AUDIT_RETENTION_DAYS or 'sem limite'} dias")
+        return 0
+    print("Uso: python -m app.audit [stats|compact [dias]]")
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
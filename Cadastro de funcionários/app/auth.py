@@ -1,12 +1,18 @@
 # app/auth.py
-from fastapi import Depends, HTTPException, status, Request # <<< Request FOI ADICIONADO
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from fastapi import HTTPException, status, Request # <<< Request FOI ADICIONADO
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, event
 from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
+from typing import NamedTuple
+import threading
+import time
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from app import models 
-from app.database import get_db
+from app import models, config
+from app.database import SessionLocal
+from app.cachesync import cache_sync
+from app.audit import set_actor
 
 # --- Configuração de Segurança ---
 
@@ -40,31 +46,78 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# --- <<< NOVA DEPENDÊNCIA (O "OUTRO JEITO") >>> ---
+# --- Cache de Tokens (JWT decodificado + usuário) ---
 
-def get_current_user_from_cookie(
-    request: Request, # Precisamos do 'request' para ler os cookies
-    db: Session = Depends(get_db)
-) -> models.User:
+class CachedUser(NamedTuple):
+    """'Foto' leve do usuário logado (o suficiente para as rotas e templates)"""
+    id: int
+    username: str
+
+class TokenCache:
     """
-    Decodifica o token do cookie, valida o usuário e retorna o objeto User.
-    Esta é a nova dependência que "protege" as rotas.
+    Cache LRU com TTL: token do cookie -> (claims, CachedUser).
+    Cada entrada expira no máximo junto com o 'exp' do próprio token.
     """
-    
-    # 1. Tenta pegar o token do cookie
-    token = request.cookies.get("access_token")
 
-    # 2. Define a exceção de "Não Logado"
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_301_MOVED_PERMANENTLY,
-        detail="Não autenticado",
-        headers={"Location": "/login"}, # Joga o usuário para /login
-    )
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict, CachedUser]] = OrderedDict()
+        self._lock = threading.Lock()
 
-    if token is None:
-        raise credentials_exception
-    
-    # 3. Limpa o prefixo "Bearer " do token
+    def get(self, token: str) -> tuple[dict, CachedUser] | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, claims, user = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return claims, user
+
+    def set(self, token: str, claims: dict, user: CachedUser):
+        expires_at = time.time() + self.ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        with self._lock:
+            self._entries[token] = (expires_at, claims, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token: str | None):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def invalidate_user(self, user_id: int):
+        """Remove todos os tokens de um usuário (ex: usuário alterado ou excluído)"""
+        with self._lock:
+            for token in [t for t, (_, _, user) in self._entries.items() if user.id == user_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache(maxsize=config.AUTH_CACHE_SIZE, ttl=config.AUTH_CACHE_TTL)
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    token_cache.invalidate_user(target.id)
+    # Nos outros workers o cache inteiro é limpo (na mesma transação da alteração)
+    cache_sync.publish("users", connection)
+
+cache_sync.register("users", token_cache.clear)
+
+# --- <<< NOVA DEPENDÊNCIA (O "OUTRO JEITO") >>> ---
+
+def _load_user_from_token(token: str, credentials_exception: HTTPException) -> tuple[dict, CachedUser]:
+    """Caminho lento (cache miss): valida o cookie, decodifica o JWT e busca o usuário"""
+
+    # Limpa o prefixo "Bearer " do token
     try:
         token_prefix, token_value = token.split(" ")
         if token_prefix.lower() != "bearer":
@@ -72,7 +125,7 @@ def get_current_user_from_cookie(
     except ValueError:
         raise credentials_exception
     
-    # 4. Decodifica o JWT
+    # Decodifica o JWT
     try:
         payload = jwt.decode(token_value, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -81,10 +134,70 @@ def get_current_user_from_cookie(
     except JWTError:
         raise credentials_exception
     
-    # 5. Busca o usuário no banco de dados
-    user = db.scalar(select(models.User).where(models.User.username == username))
-    if user is None:
+    # Busca o usuário no banco de dados
+    with SessionLocal() as db:
+        user = db.scalar(select(models.User).where(models.User.username == username))
+        if user is None:
+            raise credentials_exception
+        return payload, CachedUser(id=user.id, username=user.username)
+
+async def get_current_user_from_cookie(
+    request: Request, # Precisamos do 'request' para ler os cookies
+) -> CachedUser:
+    """
+    Decodifica o token do cookie, valida o usuário e retorna o CachedUser.
+    Esta é a nova dependência que "protege" as rotas.
+    Com o token em cache, o custo é só uma consulta em dicionário.
+    """
+
+    # 1. Já resolvido neste request? (ex: dependência do router + da rota)
+    current_user = getattr(request.state, "current_user", None)
+    if current_user is not None:
+        return current_user
+    
+    # 2. Tenta pegar o token do cookie
+    token = request.cookies.get("access_token")
+
+    # 3. Define a exceção de "Não Logado"
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_301_MOVED_PERMANENTLY,
+        detail="Não autenticado",
+        headers={"Location": "/login"}, # Joga o usuário para /login
+    )
+
+    if token is None:
         raise credentials_exception
     
-    # 6. Sucesso! Retorna o usuário
-    return user
\ No newline at end of file
+    # 4. Procura no cache; se não achar, decodifica e busca no banco (fora do event loop)
+    # 5. Sucesso! Retorna o usuário
+    return await _authenticate(request, token, credentials_exception)
+
+async def _authenticate(request: Request, token: str, credentials_exception: HTTPException) -> CachedUser:
+    """Resolve o token pelo cache (ou pelo banco) e guarda o usuário no request"""
+    cached = token_cache.get(token)
+    if cached is None:
+        cached = await run_in_threadpool(_load_user_from_token, token, credentials_exception)
+        token_cache.set(token, *cached)
+    request.state.current_user = cached[1]
+    set_actor(cached[1].username)  # autor das alterações no histórico (app/audit.py)
+    return cached[1]
+
+async def get_current_user_from_api(request: Request) -> CachedUser:
+    """
+    Dependência da API JSON (/api/v1): aceita o mesmo JWT no cabeçalho
+    'Authorization: Bearer <token>' ou no cookie. Em vez de redirecionar
+    para /login, responde 401.
+    """
+    current_user = getattr(request.state, "current_user", None)
+    if current_user is not None:
+        return current_user
+
+    token = request.headers.get("Authorization") or request.cookies.get("access_token")
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Não autenticado",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if token is None:
+        raise credentials_exception
+    return await _authenticate(request, token, credentials_exception)
@@ -0,0 +1,242 @@
+# app/backends.py
+import io
+
+from sqlalchemy import column, event, func, insert, select, table as table_clause, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql.base import PGDialect
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import config
+
+# --- Backends de banco ---
+# O que muda entre o SQLite e o PostgreSQL (ou um banco compatível com ele)
+# fica aqui, escolhido pela URL (DATABASE_URL, AUDIT_DATABASE_URL...):
+#   - opções do engine: connect_args, classe e tamanho do pool;
+#   - URL do driver assíncrono (DATABASE_ASYNC);
+#   - configuração de cada conexão nova (pragmas do SQLite);
+#   - INSERT ... ON CONFLICT (upsert) do dialeto;
+#   - carga em massa: executemany no SQLite, COPY no PostgreSQL;
+#   - comparação de nomes sem diferenciar maiúsculas.
+# O que não tem equivalente direto (busca textual, triggers do painel) fica
+# no próprio módulo, por conn.dialect.name (app/search.py, app/aggregates.py).
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+    }
+
+def _copy_value(value) -> str:
+    """Campo no formato texto do COPY: \\N é NULL; barra, tab e quebras de linha escapadas"""
+    if value is None:
+        return "\\N"
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t")
+        .replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+def _bind_of(db):
+    """Connection/Engine de uma Session (ou o próprio objeto)"""
+    return db.get_bind() if isinstance(db, Session) else db
+
+class Backend:
+    """Comportamento comum; cada dialeto sobrescreve o que for diferente"""
+    name: str
+    async_driver: str
+
+    def engine_options(self, url: URL) -> dict:
+        return _pool_options()
+
+    def async_url(self, url: URL) -> URL:
+        return url.set(drivername=f"{self.name}+{self.async_driver}")
+
+    def configure(self, engine, profile: str):
+        """Ajustes em cada conexão nova (evento 'connect')"""
+
+    def bulk_insert(self, db, table, rows: list[dict]):
+        """INSERT de muitas linhas: executemany (insertmanyvalues do SQLAlchemy)"""
+        db.execute(insert(table), rows)
+
+    def reset_sequences(self, conn, tables):
+        """Acerta os próximos ids depois de INSERTs com id explícito (ex: benchmarks.datagen)"""
+
+class SQLiteBackend(Backend):
+    name = "sqlite"
+    async_driver = "aiosqlite"
+
+    def engine_options(self, url: URL) -> dict:
+        # As conexões passam de uma thread para outra (threadpool do FastAPI)
+        options = {"connect_args": {"check_same_thread": False}}
+        if url.database in (None, "", ":memory:"):
+            # Banco em memória: cada conexão teria o seu; todas usam a mesma
+            options["poolclass"] = StaticPool
+        else:
+            options.update(_pool_options())
+        return options
+
+    # No modo padrão (rollback journal) cada escrita bloqueia todos os leitores.
+    # Com WAL, leitores e o escritor trabalham ao mesmo tempo, e o busy_timeout
+    # faz a conexão esperar pelo lock em vez de falhar com "database is locked".
+
+    def pragmas(self, profile: str) -> dict:
+        """Pragmas aplicados a cada nova conexão, conforme o perfil"""
+        if profile != "production":
+            return {}
+        return {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",   # seguro com WAL; só o último commit pode se perder numa queda de energia
+            "busy_timeout": config.SQLITE_BUSY_TIMEOUT_MS,
+            "cache_size": -config.SQLITE_CACHE_SIZE_KB,  # negativo = tamanho em KiB
+            "mmap_size": config.SQLITE_MMAP_SIZE,
+            "temp_store": "MEMORY",
+        }
+
+    def configure(self, engine, profile: str):
+        """Registra o evento 'connect' que aplica os pragmas em cada conexão nova"""
+        pragmas = self.pragmas(profile)
+        if not pragmas:
+            return
+
+        @event.listens_for(engine, "connect")
+        def _set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    def upsert(self, table):
+        """INSERT com .on_conflict_do_nothing() / .on_conflict_do_update()"""
+        return sqlite.insert(table)
+
+    # Carga em massa: o executemany da classe base, numa transação só, já é o
+    # caminho rápido (sem ida e volta pela rede); o próximo id é sempre max(id) + 1
+
+    def nocase(self, value):
+        """Coluna para comparar/ordenar sem diferenciar maiúsculas (índice ix_employees_name)"""
+        return value.collate("NOCASE") if hasattr(value, "collate") else value
+
+    def prefix_match(self, column, prefix: str):
+        """'column' começa com 'prefix', sem diferenciar maiúsculas"""
+        # O LIKE do SQLite já ignora maiúsculas (ASCII); o padrão vai pronto
+        # num único parâmetro ("ana%") para o SQLite usar o índice NOCASE
+        escaped = prefix.replace("/", "//").replace("%", "/%").replace("_", "/_")
+        return column.like(escaped + "%", escape="/")
+
+class PostgreSQLBackend(Backend):
+    name = "postgresql"
+    async_driver = "asyncpg"
+
+    # Drivers com COPY ... FROM STDIN pela conexão do DBAPI
+    COPY_DRIVERS = ("psycopg2", "psycopg")
+
+    def engine_options(self, url: URL) -> dict:
+        options = {
+            **super().engine_options(url),
+            # Conexões derrubadas pelo servidor (restart, failover, pgbouncer)
+            # são trocadas no checkout em vez de estourar no request
+            "pool_pre_ping": True,
+            "pool_recycle": config.DB_POOL_RECYCLE,
+        }
+        driver = url.get_driver_name()
+        if driver == "asyncpg":
+            options["connect_args"] = {
+                "timeout": config.DB_CONNECT_TIMEOUT,
+                "server_settings": {"application_name": config.DB_APPLICATION_NAME},
+            }
+        else:
+            options["connect_args"] = {
+                "connect_timeout": config.DB_CONNECT_TIMEOUT,
+                "application_name": config.DB_APPLICATION_NAME,
+            }
+        if driver == "psycopg2":
+            # INSERTs em lote viram INSERT ... VALUES (...), (...) por página
+            # (insertmanyvalues). O modo "values_plus_batch" aceleraria também
+            # UPDATE/DELETE em lote, mas o rowcount do executemany deixa de
+            # valer, e a conferência de versão de app/batch.py depende dele
+            options["executemany_mode"] = "values_only"
+        return options
+
+    def async_url(self, url: URL) -> URL:
+        # O psycopg 3 tem modo assíncrono próprio; os outros drivers vão para o asyncpg
+        if url.get_driver_name() == "psycopg":
+            return url
+        return url.set(drivername=f"{self.name}+{self.async_driver}")
+
+    def upsert(self, table):
+        return postgresql.insert(table)
+
+    def bulk_insert(self, db, table, rows: list[dict]):
+        """
+        COPY das linhas para uma tabela temporária e um INSERT ... SELECT dela
+        para a tabela de destino. O COPY é o caminho mais rápido de carga do
+        PostgreSQL, e o INSERT ... SELECT mantém o que um INSERT comum faz:
+        defaults, constraints, triggers do painel e a auditoria (app/audit.py)
+        """
+        bind = _bind_of(db)
+        if not rows or bind.dialect.driver not in self.COPY_DRIVERS:
+            return super().bulk_insert(db, table, rows)
+        columns = list(rows[0])
+        names = ", ".join(columns)
+        staging = f"{table.name}_staging"
+        # Uma por transação (some no commit); esvaziada a cada lote
+        db.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+            f"SELECT {names} FROM {table.name} WITH NO DATA"
+        ))
+        db.execute(text(f"TRUNCATE {staging}"))
+
+        connection = db.connection() if isinstance(db, Session) else db
+        cursor = connection.connection.driver_connection.cursor()
+        try:
+            copy = f"COPY {staging} ({names}) FROM STDIN"
+            if bind.dialect.driver == "psycopg":
+                with cursor.copy(copy) as writer:
+                    for row in rows:
+                        writer.write_row([row[name] for name in columns])
+            else:
+                buffer = io.StringIO("".join(
+                    "\t".join(_copy_value(row[name]) for name in columns) + "\n" for row in rows
+                ))
+                cursor.copy_expert(copy, buffer)
+        finally:
+            cursor.close()
+
+        source = table_clause(staging, *(column(name) for name in columns))
+        db.execute(insert(table).from_select(columns, select(source)))
+
+    def reset_sequences(self, conn, tables):
+        for table in tables:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"coalesce(max(id), 0) + 1, false) FROM {table.name}"
+            ))
+
+    def nocase(self, value):
+        # Índice ix_employees_name em lower(name) (migração 6)
+        return func.lower(value)
+
+    def prefix_match(self, column, prefix: str):
+        # O LIKE do PostgreSQL diferencia maiúsculas: compara lower() com lower(),
+        # pelo índice ix_employees_name_prefix (text_pattern_ops)
+        escaped = prefix.lower().replace("/", "//").replace("%", "/%").replace("_", "/_")
+        return self.nocase(column).like(escaped + "%", escape="/")
+
+BACKENDS = {backend.name: backend for backend in (SQLiteBackend(), PostgreSQLBackend())}
+
+def get_backend(url: str | URL) -> Backend:
+    """Backend da URL; dialetos derivados do PostgreSQL (ex: CockroachDB) usam o do PostgreSQL"""
+    url = make_url(url)
+    backend = BACKENDS.get(url.get_backend_name())
+    if backend is None and issubclass(url.get_dialect(), PGDialect):
+        backend = BACKENDS["postgresql"]
+    if backend is None:
+        raise ValueError(f"Banco não suportado: {url.get_backend_name()} (use SQLite ou PostgreSQL)")
+    return backend
+
+def backend_for(db) -> Backend:
+    """Backend de uma Session, Connection ou Engine"""
+    dialect = _bind_of(db).dialect
+    return BACKENDS["postgresql" if isinstance(dialect, PGDialect) else dialect.name]
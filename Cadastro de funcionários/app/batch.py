@@ -0,0 +1,252 @@
+# app/batch.py
+from itertools import groupby
+from typing import Iterable, Iterator
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Employee, Department, Position
+from app.schemas import (
+    BatchItemResult,
+    BatchResult,
+    EmployeeCreate,
+    EmployeeDelete,
+    EmployeeUpdate,
+)
+from app.search import deferred_search_index
+from app.softdelete import soft_delete_statement
+
+# --- Lote de operações em funcionários ---
+# Um POST da API pode trazer milhares de operações. Em vez de um SELECT/INSERT/
+# UPDATE por item, as verificações usam poucas consultas com IN (...) e as
+# gravações usam um único statement por tipo (executemany), na mesma transação.
+# As operações são validadas na ordem do array; as com erro são apenas
+# relatadas. Gravação: exclusões, depois atualizações, depois inclusões.
+
+IN_CHUNK_SIZE = 500
+
+def _chunks(values: Iterable, size: int = IN_CHUNK_SIZE) -> Iterator[list]:
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _existing_ids(db: Session, model, ids: set[int]) -> set[int]:
+    found = set()
+    for chunk in _chunks(ids):
+        found.update(db.scalars(select(model.id).where(model.id.in_(chunk))))
+    return found
+
+def _update_versioned(db: Session, rows: list[dict]) -> set[int]:
+    """
+    UPDATE ... WHERE id = :id AND version = :version (somando 'bump' à versão)
+    para cada linha, agrupando as sequências com as mesmas colunas (mantendo a
+    ordem do lote). Retorna os ids que não estavam mais na versão lida
+    (alterados por outro request no meio), para virarem erro do item.
+    O total do rowcount não diz quais linhas ficaram de fora (e o psycopg2
+    nem informa o do executemany): cada linha confere pelo RETURNING. Com
+    driver que aceita executemany com RETURNING, é um statement por grupo;
+    nos outros, um por linha, como o ORM faria.
+    """
+    table = Employee.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"), table.c.version == bindparam("b_version"))
+        .values(version=table.c.version + bindparam("b_bump"))
+        .returning(table.c.id)
+    )
+    # Direto na Connection da sessão: sem os eventos do ORM a cada statement
+    conn = db.connection()
+    executemany = conn.dialect.update_executemany_returning
+    stale = set()
+    for columns, group in groupby(rows, key=lambda row: sorted(row.keys() - {"id", "version", "bump"})):
+        params = [
+            {
+                "b_id": row["id"], "b_version": row["version"], "b_bump": row["bump"],
+                **{column: row[column] for column in columns},
+            }
+            for row in group
+        ]
+        if executemany:
+            updated = set(conn.execute(statement, params).scalars())
+        else:
+            updated = {id_ for values in params for id_ in conn.execute(statement, values).scalars()}
+        stale.update(values["b_id"] for values in params if values["b_id"] not in updated)
+    return stale
+
+def _load_state(db: Session, operations: list) -> tuple[dict[int, str], dict[int, int], dict[str, int], set[int], set[int]]:
+    """
+    Carrega de uma vez o que a validação precisa:
+    email e versão atuais de cada funcionário alvo, dono atual de cada email
+    enviado e quais departamentos/cargos citados existem.
+    """
+    target_ids = {op.id for op in operations if not isinstance(op, EmployeeCreate)}
+    emails = set()
+    department_ids = set()
+    position_ids = set()
+    for op in operations:
+        if isinstance(op, EmployeeDelete):
+            continue
+        fields = op.changes() if isinstance(op, EmployeeUpdate) else op.model_dump()
+        if fields.get("email"):
+            emails.add(fields["email"])
+        if fields.get("department_id") is not None:
+            department_ids.add(fields["department_id"])
+        if fields.get("position_id") is not None:
+            position_ids.add(fields["position_id"])
+
+    current_email = {}
+    versions = {}
+    for chunk in _chunks(target_ids):
+        for id_, email, version in db.execute(
+            select(Employee.id, Employee.email, Employee.version).where(Employee.id.in_(chunk))
+        ):
+            current_email[id_] = email
+            versions[id_] = version
+    email_owner = {}
+    for chunk in _chunks(emails):
+        # Com os excluídos ainda não apagados: o UNIQUE do email vale para eles
+        email_owner.update(
+            (email, id_) for id_, email in db.execute(
+                select(Employee.id, Employee.email)
+                .where(Employee.email.in_(chunk))
+                .execution_options(include_deleted=True)
+            )
+        )
+    return (
+        current_email,
+        versions,
+        email_owner,
+        _existing_ids(db, Department, department_ids),
+        _existing_ids(db, Position, position_ids),
+    )
+
+def apply_employee_batch(db: Session, operations: list, atomic: bool = False) -> BatchResult:
+    """
+    Valida e grava o lote. Com 'atomic', um único erro desfaz o lote inteiro
+    (as operações válidas voltam como 'skipped').
+    O commit/rollback fica com quem chamou.
+    """
+    current_email, versions, email_owner, departments, positions = _load_state(db, operations)
+
+    results: list[BatchItemResult] = []
+    deletes: list[int] = []
+    updates: dict[int, tuple[list[int], dict]] = {}  # id -> (posições no resultado, linha do UPDATE)
+    creates: list[tuple[int, dict]] = []
+
+    def check_refs(fields: dict) -> str | None:
+        department_id = fields.get("department_id")
+        if department_id is not None and department_id not in departments:
+            return f"Departamento {department_id} não encontrado"
+        position_id = fields.get("position_id")
+        if position_id is not None and position_id not in positions:
+            return f"Cargo {position_id} não encontrado"
+        return None
+
+    def claim_email(email: str, owner) -> str | None:
+        holder = email_owner.get(email)
+        if holder is not None and holder != owner:
+            return f"Email '{email}' já cadastrado"
+        email_owner[email] = owner
+        return None
+
+    for index, op in enumerate(operations):
+        error = None
+        if isinstance(op, EmployeeDelete):
+            if op.id not in current_email:
+                error = "Funcionário não encontrado"
+            else:
+                # O email continua ocupado (UNIQUE) até a limpeza apagar a linha
+                current_email.pop(op.id)
+                deletes.append(op.id)
+
+        elif isinstance(op, EmployeeUpdate):
+            changes = op.changes()
+            if op.id not in current_email:
+                error = "Funcionário não encontrado"
+            elif op.version is not None and op.version != versions[op.id]:
+                error = f"Alterado por outra pessoa (versão atual: {versions[op.id]})"
+            elif ("name" in changes and changes["name"] is None) or ("email" in changes and changes["email"] is None):
+                error = "Nome e Email são obrigatórios"
+            else:
+                error = check_refs(changes)
+                if error is None and changes.get("email") and changes["email"] != current_email[op.id]:
+                    error = claim_email(changes["email"], op.id)
+                    if error is None:
+                        email_owner.pop(current_email[op.id], None)
+                        current_email[op.id] = changes["email"]
+                if error is None and changes:
+                    # Versão lida acima: o UPDATE confere e incrementa (version_id_col).
+                    # Várias atualizações do mesmo funcionário viram um UPDATE só
+                    # (conferido pela primeira versão), que soma uma versão por item
+                    if op.id in updates:
+                        positions, row = updates[op.id]
+                        positions.append(len(results))
+                        row.update(changes)
+                        row["bump"] += 1
+                    else:
+                        updates[op.id] = ([len(results)], {"id": op.id, "version": versions[op.id], "bump": 1, **changes})
+                    versions[op.id] += 1
+
+        else:
+            fields = op.model_dump(exclude={"op"})
+            # Funcionário ainda sem id: um objeto novo serve de dono do email
+            error = check_refs(fields) or claim_email(fields["email"], object())
+            if error is None:
+                creates.append((len(results), fields))
+
+        results.append(BatchItemResult(
+            index=index,
+            op=op.op,
+            status="error" if error else "ok",
+            id=None if isinstance(op, EmployeeCreate) else op.id,
+            version=versions.get(op.id) if isinstance(op, EmployeeUpdate) and error is None else None,
+            error=error,
+        ))
+
+    def rejected() -> BatchResult:
+        """Lote atômico com erro: nada é gravado (quem chamou faz o rollback)"""
+        for result in results:
+            if result.status == "ok":
+                result.status = "skipped"
+                result.version = None
+        return BatchResult(applied=False, succeeded=0, failed=failed, results=results)
+
+    failed = sum(result.status == "error" for result in results)
+    if atomic and failed:
+        return rejected()
+
+    # --- Gravação ---
+    for chunk in _chunks(deletes):
+        # Exclusão lógica; associação com projetos e linhas saem na tarefa
+        # 'purge_deleted' (app/softdelete.py), que a rota coloca na fila
+        db.execute(soft_delete_statement(Employee, chunk))
+
+    # Uma atualização seguida da exclusão do mesmo funcionário não precisa rodar
+    deleted = set(deletes)
+    updates = [(positions, row) for id_, (positions, row) in updates.items() if id_ not in deleted]
+    if updates:
+        # UPDATE pela chave primária, conferindo a versão de cada linha
+        stale = _update_versioned(db, [row for _, row in updates])
+        if stale:
+            # Alterado por outro request entre a leitura e o UPDATE: erro só nesses itens
+            for positions, row in updates:
+                if row["id"] in stale:
+                    for position in positions:
+                        results[position].status = "error"
+                        results[position].version = None
+                        results[position].error = "Alterado por outra pessoa durante o lote"
+                        failed += 1
+            if atomic:
+                return rejected()
+
+    if creates:
+        with deferred_search_index(db):
+            new_ids = db.scalars(
+                insert(Employee).returning(Employee.id, sort_by_parameter_order=True),
+                [fields for _, fields in creates],
+            ).all()
+        for (position, _), new_id in zip(creates, new_ids):
+            results[position].id = new_id
+            results[position].version = 1
+
+    return BatchResult(applied=True, succeeded=len(results) - failed, failed=failed, results=results)
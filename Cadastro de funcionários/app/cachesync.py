@@ -0,0 +1,163 @@
+# app/cachesync.py
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Column, Integer, MetaData, String, Table, select
+from sqlalchemy.engine import Connection
+
+from app import config
+from app.backends import backend_for
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# --- Invalidação de caches entre workers ---
+# Cada worker (processo) tem os próprios caches em memória: dados de
+# referência (refdata), fragmentos HTML (fragments) e tokens (auth).
+# Quando um worker invalida um cache, também incrementa o contador daquele
+# cache na tabela 'cache_versions'. Antes de atender um request, cada worker
+# compara os contadores com os últimos que viu (no máximo a cada
+# CACHE_SYNC_INTERVAL_MS) e invalida localmente os caches que mudaram.
+# Nada disso roda no event loop: a conferência vai para o threadpool (só
+# quando está na hora) e o aviso feito de uma rota async, para o executor.
+# No SQLite a leitura usa uma conexão própria de cada worker, fora do pool
+# (~10 µs por request em vez de ~70 µs com checkout do pool).
+
+_metadata = MetaData()
+
+cache_versions = Table(
+    "cache_versions",
+    _metadata,
+    Column("name", String(50), primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+def create_cache_versions(conn: Connection):
+    """Cria a tabela de contadores (migração 4)"""
+    cache_versions.create(conn, checkfirst=True)
+
+def bump_version(conn: Connection, name: str) -> int:
+    """Incrementa o contador de 'name' na transação de 'conn'; retorna o novo valor"""
+    # Um statement só (upsert): cria a linha na primeira vez, mesmo com outro worker ao mesmo tempo
+    query = backend_for(conn).upsert(cache_versions).values(name=name, version=1)
+    query = query.on_conflict_do_update(
+        index_elements=[cache_versions.c.name],
+        set_={"version": cache_versions.c.version + 1},
+    )
+    return conn.execute(query.returning(cache_versions.c.version)).scalar_one()
+
+class CacheSync:
+    def __init__(self, interval_ms: int = config.CACHE_SYNC_INTERVAL_MS, enabled: bool = config.CACHE_SYNC):
+        self.interval = interval_ms / 1000
+        self.enabled = enabled
+        self._handlers: dict[str, Callable[[], None]] = {}
+        self._seen: dict[str, int] | None = None  # None = ainda não leu a tabela
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()  # uma conferência por vez (conexão de leitura única)
+        self._connection = None  # conexão do DBAPI (SQLite), aberta no próprio worker
+        self._connection_pid = None
+
+    def register(self, name: str, handler: Callable[[], None]):
+        """'handler' invalida o cache local quando outro worker muda 'name'"""
+        self._handlers[name] = handler
+
+    def publish(self, name: str, conn: Connection | None = None):
+        """
+        Avisa os outros workers (chamado depois de invalidar o cache local).
+        Com 'conn', o aviso entra na mesma transação da alteração.
+        """
+        if not self.enabled:
+            return
+        if conn is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                # Chamado de uma rota async: o UPSERT + commit (que no SQLite
+                # pode esperar pelo lock de escrita) não bloqueia o event loop
+                loop.run_in_executor(None, self._publish, name, None)
+                return
+        self._publish(name, conn)
+
+    def _publish(self, name: str, conn: Connection | None):
+        try:
+            if conn is not None:
+                version = bump_version(conn, name)
+            else:
+                with engine.begin() as own:
+                    version = bump_version(own, name)
+        except Exception:
+            # Sem o aviso, os outros workers ficariam com o cache velho
+            logger.exception("Falha ao publicar a invalidação do cache '%s'", name)
+            return
+        with self._lock:
+            if self._seen is not None:
+                self._seen[name] = max(version, self._seen.get(name, 0))
+
+    def due(self) -> bool:
+        """Se já passou CACHE_SYNC_INTERVAL_MS desde a última conferência (sem tocar no banco)"""
+        return self.enabled and (self._seen is None or time.monotonic() - self._checked_at >= self.interval)
+
+    def check(self):
+        """Invalida localmente os caches que outros workers alteraram"""
+        if not self.due():
+            return
+        # Outra thread já está conferindo: esta não precisa esperar
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            current = self._read_versions()
+        finally:
+            self._check_lock.release()
+
+        with self._lock:
+            first = self._seen is None
+            seen = self._seen or {}
+            changed = [name for name, version in current.items() if version != seen.get(name, 0)]
+            self._seen = current
+        # Na primeira leitura os caches ainda estão vazios: só guarda as versões
+        if first:
+            return
+        for name in changed:
+            handler = self._handlers.get(name)
+            if handler is not None:
+                handler()
+
+    def _read_versions(self) -> dict[str, int]:
+        if engine.dialect.name != "sqlite":
+            with engine.connect() as conn:
+                return dict(conn.execute(select(cache_versions.c.name, cache_versions.c.version)).all())
+        if self._connection_pid != os.getpid():
+            # Primeira leitura deste processo (uma conexão herdada no fork não serve)
+            self._connection = engine.raw_connection()
+            self._connection_pid = os.getpid()
+        cursor = self._connection.driver_connection.execute("SELECT name, version FROM cache_versions")
+        return dict(cursor.fetchall())
+
+    def close(self):
+        """Devolve a conexão de leitura (no desligamento do worker)"""
+        if self._connection is not None and self._connection_pid == os.getpid():
+            self._connection.close()
+        self._connection = self._connection_pid = None
+
+cache_sync = CacheSync()
+
+class CacheSyncMiddleware:
+    """Confere os contadores no início dos requests, a cada CACHE_SYNC_INTERVAL_MS (middleware ASGI puro)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and cache_sync.due():
+            # A leitura da tabela (no PostgreSQL, uma ida e volta pela rede) fica fora do event loop
+            await run_in_threadpool(cache_sync.check)
+        await self.app(scope, receive, send)
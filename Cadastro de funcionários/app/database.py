@@ -1,16 +1,28 @@
 # app/database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from fastapi.concurrency import run_in_threadpool
+from app import config
+from app.backends import get_backend
 
-# Define o caminho do arquivo de banco de dados SQLite
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Define o caminho do banco de dados (variável de ambiente DATABASE_URL)
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+# SQLite ou PostgreSQL, pela URL (app/backends.py)
+backend = get_backend(SQLALCHEMY_DATABASE_URL)
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = config.SQLITE_PROFILE):
+    """Cria o engine com as opções do backend da URL (pool, connect_args, pragmas do SQLite)"""
+    url = make_url(url)
+    url_backend = get_backend(url)
+    engine = create_engine(url, **url_backend.engine_options(url))
+    url_backend.configure(engine, profile)
+    return engine
 
 # Cria o "motor" do banco de dados
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False} # Necessário para SQLite
-)
+engine = create_db_engine()
 
 # Cria uma "fábrica" de sessões
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -24,4 +36,93 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# --- Camada assíncrona (opcional, DATABASE_ASYNC=1) ---
+# As rotas de funcionários, departamentos, cargos e projetos são 'async def'
+# e recebem a sessão por 'get_async_db'. Com DATABASE_ASYNC ligado, ela é um
+# AsyncSession (driver aiosqlite ou asyncpg), e o worker atende muitos requests ao mesmo
+# tempo sem ocupar o threadpool. Desligado, as mesmas rotas usam a Session
+# síncrona de sempre, com cada chamada ao banco executada no threadpool.
+
+ASYNC_DATABASE_URL = backend.async_url(make_url(SQLALCHEMY_DATABASE_URL))
+
+async_engine = None
+AsyncSessionLocal = None
+
+if config.DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **backend.engine_options(ASYNC_DATABASE_URL))
+    backend.configure(async_engine.sync_engine, config.SQLITE_PROFILE)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autocommit=False, autoflush=False, expire_on_commit=False
+    )
+
+def _buffered(result):
+    """Carrega as linhas antes de sair da thread (como faz o AsyncSession)"""
+    # (resultados de INSERT/UPDATE/DELETE sem RETURNING não têm linhas)
+    return result.freeze()() if getattr(result, "returns_rows", True) else result
+
+class SyncSessionAdapter:
+    """
+    Mesma interface 'await' do AsyncSession, sobre uma Session síncrona.
+    Cada operação no banco roda no threadpool.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(
+            lambda: _buffered(self.sync_session.execute(statement, params, **kwargs))
+        )
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return (await self.execute(statement, params, **kwargs)).scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+async def get_async_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    # Sem o modo assíncrono: Session síncrona com a mesma interface
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        yield SyncSessionAdapter(db)
+    finally:
+        await run_in_threadpool(db.close)
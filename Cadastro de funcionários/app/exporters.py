@@ -0,0 +1,147 @@
+# app/exporters.py
+import csv
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+from typing import Callable, Iterator
+
+from openpyxl import Workbook
+from sqlalchemy import select
+
+from app import config
+from app.database import SessionLocal
+from app.filters import apply_employee_filters
+from app.helpers import CENT
+from app.models import Employee, Department, Position
+
+# Mesmas colunas aceitas pela importação (o arquivo exportado pode ser reimportado)
+HEADER = ["ID", "Nome", "Email", "Telefone", "Salário", "Departamento", "Cargo"]
+FIELDS = ["id", "name", "email", "phone", "salary", "department", "position"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# --- Leitura em blocos ---
+
+def export_query(filters: dict):
+    """Funcionários + nomes de departamento/cargo em um único JOIN"""
+    query = (
+        select(
+            Employee.id,
+            Employee.name,
+            Employee.email,
+            Employee.phone,
+            Employee.salary,
+            Department.name.label("department"),
+            Position.title.label("position"),
+        )
+        .outerjoin(Department, Employee.department_id == Department.id)
+        .outerjoin(Position, Employee.position_id == Position.id)
+        .order_by(Employee.id)
+    )
+    return apply_employee_filters(query, filters)
+
+def iter_employee_rows(filters: dict, chunk_size: int = config.EXPORT_CHUNK_SIZE) -> Iterator[tuple]:
+    """
+    Percorre os funcionários com yield_per (memória constante).
+    Abre a própria sessão, pois roda enquanto a resposta está sendo enviada.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(export_query(filters).execution_options(yield_per=chunk_size))
+        yield from result
+    finally:
+        db.close()
+
+# --- Formatos ---
+
+def _iter_csv(rows: Iterator[tuple], chunk_size: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+def _json_money(value):
+    """Salário (Decimal) no JSON: texto com 2 casas ("1234.50"), exato e igual ao do CSV"""
+    if isinstance(value, Decimal):
+        return str(value.quantize(CENT))
+    raise TypeError(f"{type(value).__name__} não é serializável em JSON")
+
+def _iter_ndjson(rows: Iterator[tuple], chunk_size: int) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        # Salário como texto, não float (que perderia as casas: 10.00 viraria 10.0)
+        lines.append(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False, default=_json_money))
+        if len(lines) >= chunk_size:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines.clear()
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def _iter_xlsx(rows: Iterator[tuple], chunk_size: int) -> Iterator[bytes]:
+    # Modo write-only: o openpyxl grava as linhas num arquivo temporário, não
+    # na memória. Mas o .xlsx é um zip montado só no save(), depois da última
+    # linha: o primeiro byte só sai quando todas as linhas foram lidas (o
+    # cliente espera sem receber nada). Para planilhas grandes, a exportação
+    # em segundo plano (POST /employees/export), que é a do botão da listagem.
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Funcionários")
+    sheet.append(HEADER)
+    for row in rows:
+        sheet.append(list(row))
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook.save(path)
+        with open(path, "rb") as file:
+            while chunk := file.read(64 * 1024):
+                yield chunk
+    finally:
+        os.remove(path)
+
+WRITERS = {
+    "csv": _iter_csv,
+    "ndjson": _iter_ndjson,
+    "xlsx": _iter_xlsx,
+}
+
+def stream_employees(export_format: str, filters: dict, chunk_size: int = config.EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Gera o arquivo de exportação em pedaços (para um StreamingResponse)"""
+    return WRITERS[export_format](iter_employee_rows(filters, chunk_size), chunk_size)
+
+def export_employees_file(
+    export_format: str,
+    filters: dict,
+    path: str,
+    progress: Callable[[int], None] | None = None,
+    chunk_size: int = config.EXPORT_CHUNK_SIZE,
+) -> int:
+    """
+    Grava a exportação em 'path' (tarefa em segundo plano) e retorna a
+    quantidade de linhas. 'progress(linhas)' é chamado a cada 'chunk_size' linhas.
+    """
+    count = 0
+
+    def rows():
+        nonlocal count
+        for count, row in enumerate(iter_employee_rows(filters, chunk_size), start=1):
+            if progress is not None and count % chunk_size == 0:
+                progress(count)
+            yield row
+
+    with open(path, "wb") as file:
+        for chunk in WRITERS[export_format](rows(), chunk_size):
+            file.write(chunk)
+    return count
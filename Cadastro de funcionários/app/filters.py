@@ -0,0 +1,59 @@
+# app/filters.py
+from fastapi import HTTPException
+from app.database import backend
+from app.models import Employee
+
+# --- FILTROS DE FUNCIONÁRIOS (listagem e exportação) ---
+
+def _optional_int(value: str | None, field: str) -> int | None:
+    """Converte o valor vindo da querystring ('' vira None)"""
+    if value is None or not value.strip():
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Filtro '{field}' inválido")
+
+def _optional_float(value: str | None, field: str) -> float | None:
+    if value is None or not value.strip():
+        return None
+    try:
+        return float(value.replace(",", "."))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Filtro '{field}' inválido")
+
+def employee_filters(
+    department_id: str | None = None,
+    position_id: str | None = None,
+    min_salary: str | None = None,
+    max_salary: str | None = None,
+    name: str | None = None,
+) -> dict:
+    """
+    Lê os filtros da listagem a partir da querystring.
+    Retorna apenas os filtros preenchidos (usado também para montar os links de paginação).
+    """
+    filters = {
+        "department_id": _optional_int(department_id, "department_id"),
+        "position_id": _optional_int(position_id, "position_id"),
+        "min_salary": _optional_float(min_salary, "min_salary"),
+        "max_salary": _optional_float(max_salary, "max_salary"),
+        "name": name.strip() if name and name.strip() else None,
+    }
+    return {key: value for key, value in filters.items() if value is not None}
+
+def apply_employee_filters(query, filters: dict):
+    """Aplica os filtros (já validados) em um select de Employee"""
+    if "department_id" in filters:
+        query = query.where(Employee.department_id == filters["department_id"])
+    if "position_id" in filters:
+        query = query.where(Employee.position_id == filters["position_id"])
+    if "min_salary" in filters:
+        query = query.where(Employee.salary >= filters["min_salary"])
+    if "max_salary" in filters:
+        query = query.where(Employee.salary <= filters["max_salary"])
+    if "name" in filters:
+        # Busca por prefixo: "Ana" encontra "Ana Paula", mas não "Mariana",
+        # pelo índice de nome sem maiúsculas (app/backends.py)
+        query = query.where(backend.prefix_match(Employee.name, filters["name"]))
+    return query
@@ -0,0 +1,98 @@
+# app/fragments.py
+import hashlib
+import os
+import threading
+from typing import Awaitable, Callable, NamedTuple
+
+from fastapi import Request, Response
+from markupsafe import Markup
+
+from app.cachesync import cache_sync
+from app.templating import templates, TEMPLATES_DIR
+
+# --- Cache de fragmentos HTML das listagens ---
+# As tabelas de departamentos, cargos e projetos quase nunca mudam. O corpo
+# da tabela (<tbody>) é renderizado uma vez e reaproveitado até que uma rota
+# de criação/exclusão chame invalidate(). Com o ETag, o navegador ainda recebe
+# 304 sem que o servidor consulte o banco ou renderize qualquer coisa.
+# Nos outros workers, uma invalidação limpa todos os fragmentos (são poucos).
+
+class Fragment(NamedTuple):
+    html: Markup
+    digest: str
+
+class FragmentCache:
+    def __init__(self):
+        self._fragments: dict[str, Fragment] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Fragment | None:
+        return self._fragments.get(key)
+
+    def set(self, key: str, html: str) -> Fragment:
+        fragment = Fragment(Markup(html), hashlib.sha1(html.encode("utf-8")).hexdigest())
+        with self._lock:
+            self._fragments[key] = fragment
+        return fragment
+
+    def invalidate(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._fragments.pop(key, None)
+        cache_sync.publish("fragments")
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+fragment_cache = FragmentCache()
+cache_sync.register("fragments", fragment_cache.clear)
+
+# --- ETag / If-None-Match ---
+
+def _page_etag(fragment: Fragment, page_template: str, username: str) -> str:
+    # A página inclui o nome do usuário no cabeçalho e o próprio template
+    # pode mudar num deploy, então ambos entram na conta
+    mtime = os.path.getmtime(TEMPLATES_DIR / page_template)
+    raw = f"{fragment.digest}:{page_template}:{mtime}:{username}"
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return etag in candidates or "*" in candidates
+
+async def render_cached_list(
+    request: Request,
+    *,
+    key: str,
+    page_template: str,
+    rows_template: str,
+    load_rows: Callable[[], Awaitable[dict]],
+    context: dict,
+) -> Response:
+    """
+    Renderiza uma página de listagem usando o fragmento em cache.
+    'load_rows' só é chamado (consultando o banco) quando o fragmento não existe.
+    """
+    fragment = fragment_cache.get(key)
+    if fragment is None:
+        rows_context = await load_rows()
+        html = templates.get_template(rows_template).render(rows_context)
+        fragment = fragment_cache.set(key, html)
+
+    username = getattr(context.get("user"), "username", "")
+    etag = _page_etag(fragment, page_template, username)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response = templates.TemplateResponse(
+        page_template,
+        {"request": request, "rows_html": fragment.html, **context},
+    )
+    response.headers.update(headers)
+    return response
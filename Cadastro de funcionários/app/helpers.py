@@ -1,26 +1,30 @@
 # app/helpers.py
 from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Iterable
 
-def format_brl_price(value: float | int | None) -> str:
+_replace = str.replace
+
+def format_brl_price(value: float | int | Decimal | None) -> str:
     """
     Formata um número para o padrão R$ 1.234,50
     """
     if value is None:
-        value = 0.0
+        return "R$ 0,00"
     try:
         # Formata com separador de milhar (,) e 2 casas decimais (.)
         formatted_str = f"{value:,.2f}"
-        
-        # Troca , por v (temp)
-        formatted_str = formatted_str.replace(",", "v")
-        # Troca . por , (decimal)
-        formatted_str = formatted_str.replace(".", ",")
-        # Troca v (temp) por . (milhar)
-        formatted_str = formatted_str.replace("v", ".")
-        
-        return f"R$ {formatted_str}"
     except (ValueError, TypeError):
         return "R$ 0,00"
+    # Troca , <-> . (quase todo o custo está na conversão do número; três
+    # replace em C saem mais baratos que str.translate ou fatiar a string)
+    return "R$ " + formatted_str.replace(",", "v").replace(".", ",").replace("v", ".")
+
+def format_brl_prices(values: Iterable[float | int | Decimal | None]) -> list[str]:
+    """
+    Versão em lote de format_brl_price (uma coluna inteira de uma vez)
+    """
+    return list(map(format_brl_price, values))
 
 def format_brl_date(value: datetime | None) -> str:
     """
@@ -33,21 +37,58 @@ def format_brl_date(value: datetime | None) -> str:
     except (ValueError, AttributeError):
         return str(value)
 
-def parse_brl_price(value: str | int | float | None) -> float:
+def parse_brl_price(value: str | int | float | Decimal | None) -> float:
     """
-    Converte uma string (R$ 1.234,50 ou 1234.50) para um float (1234.50)
+    Converte uma string (R$ 1.234,50) para um float (1234.50).
+    O ponto é sempre separador de milhar ('1234.50' vira 123450.0).
     """
+    if value.__class__ is str:
+        # Caminho rápido (células de texto da planilha): o float() já ignora espaços
+        try:
+            return float(_replace(_replace(_replace(value, "R$", ""), ".", ""), ",", "."))
+        except ValueError:
+            return 0.0
     if value is None:
         return 0.0
-    if isinstance(value, (int, float)):
+    if isinstance(value, (int, float, Decimal)):
         return float(value)
-    
+    return parse_brl_price(str(value))
+
+def parse_brl_prices(values: Iterable[str | int | float | Decimal | None]) -> list[float]:
+    """
+    Versão em lote de parse_brl_price (uma coluna inteira de uma vez)
+    """
+    return list(map(parse_brl_price, values))
+
+# --- Valores monetários exatos (Decimal) ---
+
+CENT = Decimal("0.01")
+
+def to_money(value: str | int | float | Decimal | None) -> Decimal | None:
+    """
+    Converte para Decimal com 2 casas (arredondamento comercial, meio para cima).
+    Floats usam a menor representação decimal (repr), então 0.1 vira 0,10 e
+    não 0,1000000000000000055...
+    """
+    if value is None:
+        return None
+    if isinstance(value, float):
+        value = repr(value)
     try:
-        # Remove "R$", espaços e pontos de milhar
-        s = str(value).strip().replace("R$", "").replace(".", "")
-        # Substitui vírgula decimal por ponto
-        s = s.replace(",", ".")
-        
-        return float(s)
-    except (ValueError, TypeError):
-        return 0.0
\ No newline at end of file
+        money = Decimal(value)
+        if money.is_finite():
+            return money.quantize(CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError, ValueError):
+        pass
+    # Texto inválido, nan/inf ou grande demais
+    return Decimal("0.00")
+
+def parse_brl_decimal(value: str | int | float | Decimal | None) -> Decimal:
+    """
+    Como parse_brl_price, mas sem passar por float: 'R$ 1.234,505' -> Decimal('1234.51')
+    """
+    if value is None:
+        return Decimal("0.00")
+    if isinstance(value, str):
+        value = _replace(_replace(_replace(value, "R$", ""), ".", ""), ",", ".").strip()
+    return to_money(value)
@@ -0,0 +1,208 @@
+# app/importer.py
+import unicodedata
+from typing import BinaryIO, Callable
+
+from openpyxl import load_workbook
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import config
+from app.backends import backend_for
+from app.helpers import parse_brl_prices
+from app.models import Employee, Department, Position
+from app.aggregates import deferred_aggregates
+from app.search import deferred_search_index
+from app.softdelete import restore_statement
+
+# Cabeçalho esperado na planilha (já normalizado) -> campo interno
+COLUMNS = {
+    "nome": "name",
+    "email": "email",
+    "salario": "salary",
+    "cargo": "position",
+    "departamento": "department",
+    "telefone": "phone",
+}
+
+class ImportFileError(ValueError):
+    """A planilha não pode ser lida (arquivo inválido ou sem cabeçalho)"""
+
+# --- Funções Auxiliares ---
+
+def _normalize(value) -> str:
+    """'Salário ' -> 'salario' (sem acento, minúsculo, sem espaços nas pontas)"""
+    text = unicodedata.normalize("NFKD", str(value or "")).strip().casefold()
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+def _cell_text(value) -> str | None:
+    if value is None:
+        return None
+    # Telefones costumam vir como número do Excel (ex: 11987654321.0)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+def _name_map(db: Session, model, name_attr: str) -> tuple[dict[str, int], set[int]]:
+    """
+    Monta o mapa nome -> id (uma única consulta por importação) e o conjunto
+    dos ids excluídos e ainda não apagados (o UNIQUE do nome vale para eles)
+    """
+    names, deleted = {}, set()
+    query = select(model.id, getattr(model, name_attr), model.deleted_at).execution_options(include_deleted=True)
+    for id_, name, deleted_at in db.execute(query):
+        key = _normalize(name)
+        if key not in names or names[key] in deleted:
+            names[key] = id_
+        if deleted_at is not None:
+            deleted.add(id_)
+    return names, deleted
+
+def _resolve(db: Session, cache: dict[str, int], deleted: set[int], model, name_attr: str, name: str | None) -> int | None:
+    """Busca o id pelo nome no mapa; se não existir, cadastra e guarda no mapa"""
+    if not name:
+        return None
+    key = _normalize(name)
+    if key not in cache:
+        # ON CONFLICT DO NOTHING: se outra importação ou um formulário cadastrou
+        # o mesmo nome agora há pouco, usa o dele em vez de desfazer a importação
+        column = getattr(model, name_attr)
+        cache[key] = db.execute(
+            backend_for(db).upsert(model).values({name_attr: name})
+            .on_conflict_do_nothing(index_elements=[column])
+            .returning(model.id)
+        ).scalar()
+        if cache[key] is None:
+            cache[key] = db.scalar(select(model.id).where(column == name).execution_options(include_deleted=True))
+    elif cache[key] in deleted:
+        # Excluído e ainda não apagado pela limpeza: volta a valer
+        db.execute(restore_statement(model, [cache[key]]))
+        deleted.discard(cache[key])
+    return cache[key]
+
+# --- Importação ---
+
+def import_employees_xlsx(
+    db: Session,
+    file: BinaryIO,
+    batch_size: int = config.IMPORT_BATCH_SIZE,
+    progress: Callable[[int, int | None], None] | None = None,
+) -> dict:
+    """
+    Importa funcionários de um .xlsx lendo linha a linha (modo read-only do openpyxl).
+    As linhas válidas são inseridas em lotes de 'batch_size', todas na mesma transação.
+    'progress(linhas_lidas, total)' é chamado a cada 'batch_size' linhas (tarefas em
+    segundo plano); uma exceção levantada por ele desfaz a importação inteira.
+    Retorna o relatório {"imported", "skipped", "errors"} usado em employees/import.html.
+    """
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ImportFileError("Arquivo .xlsx inválido") from exc
+
+    report = {"imported": 0, "skipped": 0, "errors": []}
+
+    def reject(row_number: int, message: str):
+        report["skipped"] += 1
+        if len(report["errors"]) < config.IMPORT_MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_number, "error": message})
+
+    try:
+        sheet = workbook.active
+        # Total pela dimensão gravada na planilha (pode faltar em arquivos de outros programas)
+        total = sheet.max_row - 1 if sheet.max_row else None
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ImportFileError("A planilha está vazia")
+
+        index = {}
+        for position, title in enumerate(header):
+            field = COLUMNS.get(_normalize(title))
+            if field and field not in index:
+                index[field] = position
+        if "name" not in index or "email" not in index:
+            raise ImportFileError("Cabeçalho deve conter as colunas Nome e Email")
+
+        def cell(row, field):
+            position = index.get(field)
+            if position is None or position >= len(row):
+                return None
+            return row[position]
+
+        departments, deleted_departments = _name_map(db, Department, "name")
+        positions, deleted_positions = _name_map(db, Position, "title")
+        # Só os emails vistos nesta planilha; os já cadastrados são consultados
+        # por lote no flush() (evita violar o UNIQUE sem carregar a tabela toda)
+        seen_emails = set()
+
+        table = Employee.__table__
+        backend = backend_for(db)
+        pending = []  # (linha, valores, departamento, cargo)
+
+        def flush():
+            if not pending:
+                return
+            # Emails do lote já cadastrados (inclusive de excluídos ainda não apagados)
+            taken = set(db.scalars(
+                select(Employee.email)
+                .where(Employee.email.in_([values["email"] for _, values, _, _ in pending]))
+                .execution_options(include_deleted=True)
+            ))
+            batch = []
+            for row_number, values, department, position in pending:
+                if values["email"] in taken:
+                    reject(row_number, f"Email '{values['email']}' já cadastrado")
+                    continue
+                # Resolvidos só para as linhas aceitas (uma rejeitada não cadastra departamento)
+                values["department_id"] = _resolve(db, departments, deleted_departments, Department, "name", department)
+                values["position_id"] = _resolve(db, positions, deleted_positions, Position, "title", position)
+                batch.append(values)
+            pending.clear()
+            if batch:
+                # Salários convertidos de uma vez, a coluna inteira do lote
+                # (a coluna Money arredonda para centavos ao gravar)
+                for values, salary in zip(batch, parse_brl_prices([values["salary"] for values in batch])):
+                    values["salary"] = salary
+                # executemany no SQLite, COPY no PostgreSQL (app/backends.py)
+                backend.bulk_insert(db, table, batch)
+                report["imported"] += len(batch)
+
+        # Índice de busca e agregados atualizados uma vez no fim, não a cada linha
+        with deferred_search_index(db), deferred_aggregates(db):
+            for row_number, row in enumerate(rows, start=2):
+                if progress is not None and (row_number - 1) % batch_size == 0:
+                    progress(row_number - 1, total)
+                if all(value is None for value in row):
+                    continue
+
+                name = _cell_text(cell(row, "name"))
+                email = _cell_text(cell(row, "email"))
+                if not name or not email:
+                    reject(row_number, "Nome e Email são obrigatórios")
+                    continue
+                if email in seen_emails:
+                    reject(row_number, f"Email '{email}' já cadastrado")
+                    continue
+                seen_emails.add(email)
+
+                pending.append((row_number, {
+                    "name": name,
+                    "email": email,
+                    "phone": _cell_text(cell(row, "phone")),
+                    "salary": cell(row, "salary"),  # convertido no flush()
+                }, _cell_text(cell(row, "department")), _cell_text(cell(row, "position"))))
+                if len(pending) >= batch_size:
+                    flush()
+
+            flush()
+        db.commit()
+        # As recusas por email já cadastrado saem no flush(), depois das do lote
+        report["errors"].sort(key=lambda error: error["row"])
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        workbook.close()
+
+    return report
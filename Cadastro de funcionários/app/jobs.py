@@ -0,0 +1,592 @@
+# app/jobs.py
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, NamedTuple
+
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, Text, delete, func, insert, select, update
+from sqlalchemy.engine import Engine
+
+from app import config
+from app.aggregates import rebuild_aggregates, refresh_medians
+from app.audit import set_actor
+from app.database import SessionLocal, create_db_engine, engine
+from app.exporters import export_employees_file
+from app.filters import apply_employee_filters
+from app.fragments import fragment_cache
+from app.importer import import_employees_xlsx
+from app.models import Employee
+from app.refdata import reference_data
+from app.search import rebuild_search_index
+from app.softdelete import purge_deleted
+
+logger = logging.getLogger(__name__)
+
+# --- Tarefas em segundo plano ---
+# Importações, exportações e recálculos longos não rodam dentro do request
+# (o proxy desistiria antes do fim e o worker ficaria ocupado): a rota grava
+# a tarefa na tabela 'jobs' e responde na hora com o id.
+# Em cada worker web (ou em 'python -m app.jobs worker'), o JobRunner é uma
+# task asyncio que pega a próxima tarefa da fila (UPDATE atômico: dois
+# processos nunca pegam a mesma) e a executa em uma thread própria, fora do
+# threadpool das rotas.
+# A tarefa informa o progresso por JobContext.progress(), que é também onde
+# ela percebe um cancelamento (POST /jobs/{id}/cancel). O status fica em
+# GET /jobs/{id}, consultado pelas páginas enquanto a tarefa roda.
+# Tarefas de um worker que caiu param de dar sinal de vida e voltam para a
+# fila (até JOB_MAX_ATTEMPTS vezes).
+
+_metadata = MetaData()
+
+jobs = Table(
+    "jobs",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("kind", String(50), nullable=False),
+    Column("status", String(20), nullable=False),    # queued, running, done, failed, cancelled
+    Column("params", Text, nullable=False),          # JSON
+    Column("owner", String(50), nullable=True),      # usuário que criou a tarefa
+    Column("progress", Integer, nullable=False, default=0),
+    Column("total", Integer, nullable=True),
+    Column("message", String(200), nullable=True),
+    Column("result", Text, nullable=True),           # JSON
+    Column("error", Text, nullable=True),
+    Column("cancel_requested", Boolean, nullable=False, default=False),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("worker", String(100), nullable=True),    # host:pid de quem está executando
+    Column("created_at", DateTime, nullable=False),  # UTC
+    Column("started_at", DateTime, nullable=True),
+    Column("heartbeat_at", DateTime, nullable=True),
+    Column("finished_at", DateTime, nullable=True),
+    Index("ix_jobs_status", "status", "id"),
+)
+
+jobs_engine: Engine = create_db_engine(config.JOBS_DATABASE_URL) if config.JOBS_DATABASE_URL else engine
+
+def create_jobs_table():
+    """Cria a tabela no banco da fila (chamado pelo setup_schema)"""
+    with jobs_engine.begin() as conn:
+        jobs.create(conn, checkfirst=True)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Nomes exibidos nas páginas
+KIND_LABELS = {
+    "import_employees": "Importação de funcionários",
+    "export_employees": "Exportação de funcionários",
+    "rebuild_aggregates": "Recálculo do painel",
+    "rebuild_search": "Reindexação da busca",
+    "purge_deleted": "Limpeza dos registros excluídos",
+}
+
+def files_dir() -> str:
+    """Pasta das planilhas enviadas e dos arquivos gerados pelas tarefas"""
+    path = config.JOB_FILES_DIR or os.path.join(tempfile.gettempdir(), "cadastro-jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    status: str
+    params: dict
+    owner: str | None
+    progress: int
+    total: int | None
+    message: str | None
+    result: dict | None
+    error: str | None
+    cancel_requested: bool
+    attempts: int
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+    @classmethod
+    def from_row(cls, row) -> "Job":
+        return cls(
+            id=row.id,
+            kind=row.kind,
+            status=row.status,
+            params=json.loads(row.params),
+            owner=row.owner,
+            progress=row.progress,
+            total=row.total,
+            message=row.message,
+            result=json.loads(row.result) if row.result else None,
+            error=row.error,
+            cancel_requested=bool(row.cancel_requested),
+            attempts=row.attempts,
+            created_at=row.created_at,
+            started_at=row.started_at,
+            finished_at=row.finished_at,
+        )
+
+    def as_dict(self) -> dict:
+        """Corpo de GET /jobs/{id}"""
+        if self.status == DONE:
+            percent = 100
+        elif self.total:
+            percent = min(99, self.progress * 100 // self.total)
+        else:
+            percent = None
+        result = dict(self.result) if self.result else None
+        if result and result.get("file"):
+            result["download_url"] = f"/jobs/{self.id}/download"
+            del result["file"]  # o caminho no servidor não sai daqui
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "label": KIND_LABELS.get(self.kind, self.kind),
+            "status": self.status,
+            "progress": self.progress,
+            "total": self.total,
+            "percent": percent,
+            "message": self.message,
+            "result": result,
+            "error": self.error,
+            "cancel_requested": self.cancel_requested,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+# --- Fila ---
+
+def submit(kind: str, params: dict | None = None, owner: str | None = None) -> int:
+    """Coloca a tarefa na fila e retorna o id (a rota responde na hora)"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Tarefa desconhecida: {kind}")
+    with jobs_engine.begin() as conn:
+        job_id = conn.execute(insert(jobs).values(
+            kind=kind,
+            status=QUEUED,
+            params=json.dumps(params or {}, ensure_ascii=False),
+            owner=owner,
+            progress=0,
+            cancel_requested=False,
+            attempts=0,
+            created_at=_now(),
+        )).inserted_primary_key[0]
+    job_runner.wake()
+    return job_id
+
+def submit_once(kind: str, params: dict | None = None, owner: str | None = None) -> int:
+    """Como submit(), mas reaproveita uma tarefa igual que ainda está na fila"""
+    encoded = json.dumps(params or {}, ensure_ascii=False)
+    with jobs_engine.connect() as conn:
+        job_id = conn.scalar(
+            select(jobs.c.id)
+            .where(jobs.c.status == QUEUED, jobs.c.kind == kind, jobs.c.params == encoded)
+            .limit(1)
+        )
+    return job_id if job_id is not None else submit(kind, params, owner)
+
+def get_job(job_id: int) -> Job | None:
+    with jobs_engine.connect() as conn:
+        row = conn.execute(select(jobs).where(jobs.c.id == job_id)).first()
+    return Job.from_row(row) if row else None
+
+def cancel_job(job_id: int) -> Job | None:
+    """Na fila: cancela na hora. Em execução: a tarefa para no próximo progress()"""
+    with jobs_engine.begin() as conn:
+        conn.execute(
+            update(jobs)
+            .where(jobs.c.id == job_id, jobs.c.status == QUEUED)
+            .values(status=CANCELLED, finished_at=_now(), message="Cancelada antes de começar")
+        )
+        conn.execute(
+            update(jobs)
+            .where(jobs.c.id == job_id, jobs.c.status == RUNNING)
+            .values(cancel_requested=True, message="Cancelando...")
+        )
+    return get_job(job_id)
+
+def claim_next(worker: str) -> Job | None:
+    """Pega a tarefa mais antiga da fila (UPDATE condicional: só um processo consegue)"""
+    now = _now()
+    oldest = (
+        select(jobs.c.id)
+        .where(jobs.c.status == QUEUED)
+        .order_by(jobs.c.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)  # PostgreSQL; o SQLite já serializa as escritas
+        .scalar_subquery()
+    )
+    with jobs_engine.begin() as conn:
+        row = conn.execute(
+            update(jobs)
+            .where(jobs.c.id == oldest, jobs.c.status == QUEUED)
+            .values(status=RUNNING, worker=worker, started_at=now, heartbeat_at=now, attempts=jobs.c.attempts + 1)
+            .returning(*jobs.c)
+        ).first()
+    return Job.from_row(row) if row else None
+
+def _finish(job_id: int, status: str, result: dict | None = None, error: str | None = None, message: str | None = None):
+    values = {"status": status, "finished_at": _now(), "message": message, "error": error}
+    if result is not None:
+        values["result"] = json.dumps(result, ensure_ascii=False, default=str)
+    if status == DONE:
+        values["progress"] = func.coalesce(jobs.c.total, jobs.c.progress)
+    with jobs_engine.begin() as conn:
+        conn.execute(update(jobs).where(jobs.c.id == job_id, jobs.c.status == RUNNING).values(**values))
+
+def _requeue(job_id: int, message: str):
+    """Devolve para a fila (ou falha de vez depois de JOB_MAX_ATTEMPTS tentativas)"""
+    with jobs_engine.begin() as conn:
+        conn.execute(
+            update(jobs)
+            .where(jobs.c.id == job_id, jobs.c.status == RUNNING, jobs.c.attempts < config.JOB_MAX_ATTEMPTS)
+            .values(status=QUEUED, worker=None, message=message)
+        )
+        conn.execute(
+            update(jobs)
+            .where(jobs.c.id == job_id, jobs.c.status == RUNNING)
+            .values(status=FAILED, finished_at=_now(), error=f"{message} ({config.JOB_MAX_ATTEMPTS} tentativas)")
+        )
+
+def _remove_file(name: str | None):
+    if name:
+        try:
+            os.remove(os.path.join(files_dir(), name))
+        except FileNotFoundError:
+            pass
+
+def cleanup(retention_hours: int = config.JOB_RETENTION_HOURS) -> int:
+    """Apaga as tarefas terminadas há mais de 'retention_hours' e seus arquivos"""
+    cutoff = _now() - timedelta(hours=retention_hours)
+    with jobs_engine.begin() as conn:
+        old = conn.execute(
+            select(jobs.c.id, jobs.c.params, jobs.c.result)
+            .where(jobs.c.status.in_(FINISHED), jobs.c.finished_at < cutoff)
+        ).all()
+        if old:
+            conn.execute(delete(jobs).where(jobs.c.id.in_([row.id for row in old])))
+    for row in old:
+        _remove_file(json.loads(row.params).get("file"))
+        _remove_file(json.loads(row.result).get("file") if row.result else None)
+    return len(old)
+
+# --- Execução ---
+
+class JobCancelled(Exception):
+    """O usuário cancelou a tarefa"""
+
+class JobInterrupted(Exception):
+    """O worker está desligando: a tarefa desfaz o que fez e volta para a fila"""
+
+class JobContext:
+    """Passado para cada tarefa: progresso, cancelamento e o próprio Job"""
+
+    def __init__(self, job: Job, runner: "JobRunner"):
+        self.job = job
+        self._runner = runner
+        self._reported_at = 0.0
+
+    def progress(self, done: int, total: int | None = None, message: str | None = None, force: bool = False):
+        """
+        Grava o progresso (no máximo a cada JOB_PROGRESS_INTERVAL_MS) e levanta
+        JobCancelled/JobInterrupted se a tarefa deve parar. As tarefas fazem
+        tudo em uma transação, então parar aqui desfaz o que já foi feito.
+        """
+        if self._runner.interrupting:
+            raise JobInterrupted()
+        now = time.monotonic()
+        if not force and now - self._reported_at < config.JOB_PROGRESS_INTERVAL_MS / 1000:
+            return
+        self._reported_at = now
+        values = {"progress": done, "heartbeat_at": _now()}
+        if total is not None:
+            values["total"] = total
+        if message is not None:
+            values["message"] = message[:200]
+        with jobs_engine.begin() as conn:
+            cancel = conn.execute(
+                update(jobs).where(jobs.c.id == self.job.id).values(**values).returning(jobs.c.cancel_requested)
+            ).scalar()
+        if cancel:
+            raise JobCancelled()
+
+# Tipo da tarefa -> função(context, params) que retorna o resultado (dict, gravado em JSON)
+HANDLERS: dict[str, Callable[[JobContext, dict], dict | None]] = {}
+
+def job_handler(kind: str):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+class JobRunner:
+    """
+    Task asyncio que consulta a fila e executa até 'workers' tarefas ao mesmo
+    tempo, cada uma em uma thread. Iniciada no lifespan do main.py ou pelo
+    'python -m app.jobs worker'.
+    """
+
+    def __init__(self, workers: int = config.JOB_WORKERS, poll_interval_ms: int = config.JOB_POLL_INTERVAL_MS):
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval_ms / 1000
+        self.worker_id = None
+        self.interrupting = False
+        self._stopping = False
+        self._running: set[int] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._next_cleanup = 0.0
+        self._next_aggregates = 0.0
+
+    def start(self):
+        """Inicia a task no event loop atual"""
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.interrupting = self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        """Avisa que há tarefa nova (pode ser chamado de qualquer thread)"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake.set)
+
+    def stats(self) -> dict:
+        return {"worker": self.worker_id, "running": sorted(self._running), "slots": self.workers}
+
+    async def stop(self, timeout: float = config.JOB_SHUTDOWN_TIMEOUT):
+        """
+        Para de pegar tarefas e interrompe as que estão rodando: cada uma desfaz
+        o lote no próximo progress() e volta para a fila, para outro worker
+        (ou o próximo start) terminar.
+        """
+        if self._task is None:
+            return
+        self._stopping = self.interrupting = True
+        self._wake.set()
+        await self._task
+        deadline = time.monotonic() + timeout
+        while self._running and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._running:
+            # Voltam para a fila quando o sinal de vida expirar (JOB_STALE_SECONDS)
+            logger.warning("Tarefas ainda em execução no desligamento: %s", sorted(self._running))
+        self._task = self._loop = None
+
+    async def _run(self):
+        next_maintenance = 0.0
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                if time.monotonic() >= next_maintenance:
+                    await asyncio.to_thread(self._maintenance, list(self._running))
+                    next_maintenance = time.monotonic() + config.JOB_HEARTBEAT_SECONDS
+                while len(self._running) < self.workers and not self._stopping:
+                    job = await asyncio.to_thread(claim_next, self.worker_id)
+                    if job is None:
+                        break
+                    self._running.add(job.id)
+                    threading.Thread(target=self._execute, args=(job,), name=f"job-{job.id}", daemon=True).start()
+            except Exception:
+                logger.exception("Falha ao consultar a fila de tarefas")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _execute(self, job: Job):
+        # Roda na thread da tarefa
+        set_actor(job.owner)  # autor das alterações no histórico (app/audit.py)
+        final = True
+        try:
+            result = HANDLERS[job.kind](JobContext(job, self), job.params)
+            _finish(job.id, DONE, result=result)
+        except JobCancelled:
+            _finish(job.id, CANCELLED, message="Cancelada")
+        except JobInterrupted:
+            final = False
+            _requeue(job.id, "Interrompida pelo desligamento do servidor")
+        except Exception as exc:
+            logger.exception("Tarefa %s (%s) falhou", job.id, job.kind)
+            _finish(job.id, FAILED, error=str(exc) or type(exc).__name__)
+        finally:
+            if final:
+                _remove_file(job.params.get("file"))  # a planilha enviada não é mais necessária
+            try:
+                self._loop.call_soon_threadsafe(self._finished, job.id)
+            except (AttributeError, RuntimeError):
+                self._running.discard(job.id)  # event loop já encerrado
+
+    def _finished(self, job_id: int):
+        self._running.discard(job_id)
+        self._wake.set()
+
+    def _maintenance(self, running: list[int]):
+        now = _now()
+        stale = now - timedelta(seconds=config.JOB_STALE_SECONDS)
+        with jobs_engine.begin() as conn:
+            if running:
+                conn.execute(
+                    update(jobs).where(jobs.c.id.in_(running), jobs.c.status == RUNNING).values(heartbeat_at=now)
+                )
+            # Worker que caiu no meio da tarefa: volta para a fila ou falha de vez
+            conn.execute(
+                update(jobs)
+                .where(jobs.c.status == RUNNING, jobs.c.heartbeat_at < stale, jobs.c.attempts < config.JOB_MAX_ATTEMPTS)
+                .values(status=QUEUED, worker=None, message="Reiniciada: o worker parou de responder")
+            )
+            conn.execute(
+                update(jobs)
+                .where(jobs.c.status == RUNNING, jobs.c.heartbeat_at < stale)
+                .values(status=FAILED, finished_at=now, error="O worker parou de responder")
+            )
+        if time.monotonic() >= self._next_cleanup:
+            self._next_cleanup = time.monotonic() + 3600
+            removed = cleanup()
+            if removed:
+                logger.info("%d tarefas antigas apagadas", removed)
+        if time.monotonic() >= self._next_aggregates:
+            self._next_aggregates = time.monotonic() + config.AGGREGATES_REFRESH_SECONDS
+            self._refresh_aggregates()
+
+    def _refresh_aggregates(self):
+        """Medianas desatualizadas do painel (a leitura do painel não recalcula nada)"""
+        try:
+            with SessionLocal() as db:
+                refresh_medians(db)
+                db.commit()
+        except Exception:
+            # Na próxima rodada tenta de novo; o painel segue com a mediana anterior
+            logger.exception("Falha ao recalcular as medianas do painel")
+
+job_runner = JobRunner()
+
+# --- Tarefas ---
+
+@job_handler("import_employees")
+def _import_employees(context: JobContext, params: dict) -> dict:
+    """Importa a planilha salva em files_dir() (params: file, batch_size)"""
+    path = os.path.join(files_dir(), params["file"])
+    with SessionLocal() as db, open(path, "rb") as file:
+        report = import_employees_xlsx(
+            db, file,
+            batch_size=params.get("batch_size", config.IMPORT_BATCH_SIZE),
+            progress=context.progress,
+        )
+    # A planilha pode ter criado (ou restaurado) departamentos/cargos:
+    # formulários e as páginas /departments e /positions
+    reference_data.invalidate()
+    fragment_cache.invalidate("departments", "positions")
+    return report
+
+@job_handler("export_employees")
+def _export_employees(context: JobContext, params: dict) -> dict:
+    """Gera o arquivo em files_dir(), baixado depois em /jobs/{id}/download (params: format, filters)"""
+    export_format = params["format"]
+    filters = params.get("filters", {})
+    with SessionLocal() as db:
+        total = db.scalar(select(func.count()).select_from(apply_employee_filters(select(Employee.id), filters).subquery()))
+    context.progress(0, total, force=True)
+
+    name = f"job-{context.job.id}.{export_format}"
+    path = os.path.join(files_dir(), name)
+    try:
+        rows = export_employees_file(export_format, filters, path, progress=lambda count: context.progress(count, total))
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return {"file": name, "filename": f"funcionarios.{export_format}", "format": export_format, "rows": rows}
+
+@job_handler("rebuild_aggregates")
+def _rebuild_aggregates(context: JobContext, params: dict) -> dict:
+    """Mesmo que 'python -m app.aggregates rebuild'"""
+    with engine.begin() as conn:
+        rebuild_aggregates(conn)
+    with SessionLocal() as db:
+        groups = refresh_medians(db)
+        db.commit()
+    return {"groups": groups}
+
+@job_handler("rebuild_search")
+def _rebuild_search(context: JobContext, params: dict) -> dict:
+    """Reconstrói o índice FTS5 da busca"""
+    if engine.dialect.name != "sqlite":
+        return {"skipped": True}
+    with engine.begin() as conn:
+        rebuild_search_index(conn)
+    return {}
+
+@job_handler("purge_deleted")
+def _purge_deleted(context: JobContext, params: dict) -> dict:
+    """
+    Apaga de vez o que foi excluído pelas rotas (app/softdelete.py).
+    Cada lote tem sua transação: cancelar ou desligar no meio mantém o que
+    já foi limpo, e a próxima execução continua dali.
+    """
+    return purge_deleted(
+        engine,
+        batch_size=params.get("batch_size", config.PURGE_BATCH_SIZE),
+        progress=context.progress,
+    )
+
+# --- Linha de comando ---
+
+async def _work():
+    """Processo dedicado às tarefas (com JOB_RUNNER=0 nos workers web)"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except NotImplementedError:
+            pass  # Windows: o Ctrl+C chega como KeyboardInterrupt
+    job_runner.start()
+    print(f"Executando tarefas ({job_runner.workers} por vez) como {job_runner.worker_id}. Ctrl+C para sair.")
+    try:
+        await stop.wait()
+    finally:
+        await job_runner.stop()
+
+def main(argv: list[str]) -> int:
+    from app.migrations import setup_schema
+
+    command = argv[0] if argv else "list"
+    if command == "worker":
+        setup_schema(engine)
+        try:
+            asyncio.run(_work())
+        except KeyboardInterrupt:
+            pass
+        return 0
+    create_jobs_table()
+    if command == "list":
+        with jobs_engine.connect() as conn:
+            rows = conn.execute(select(jobs).order_by(jobs.c.id.desc()).limit(20)).all()
+        for job in map(Job.from_row, rows):
+            total = f"/{job.total}" if job.total is not None else ""
+            print(f"{job.id:>6}  {job.status:<9}  {job.kind:<20}  {job.progress}{total}  {job.error or job.message or ''}")
+        return 0
+    if command == "submit" and len(argv) > 1 and argv[1] in HANDLERS:
+        print(f"Tarefa {submit(argv[1])} na fila.")
+        return 0
+    if command == "cancel" and len(argv) > 1:
+        job = cancel_job(int(argv[1]))
+        print(f"Tarefa {argv[1]}: {job.status if job else 'não encontrada'}")
+        return 0 if job else 1
+    print(f"Uso: python -m app.jobs [list|worker|submit <{'|'.join(HANDLERS)}>|cancel <id>]")
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,116 @@
+# app/listing.py
+from itertools import islice
+from typing import Iterator
+from urllib.parse import urlencode
+
+from sqlalchemy import select
+
+from app import config
+from app.database import SessionLocal
+from app.filters import apply_employee_filters
+from app.models import Employee
+
+# --- Listagem de funcionários em streaming ---
+# A página /employees é renderizada com Template.generate() enquanto as
+# linhas ainda estão chegando do banco (yield_per): o cabeçalho e as
+# primeiras linhas saem logo e a memória não cresce com o tamanho da lista,
+# mesmo na visão sem paginação (?paginate=false).
+# Os links "Anteriores/Próximos" ficam depois da tabela, então são
+# calculados durante a própria iteração (o template só os lê no fim).
+
+# Só as colunas exibidas na tabela (linhas leves em vez de objetos do ORM)
+LISTING_COLUMNS = (
+    Employee.id,
+    Employee.name,
+    Employee.email,
+    Employee.phone,
+    Employee.salary,
+    Employee.department_id,
+    Employee.position_id,
+)
+
+class EmployeeListing:
+    """
+    Linhas de /employees lidas sob demanda, em ordem decrescente de id.
+    Abre a própria sessão, pois é percorrida enquanto a resposta é enviada.
+    """
+
+    def __init__(
+        self,
+        filters: dict,
+        after: int | None = None,
+        before: int | None = None,
+        limit: int | None = config.EMPLOYEES_PAGE_SIZE,
+        chunk_size: int = config.EMPLOYEES_STREAM_CHUNK_ROWS,
+    ):
+        self.filters = filters
+        self.after = after
+        self.before = before
+        self.limit = limit  # None = sem paginação
+        self.chunk_size = chunk_size
+        self.first_id: int | None = None
+        self.last_id: int | None = None
+        self.has_more = False
+
+    def _query(self):
+        query = apply_employee_filters(select(*LISTING_COLUMNS), self.filters)
+        if self.before is not None:
+            # Voltando uma página: busca em ordem crescente e inverte depois
+            query = query.where(Employee.id > self.before).order_by(Employee.id.asc())
+        else:
+            if self.after is not None:
+                query = query.where(Employee.id < self.after)
+            query = query.order_by(Employee.id.desc())
+        if self.limit is not None:
+            # 1 registro a mais só para saber se existe outra página
+            query = query.limit(self.limit + 1)
+        return query.execution_options(yield_per=self.chunk_size)
+
+    def __iter__(self) -> Iterator:
+        db = SessionLocal()
+        try:
+            result = db.execute(self._query())
+            if self.before is not None:
+                # Página anterior: no máximo 'limit' + 1 linhas na memória
+                rows = list(islice(result, self.limit + 1))
+                self.has_more = len(rows) > self.limit
+                rows = rows[:self.limit]
+                rows.reverse()
+            else:
+                rows = result if self.limit is None else islice(result, self.limit + 1)
+            for count, row in enumerate(rows):
+                if self.limit is not None and count == self.limit:
+                    self.has_more = True
+                    break
+                if self.first_id is None:
+                    self.first_id = row.id
+                self.last_id = row.id
+                yield row
+        finally:
+            db.close()
+
+    # --- Navegação (válida depois de percorrer as linhas) ---
+
+    def _url(self, **cursor) -> str:
+        params = dict(self.filters)
+        if self.limit != config.EMPLOYEES_PAGE_SIZE:
+            params["limit"] = self.limit
+        return "/employees?" + urlencode({**params, **cursor})
+
+    @property
+    def next_url(self) -> str | None:
+        if self.limit is None or self.last_id is None:
+            return None
+        has_next = True if self.before is not None else self.has_more
+        return self._url(after=self.last_id) if has_next else None
+
+    @property
+    def prev_url(self) -> str | None:
+        if self.limit is None or self.first_id is None:
+            return None
+        has_prev = self.has_more if self.before is not None else self.after is not None
+        return self._url(before=self.first_id) if has_prev else None
+
+    @property
+    def all_url(self) -> str:
+        return "/employees?" + urlencode({**self.filters, "paginate": "false"})
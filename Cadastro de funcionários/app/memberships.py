@@ -0,0 +1,60 @@
+# app/memberships.py
+from sqlalchemy import delete, exists, func, literal, select
+
+from app.database import backend
+from app.filters import apply_employee_filters
+from app.models import Employee, employee_project_association as membership
+
+# --- Membros de projetos em lote ---
+# Adicionar/remover funcionários de um projeto vira um único statement na
+# tabela de associação, seja para um funcionário, uma lista de ids ou um
+# filtro ("todo o departamento X"). Nenhuma coleção é carregada no Python.
+
+def _selected_employees(employee_ids: list[int] | None, filters: dict | None):
+    """SELECT dos ids escolhidos: lista explícita e/ou filtros da listagem"""
+    # Explícito: o filtro automático de app/models.py só vale para SELECTs do
+    # ORM, e este vai dentro de um INSERT ... SELECT
+    query = select(Employee.id).where(Employee.deleted_at.is_(None))
+    if employee_ids is not None:
+        query = query.where(Employee.id.in_(employee_ids))
+    if filters is not None:
+        query = apply_employee_filters(query, filters)
+    return query
+
+def add_members_statement(project_id: int, employee_ids: list[int] | None = None, filters: dict | None = None):
+    """
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING na associação. Ignora ids
+    inexistentes e quem já é membro, então o rowcount é a quantidade
+    realmente adicionada.
+    """
+    # Colunas com os nomes da associação (o histórico em app/audit.py lê este SELECT)
+    selected = _selected_employees(employee_ids, filters).with_only_columns(
+        Employee.id.label("employee_id"), literal(project_id).label("project_id")
+    )
+    # O NOT EXISTS tira de antemão quem já é membro; o ON CONFLICT cobre duas
+    # inclusões ao mesmo tempo no mesmo projeto (ex: por departamento e por
+    # ids), que passariam as duas pelo NOT EXISTS e bateriam na chave primária
+    return backend.upsert(membership).from_select(
+        ["employee_id", "project_id"],
+        selected.where(~exists().where(
+            membership.c.project_id == project_id,
+            membership.c.employee_id == Employee.id,
+        )),
+    ).on_conflict_do_nothing(index_elements=[membership.c.employee_id, membership.c.project_id])
+
+def remove_members_statement(project_id: int, employee_ids: list[int] | None = None, filters: dict | None = None):
+    """DELETE ... WHERE employee_id IN (...); o rowcount é a quantidade removida"""
+    statement = delete(membership).where(membership.c.project_id == project_id)
+    if filters is None:
+        # Lista explícita: não precisa passar pela tabela de funcionários
+        return statement.where(membership.c.employee_id.in_(employee_ids or []))
+    return statement.where(membership.c.employee_id.in_(_selected_employees(employee_ids, filters)))
+
+def member_count_statement(project_id: int):
+    """Membros ativos: a junção com Employee leva o filtro de app/models.py"""
+    return (
+        select(func.count())
+        .select_from(membership)
+        .join(Employee, Employee.id == membership.c.employee_id)
+        .where(membership.c.project_id == project_id)
+    )
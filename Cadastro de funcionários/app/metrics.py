@@ -0,0 +1,243 @@
+# app/metrics.py
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# --- Métricas por request ---
+# Um middleware ASGI mede cada request e guarda, em um ContextVar, quantos
+# comandos SQL ele executou (eventos do SQLAlchemy), quanto tempo levaram,
+# quanto tempo foi gasto renderizando templates e no bcrypt.
+# O ContextVar acompanha o request no threadpool e no modo assíncrono.
+# Saídas: cabeçalho Server-Timing (respostas não enviadas em pedaços) e o texto do Prometheus
+# em /metrics. Comandos lentos e repetidos (N+1) vão para o log.
+
+# Limites (segundos) dos buckets do histograma de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RequestStats:
+    """Acumulado de um único request"""
+
+    __slots__ = ("sql_count", "sql_time", "template_time", "bcrypt_time", "statements")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.bcrypt_time = 0.0
+        self.statements: dict[str, int] = {}  # SQL -> execuções (para achar N+1)
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+class _RouteMetrics:
+    __slots__ = ("buckets", "count", "total", "sql_count", "sql_time", "template_time", "bcrypt_time")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # o último é o +Inf
+        self.count = 0
+        self.total = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.bcrypt_time = 0.0
+
+class MetricsRegistry:
+    """Totais do processo, por (método, rota, status)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: dict[tuple[str, str, str], _RouteMetrics] = {}
+        self.slow_queries = 0
+        self.nplusone = 0
+
+    def observe(self, method: str, route: str, status: int, elapsed: float, stats: RequestStats):
+        key = (method, route, str(status))
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = _RouteMetrics()
+            metrics.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            metrics.count += 1
+            metrics.total += elapsed
+            metrics.sql_count += stats.sql_count
+            metrics.sql_time += stats.sql_time
+            metrics.template_time += stats.template_time
+            metrics.bcrypt_time += stats.bcrypt_time
+
+    def count_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def count_nplusone(self):
+        with self._lock:
+            self.nplusone += 1
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+            self.slow_queries = 0
+            self.nplusone = 0
+
+    def render(self) -> str:
+        """Formato texto do Prometheus (text/plain; version=0.0.4)"""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            slow_queries, nplusone = self.slow_queries, self.nplusone
+
+        lines = [
+            "# HELP http_request_duration_seconds Latência dos requests por rota.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), metrics in routes:
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), metrics.buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {metrics.total}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+
+        counters = [
+            ("db_statements_total", "Comandos SQL executados, por rota.", "sql_count"),
+            ("db_statement_seconds_total", "Tempo gasto em comandos SQL, por rota.", "sql_time"),
+            ("template_render_seconds_total", "Tempo gasto renderizando templates, por rota.", "template_time"),
+            ("password_hash_request_seconds_total", "Tempo esperando o bcrypt (fila + hash), por rota.", "bcrypt_time"),
+        ]
+        for name, help_text, attribute in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (method, route, status), metrics in routes:
+                labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+                lines.append(f"{name}{{{labels}}} {getattr(metrics, attribute)}")
+
+        lines += [
+            "# HELP db_slow_statements_total Comandos SQL acima de SLOW_QUERY_MS.",
+            "# TYPE db_slow_statements_total counter",
+            f"db_slow_statements_total {slow_queries}",
+            "# HELP db_nplusone_total Requests com o mesmo comando SQL repetido (N+1).",
+            "# TYPE db_nplusone_total counter",
+            f"db_nplusone_total {nplusone}",
+        ]
+        return "\n".join(lines) + "\n"
+
+def render_gauges(prefix: str, values: dict, help_text: str) -> str:
+    """Valores avulsos (ex: password_hasher.stats()) como gauges do Prometheus"""
+    lines = []
+    for name, value in values.items():
+        lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+registry = MetricsRegistry()
+
+# --- Coleta: SQL ---
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("metrics_started_at", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started_at = conn.info.get("metrics_started_at")
+    if stats is None or not started_at:
+        return
+    elapsed = time.perf_counter() - started_at.pop()
+    stats.sql_count += 1
+    stats.sql_time += elapsed
+    stats.statements[statement] = stats.statements.get(statement, 0) + 1
+    if elapsed * 1000 >= config.SLOW_QUERY_MS:
+        registry.count_slow_query()
+        logger.warning("SQL lento (%.1f ms): %s", elapsed * 1000, " ".join(statement.split()))
+
+# --- Coleta: templates e bcrypt ---
+
+def record_template(elapsed: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.template_time += elapsed
+
+def record_bcrypt(elapsed: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.bcrypt_time += elapsed
+
+# --- Middleware ---
+
+def _route_name(scope) -> str:
+    """Caminho da rota ('/employees/{employee_id}'), não a URL, para não explodir os rótulos"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "(sem rota)"
+
+def _server_timing(elapsed: float, stats: RequestStats) -> str:
+    parts = [
+        f"app;dur={elapsed * 1000:.1f}",
+        f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.sql_count} SQL"',
+        f"tpl;dur={stats.template_time * 1000:.1f}",
+    ]
+    if stats.bcrypt_time:
+        parts.append(f"bcrypt;dur={stats.bcrypt_time * 1000:.1f}")
+    return ", ".join(parts)
+
+class MetricsMiddleware:
+    """Middleware ASGI puro (sem BaseHTTPMiddleware, que custa uma task extra por request)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started_at = time.perf_counter()
+        status_code = 500
+        start = None  # http.response.start, retido até o primeiro pedaço do corpo
+
+        async def send_wrapper(message):
+            nonlocal status_code, start
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                start = message
+                return
+            if start is not None:
+                # Corpo inteiro de uma vez: o Server-Timing já inclui template e SQL.
+                # Corpo em pedaços (StreamingResponse, templates em stream): o
+                # resto ainda vai rodar, então o cabeçalho ficaria com tpl/db
+                # quase zero; nesse caso só /metrics registra os tempos
+                if not (message["type"] == "http.response.body" and message.get("more_body", False)):
+                    elapsed = time.perf_counter() - started_at
+                    headers = list(start.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(elapsed, stats).encode("latin-1")))
+                    start = {**start, "headers": headers}
+                await send(start)
+                start = None
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            route = _route_name(scope)
+            registry.observe(scope["method"], route, status_code, elapsed, stats)
+            repeated = [(sql, count) for sql, count in stats.statements.items() if count >= config.NPLUSONE_THRESHOLD]
+            if repeated:
+                registry.count_nplusone()
+                for sql, count in repeated:
+                    logger.warning("Possível N+1 em %s %s: %d× %s", scope["method"], route, count, " ".join(sql.split()))
+            _current.reset(token)
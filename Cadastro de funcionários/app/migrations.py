@@ -0,0 +1,320 @@
+# app/migrations.py
+import hashlib
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, NamedTuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+
+from app.aggregates import create_aggregates, recreate_aggregates
+from app.audit import create_audit_log
+from app.cachesync import create_cache_versions
+from app.search import create_search_index
+
+# --- Migrações de esquema ---
+# O create_all só cria tabelas que ainda não existem: índices novos em uma
+# tabela antiga (ex: o test.db já em uso) nunca seriam criados.
+# Cada migração tem um número; as já aplicadas ficam em 'schema_migrations'
+# e as pendentes rodam em ordem, cada uma na sua transação.
+# Colunas novas (anuláveis) dos models entram antes, por add_missing_columns.
+# Roda no startup (main.py, via setup_schema) ou pela linha de comando:
+#   python -m app.migrations upgrade | status | check
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def _create_indexes(conn: Connection):
+    """Índices para os formatos reais das consultas (filtros, FKs, projetos)"""
+    statements = [
+        # Filtros da listagem e as FKs (também declarados em app/models.py)
+        "CREATE INDEX IF NOT EXISTS ix_employees_department_id ON employees (department_id)",
+        "CREATE INDEX IF NOT EXISTS ix_employees_position_id ON employees (position_id)",
+        # Caminho projeto -> funcionários (a PK só cobre funcionário -> projetos)
+        "CREATE INDEX IF NOT EXISTS ix_employee_project_association_project_id "
+        "ON employee_project_association (project_id, employee_id)",
+    ]
+    if conn.dialect.name == "sqlite":
+        # Sem diferenciar maiúsculas: atende o filtro por prefixo (LIKE 'ana%')
+        # e a ordenação por nome dos seletores de membros dos projetos
+        statements.append(
+            "CREATE INDEX IF NOT EXISTS ix_employees_name ON employees (name COLLATE NOCASE)"
+        )
+    else:
+        statements.append("CREATE INDEX IF NOT EXISTS ix_employees_name ON employees (name)")
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+
+def _soft_delete(conn: Connection):
+    """Índices parciais de 'deleted_at' e triggers do painel que ignoram linhas excluídas"""
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_employees_active ON employees (id) WHERE deleted_at IS NULL",
+        "CREATE INDEX IF NOT EXISTS ix_employees_deleted_at ON employees (deleted_at) WHERE deleted_at IS NOT NULL",
+    ):
+        conn.exec_driver_sql(statement)
+    recreate_aggregates(conn)
+
+def _postgresql(conn: Connection):
+    """
+    Bancos PostgreSQL criados antes de app/backends.py: as migrações 1 e 3
+    não criavam nada fora do SQLite. O nome passa a ser indexado em
+    lower(name), que é como o PostgreSQL compara sem diferenciar maiúsculas
+    (ordenação dos seletores e filtro por prefixo, em text_pattern_ops).
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    create_search_index(conn)
+    create_aggregates(conn)
+    for statement in (
+        "DROP INDEX IF EXISTS ix_employees_name",
+        "CREATE INDEX ix_employees_name ON employees (lower(name), id)",
+        "CREATE INDEX IF NOT EXISTS ix_employees_name_prefix ON employees (lower(name) text_pattern_ops)",
+    ):
+        conn.exec_driver_sql(statement)
+
+MIGRATIONS = [
+    Migration(1, "Índice de busca textual (FTS5)", create_search_index),
+    Migration(2, "Índices de FKs, nome e projeto -> funcionários", _create_indexes),
+    Migration(3, "Agregados de RH por departamento/cargo", create_aggregates),
+    Migration(4, "Contadores de invalidação de cache entre workers", create_cache_versions),
+    Migration(5, "Exclusão lógica: índices parciais e triggers do painel", _soft_delete),
+    Migration(6, "PostgreSQL: busca, painel e índice de nome sem maiúsculas", _postgresql),
+    Migration(7, "Painel: folha e mediana em centavos (inteiros)", recreate_aggregates),
+]
+
+# --- Execução ---
+
+def add_missing_columns(conn: Connection, metadata: MetaData) -> list[str]:
+    """
+    ALTER TABLE ... ADD COLUMN para as colunas dos models que faltam em tabelas
+    antigas (o create_all não mexe em tabela existente). Roda antes das
+    migrações, que podem depender delas. Só colunas anuláveis ou com default no banco.
+    """
+    inspector = inspect(conn)
+    added = []
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+def applied_versions(conn: Connection) -> set[int]:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.scalars(select(schema_migrations.c.version)))
+
+def upgrade(engine: Engine) -> list[Migration]:
+    """Aplica as migrações pendentes e retorna as que foram aplicadas"""
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done:
+            continue
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.now(timezone.utc),
+            ))
+        applied.append(migration)
+    return applied
+
+# --- Setup com vários workers ---
+# Cada worker roda o lifespan do main.py; sem um lock, dois processos
+# poderiam aplicar a mesma migração ao mesmo tempo. O serve.py faz o setup
+# uma vez antes de criar os workers e avisa pela variável SCHEMA_READY_ENV.
+# No PostgreSQL os workers podem estar em máquinas diferentes: o lock é um
+# advisory lock no próprio banco em vez do arquivo.
+
+SCHEMA_READY_ENV = "CADASTRO_SCHEMA_READY"
+SCHEMA_LOCK_KEY = 0x6361_6461  # chave do pg_advisory_lock ("cada")
+
+def _lock_path(engine: Engine) -> str:
+    """Um arquivo de lock por banco, na pasta temporária"""
+    digest = hashlib.sha1(str(engine.url).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"cadastro-schema-{digest}.lock")
+
+@contextmanager
+def file_lock(path: str):
+    """Lock exclusivo entre processos (flock no Linux/macOS, msvcrt no Windows)"""
+    with open(path, "a+b") as file:
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK desiste depois de ~10 s; tenta de novo
+            try:
+                yield
+            finally:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+@contextmanager
+def schema_lock(engine: Engine):
+    """Um setup de esquema por vez para o banco de 'engine'"""
+    if engine.dialect.name != "postgresql":
+        with file_lock(_lock_path(engine)):
+            yield
+        return
+    with engine.connect() as conn:
+        # Lock da sessão: vale até o unlock, mesmo com o commit abaixo
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+            conn.commit()
+
+def setup_schema(engine: Engine) -> list[Migration]:
+    """create_all + migrações pendentes, um processo por vez"""
+    from app.database import Base
+    from app.jobs import create_jobs_table
+    import app.models  # noqa: F401 (registra as tabelas no Base.metadata)
+
+    with schema_lock(engine):
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            add_missing_columns(conn, Base.metadata)
+        applied = upgrade(engine)
+        # O log de auditoria e a fila de tarefas podem estar em outros bancos
+        create_audit_log()
+        create_jobs_table()
+        return applied
+
+# --- Verificação dos planos de consulta ---
+
+# Consulta -> índice que o SQLite deve escolher para ela
+# (as consultas do ORM em 'employees' levam "deleted_at IS NULL", ver app/models.py).
+# Serve para conferir um banco de produção, com as estatísticas dele; as
+# consultas geradas pelo próprio código são conferidas em tests/test_query_plans.py
+PLAN_CHECKS = [
+    (
+        "SELECT id FROM employees WHERE department_id = 1 AND id < 100 AND deleted_at IS NULL "
+        "ORDER BY id DESC LIMIT 50",
+        "ix_employees_department_id",
+    ),
+    (
+        "SELECT id FROM employees WHERE position_id = 1 AND id < 100 AND deleted_at IS NULL "
+        "ORDER BY id DESC LIMIT 50",
+        "ix_employees_position_id",
+    ),
+    (
+        "SELECT id FROM employees WHERE name LIKE 'ana%' ESCAPE '/' AND deleted_at IS NULL "
+        "ORDER BY id DESC LIMIT 50",
+        "ix_employees_name",
+    ),
+    (
+        "SELECT id, name FROM employees WHERE deleted_at IS NULL ORDER BY name COLLATE NOCASE, id LIMIT 20",
+        "ix_employees_name",
+    ),
+    (
+        # Próxima página do seletor de funcionários de um projeto
+        "SELECT id, name FROM employees WHERE name COLLATE NOCASE >= 'ana' "
+        "AND (name COLLATE NOCASE > 'ana' OR id > 10) AND deleted_at IS NULL "
+        "ORDER BY name COLLATE NOCASE, id LIMIT 20",
+        "ix_employees_name",
+    ),
+    (
+        "SELECT employee_id FROM employee_project_association WHERE project_id = 1",
+        "ix_employee_project_association_project_id",
+    ),
+    (
+        # Listagem sem filtros e contagem dos ativos: só as linhas ativas, já em ordem de id
+        "SELECT id FROM employees WHERE deleted_at IS NULL ORDER BY id DESC LIMIT 50",
+        "ix_employees_active",
+    ),
+    (
+        "SELECT count(*) FROM employees WHERE deleted_at IS NULL",
+        "ix_employees_active",
+    ),
+    (
+        # Fila da tarefa de limpeza (só as linhas excluídas)
+        "SELECT id FROM employees WHERE deleted_at IS NOT NULL LIMIT 1000",
+        "ix_employees_deleted_at",
+    ),
+]
+
+def check_query_plans(engine: Engine) -> list[str]:
+    """Roda EXPLAIN QUERY PLAN nas consultas acima; retorna as que não usam o índice"""
+    if engine.dialect.name != "sqlite":
+        return []
+    failures = []
+    with engine.connect() as conn:
+        for sql, index_name in PLAN_CHECKS:
+            plan = " | ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+            if index_name not in plan:
+                failures.append(f"{sql}\n    esperado: {index_name}\n    plano: {plan}")
+    return failures
+
+# --- Linha de comando ---
+
+def main(argv: list[str]) -> int:
+    from app.database import engine
+
+    command = argv[0] if argv else "upgrade"
+    if command == "upgrade":
+        applied = setup_schema(engine)
+        for migration in applied:
+            print(f"Aplicada {migration.version}: {migration.description}")
+        if not applied:
+            print("Nenhuma migração pendente.")
+        return 0
+    if command == "status":
+        with engine.begin() as conn:
+            done = applied_versions(conn)
+        for migration in MIGRATIONS:
+            mark = "x" if migration.version in done else " "
+            print(f"[{mark}] {migration.version}: {migration.description}")
+        return 0
+    if command == "check":
+        if engine.dialect.name != "sqlite":
+            # Os planos esperados (EXPLAIN QUERY PLAN) são os do SQLite
+            print("Conferência de planos disponível só no SQLite.")
+            return 0
+        failures = check_query_plans(engine)
+        for failure in failures:
+            print(f"FALHOU: {failure}")
+        if not failures:
+            print(f"OK: {len(PLAN_CHECKS)} consultas usam os índices esperados.")
+        return 1 if failures else 0
+    print("Uso: python -m app.migrations [upgrade|status|check]")
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,14 +1,51 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table
-from sqlalchemy.orm import relationship 
+from decimal import Decimal
+from sqlalchemy import Column, DateTime, Integer, String, Numeric, ForeignKey, Table, Index, event, text
+from sqlalchemy.orm import Session, relationship, with_loader_criteria
+from sqlalchemy.types import TypeDecorator
 from app.database import Base
+from app.helpers import to_money
+
+# --- TIPOS ---
+class Money(TypeDecorator):
+    """
+    Valor em reais como Decimal com 2 casas (salários).
+    No PostgreSQL vira NUMERIC(12, 2), exato no próprio banco. O SQLite não tem
+    tipo decimal: guarda o número (REAL/INTEGER, que os triggers de
+    app/aggregates.py continuam somando) e a conversão para Decimal é feita
+    aqui, pela menor representação decimal do float, o que é exato em toda
+    a faixa do NUMERIC(12, 2).
+    """
+    impl = Numeric(12, 2)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(Numeric(12, 2, asdecimal=False))
+        return dialect.type_descriptor(Numeric(12, 2, asdecimal=True))
+
+    def process_bind_param(self, value, dialect):
+        value = to_money(value)
+        if value is not None and dialect.name == "sqlite":
+            return float(value)
+        return value
+
+    def process_result_value(self, value, dialect):
+        return to_money(value)
+
+    @property
+    def python_type(self):
+        return Decimal
 
 # --- TABELA DE ASSOCIAÇÃO (N-M) ---
 employee_project_association = Table(
     'employee_project_association',
     Base.metadata,
     Column('employee_id', Integer, ForeignKey('employees.id'), primary_key=True),
-    Column('project_id', Integer, ForeignKey('projects.id'), primary_key=True)
+    Column('project_id', Integer, ForeignKey('projects.id'), primary_key=True),
+    # A PK (employee_id, project_id) só atende "projetos de um funcionário";
+    # este índice atende o caminho inverso, "funcionários de um projeto"
+    Index('ix_employee_project_association_project_id', 'project_id', 'employee_id')
 )
 
 # --- Tabela 1: Departamentos ---
@@ -16,6 +53,7 @@ class Department(Base):
     __tablename__ = "departments"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, nullable=False)
+    deleted_at = Column(DateTime, nullable=True) # exclusão lógica (ver o fim do arquivo)
     employees = relationship("Employee", back_populates="department")
 
 # --- Tabela 2: Cargos (Position) ---
@@ -23,6 +61,7 @@ class Position(Base):
     __tablename__ = "positions"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), unique=True, nullable=False)
+    deleted_at = Column(DateTime, nullable=True) # exclusão lógica (ver o fim do arquivo)
     employees = relationship("Employee", back_populates="position")
 
 # --- Tabela 3: Funcionários (Employee) ---
@@ -32,13 +71,37 @@ class Employee(Base):
     name = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
     phone = Column(String(20), nullable=True)
-    salary = Column(Float, nullable=True, default=0.0)
+    salary = Column(Money, nullable=True, default=Decimal("0.00"))
     
-    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
-    position_id = Column(Integer, ForeignKey("positions.id"), nullable=True)
+    # Índices para os filtros da listagem e para as FKs
+    # (o índice de 'name' sem diferenciar maiúsculas é criado em app/migrations.py)
+    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True, index=True)
+    position_id = Column(Integer, ForeignKey("positions.id"), nullable=True, index=True)
     
     department = relationship("Department", back_populates="employees")
     position = relationship("Position", back_populates="employees")
+
+    # Concorrência otimista: todo UPDATE do ORM confere e incrementa a versão
+    # (WHERE id = ? AND version = ?); se outra pessoa gravou antes, nenhuma
+    # linha é alterada e a gravação falha em vez de sobrescrever.
+    # É o ETag das páginas do funcionário (ver PUT /employees/{id})
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    __mapper_args__ = {"version_id_col": version}
+
+    # Exclusão lógica (ver o fim do arquivo). Índices parciais: um com só as
+    # linhas ativas (contagens e a listagem sem filtros, em ordem de id) e um
+    # com só as excluídas, a fila da tarefa de limpeza
+    deleted_at = Column(DateTime, nullable=True)
+    __table_args__ = (
+        Index(
+            'ix_employees_active', 'id',
+            sqlite_where=text('deleted_at IS NULL'), postgresql_where=text('deleted_at IS NULL'),
+        ),
+        Index(
+            'ix_employees_deleted_at', 'deleted_at',
+            sqlite_where=text('deleted_at IS NOT NULL'), postgresql_where=text('deleted_at IS NOT NULL'),
+        ),
+    )
     
     # Relacionamento N-M com Projetos
     projects = relationship(
@@ -66,4 +129,30 @@ class Project(Base):
         "Employee",
         secondary=employee_project_association,
         back_populates="projects"
-    )
\ No newline at end of file
+    )
+
+# --- EXCLUSÃO LÓGICA ---
+# Excluir um funcionário, departamento ou cargo só preenche 'deleted_at'.
+# Todo SELECT do ORM (rotas, listagem, exportação, busca, painel, inclusive
+# relacionamentos e junções) recebe "deleted_at IS NULL" para esses modelos;
+# quem precisa ver as linhas excluídas usa .execution_options(include_deleted=True).
+# SQL escrito à mão (triggers, agregados, limpeza) filtra por conta própria.
+# As linhas são apagadas de vez pela tarefa 'purge_deleted' (app/softdelete.py).
+
+SOFT_DELETE_MODELS = (Department, Position, Employee)
+INCLUDE_DELETED = "include_deleted"
+
+_ACTIVE_ONLY = tuple(
+    with_loader_criteria(model, model.deleted_at.is_(None), include_aliases=True)
+    for model in SOFT_DELETE_MODELS
+)
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted(orm_state):
+    # (recarregar atributos de um objeto já carregado não filtra)
+    if (
+        orm_state.is_select
+        and not orm_state.is_column_load
+        and not orm_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        orm_state.statement = orm_state.statement.options(*_ACTIVE_ONLY)
@@ -0,0 +1,77 @@
+# app/refdata.py
+import threading
+from typing import NamedTuple
+
+from sqlalchemy import select
+
+from app.cachesync import cache_sync
+from app.models import Department, Position
+
+# --- Cache de dados de referência (departamentos e cargos) ---
+# São tabelas pequenas que quase nunca mudam, mas eram consultadas a cada
+# formulário e a cada página da listagem. Ficam em memória até que uma rota
+# de cadastro/exclusão chame invalidate(); a próxima leitura recarrega.
+# Os outros workers são avisados pelo app/cachesync.py.
+
+class DepartmentRef(NamedTuple):
+    id: int
+    name: str
+
+class PositionRef(NamedTuple):
+    id: int
+    title: str
+
+class ReferenceData(NamedTuple):
+    version: int
+    departments: tuple[DepartmentRef, ...]   # ordenados por nome
+    positions: tuple[PositionRef, ...]       # ordenados por título
+    department_names: dict[int, str]
+    position_titles: dict[int, str]
+
+class ReferenceDataCache:
+    def __init__(self):
+        self._data: ReferenceData | None = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    async def get(self, db) -> ReferenceData:
+        """Retorna os dados em cache, carregando do banco se necessário"""
+        data = self._data
+        if data is not None:
+            return data
+
+        version = self._version
+        departments = tuple(
+            DepartmentRef(*row)
+            for row in await db.execute(select(Department.id, Department.name).order_by(Department.name))
+        )
+        positions = tuple(
+            PositionRef(*row)
+            for row in await db.execute(select(Position.id, Position.title).order_by(Position.title))
+        )
+        data = ReferenceData(
+            version=version,
+            departments=departments,
+            positions=positions,
+            department_names={dept.id: dept.name for dept in departments},
+            position_titles={pos.id: pos.title for pos in positions},
+        )
+        with self._lock:
+            # Se houve um invalidate() durante a carga, estes dados já nasceram velhos
+            if self._version == version:
+                self._data = data
+        return data
+
+    def invalidate(self, publish: bool = True):
+        with self._lock:
+            self._version += 1
+            self._data = None
+        if publish:
+            cache_sync.publish("refdata")
+
+reference_data = ReferenceDataCache()
+cache_sync.register("refdata", lambda: reference_data.invalidate(publish=False))
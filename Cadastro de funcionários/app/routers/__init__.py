@@ -7,6 +7,9 @@ from .positions import router as positions_router
 # --- NOVAS IMPORTAÇÕES ---
 from .auth import router as auth_router
 from .projects import router as projects_router
+from .api import router as api_router
+from .dashboard import router as dashboard_router
+from .jobs import router as jobs_router
 
 
 # "Exporte" os routers para que o main.py possa encontrá-los
@@ -17,4 +20,7 @@ __all__ = [
     # --- NOVAS EXPORTAÇÕES ---
     "auth_router",
     "projects_router",
+    "api_router",
+    "dashboard_router",
+    "jobs_router",
 ]
\ No newline at end of file
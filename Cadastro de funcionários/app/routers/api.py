@@ -0,0 +1,98 @@
+# app/routers/api.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from starlette import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import CachedUser, get_current_user_from_api
+from app.batch import apply_employee_batch
+from app.database import get_async_db
+from app.aggregates import load_dashboard
+from app.fragments import fragment_cache
+from app.jobs import submit_once
+from app.memberships import add_members_statement, member_count_statement, remove_members_statement
+from app.models import Project
+from app.schemas import BatchResult, EmployeeBatch, MembershipChange, MembershipResult
+
+# --- API JSON para integrações ---
+# Mesma base das telas, mas sem HTML: entrada e saída em JSON, com
+# autenticação por 'Authorization: Bearer <token>' (ou o cookie de sempre).
+
+router = APIRouter(prefix="/api/v1", tags=["api"])
+
+# --- LOTE DE FUNCIONÁRIOS (PROTEGIDO) ---
+@router.post("/employees/batch", response_model=BatchResult)
+async def employees_batch(
+    operations: EmployeeBatch,
+    response: Response,
+    atomic: bool = Query(False),  # True: qualquer erro desfaz o lote inteiro
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_api),
+):
+    """
+    Recebe um array de operações, ex:
+    [{"op": "create", "name": "Ana", "email": "ana@x.com"},
+     {"op": "update", "id": 7, "salary": 4500},
+     {"op": "delete", "id": 9}]
+    Tudo roda em uma única transação; o resultado traz uma entrada por operação.
+    Um 'update' com "version" só é aplicado se o funcionário ainda estiver
+    nessa versão (a devolvida no resultado de cada inclusão/atualização);
+    alterado por outro request durante o lote, o item volta com erro.
+    """
+    try:
+        result = await db.run_sync(apply_employee_batch, operations, atomic)
+        if result.applied:
+            await db.commit()
+        else:
+            await db.rollback()
+    except Exception:
+        await db.rollback()
+        raise
+
+    if not result.applied:
+        response.status_code = status.HTTP_409_CONFLICT
+    elif any(item.op == "delete" and item.status == "ok" for item in result.results):
+        fragment_cache.invalidate("projects") # podem ter saído de algum projeto
+        await run_in_threadpool(submit_once, "purge_deleted", None, current_user.username)
+    return result
+
+# --- MEMBROS DE PROJETO EM LOTE (PROTEGIDO) ---
+@router.post("/projects/{project_id}/members", response_model=MembershipResult)
+async def change_project_members(
+    project_id: int,
+    change: MembershipChange,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_api),
+):
+    """
+    Adiciona ou remove vários funcionários de uma vez, ex:
+    {"action": "add", "employee_ids": [1, 2, 3]}
+    {"action": "add", "filter": {"department_id": 4}}
+    Um único INSERT ... SELECT / DELETE na associação; quem já é membro é ignorado.
+    """
+    if await db.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Projeto não encontrado")
+
+    filters = change.filter.as_filters() if change.filter else None
+    build = add_members_statement if change.action == "add" else remove_members_statement
+    result = await db.execute(build(project_id, employee_ids=change.employee_ids, filters=filters))
+    members = await db.scalar(member_count_statement(project_id))
+    await db.commit()
+
+    if result.rowcount:
+        fragment_cache.invalidate("projects") # a lista mostra a quantidade de membros
+    return MembershipResult(project_id=project_id, action=change.action, changed=result.rowcount, members=members)
+
+# --- PAINEL DE RH (PROTEGIDO) ---
+@router.get("/dashboard")
+async def dashboard_data(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_api),
+):
+    """Mesmos números da página /dashboard, em JSON"""
+    stats = await load_dashboard(db)
+    return {
+        "total": stats["total"]._asdict(),
+        "departments": [group._asdict() for group in stats["departments"]],
+        "positions": [group._asdict() for group in stats["positions"]],
+    }
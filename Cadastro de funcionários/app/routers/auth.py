@@ -1,24 +1,22 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Request, Depends, Form, HTTPException, Response
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from starlette import status
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from pathlib import Path
 
 # Segurança e Autenticação
 from app.auth import (
     create_access_token, 
-    get_password_hash, 
-    verify_password
+    token_cache
 )
+from app.security import password_hasher
 from app.database import get_db
+from app.templating import templates
 from app import models
 
 router = APIRouter()
-TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
 # --- Rota 1: Página de Login (GET) ---
 @router.get("/login", response_class=HTMLResponse, tags=["Auth"])
@@ -31,16 +29,20 @@ def login_form(request: Request, error: str = None, message: str = None):
 
 # --- Rota 2: Processar o Login (POST) ---
 # <<< CORRIGIDA >>>
+# O bcrypt roda no pool dedicado (app/security.py), então a rota é 'async'
+# e não ocupa uma thread do threadpool enquanto espera o hash.
 @router.post("/login", tags=["Auth"])
-def login_via_form_data(
+async def login_via_form_data(
     db: Session = Depends(get_db),
     username: str = Form(...),
     password: str = Form(...)
     # Removemos 'response: Response' dos parâmetros
 ):
-    user = db.scalar(select(models.User).where(models.User.username == username))
+    user = await run_in_threadpool(
+        db.scalar, select(models.User).where(models.User.username == username)
+    )
     
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await password_hasher.verify(password, user.hashed_password):
         # Falha: Redireciona de volta para /login com erro
         return RedirectResponse(
             url="/login?error=Usuário ou senha inválidos", 
@@ -75,22 +77,24 @@ def register_form(request: Request, error: str = None):
 
 # --- Rota 4: Processar o Registro (POST) ---
 @router.post("/register", tags=["Auth"])
-def register_user(
+async def register_user(
     username: str = Form(...), 
     password: str = Form(...),
     db: Session = Depends(get_db)
 ):
-    existing_user = db.scalar(select(models.User).where(models.User.username == username))
+    existing_user = await run_in_threadpool(
+        db.scalar, select(models.User).where(models.User.username == username)
+    )
     if existing_user:
         return RedirectResponse(
             url="/register?error=Nome de usuário já existe", 
             status_code=status.HTTP_303_SEE_OTHER
         )
     
-    hashed_pass = get_password_hash(password)
+    hashed_pass = await password_hasher.hash(password)
     new_user = models.User(username=username, hashed_password=hashed_pass)
     db.add(new_user)
-    db.commit()
+    await run_in_threadpool(db.commit)
 
     # Redireciona para /login com uma mensagem de sucesso
     return RedirectResponse(url="/login?message=Conta criada com sucesso!", status_code=status.HTTP_303_SEE_OTHER)
@@ -98,7 +102,10 @@ def register_user(
 # --- Rota 5: Logout (GET) ---
 # <<< CORRIGIDA >>>
 @router.get("/logout", tags=["Auth"])
-def logout():
+def logout(request: Request):
+    # Tira o token do cache de autenticação
+    token_cache.invalidate(request.cookies.get("access_token"))
+
     # 1. Crie o objeto de resposta de redirecionamento
     redirect_response = RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
     
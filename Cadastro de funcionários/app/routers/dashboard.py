@@ -0,0 +1,37 @@
+# app/routers/dashboard.py
+from fastapi import APIRouter, Request, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse
+from starlette import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.aggregates import load_dashboard
+from app.database import get_async_db
+from app.templating import templates
+from app.auth import CachedUser, get_current_user_from_cookie
+from app.jobs import submit
+
+router = APIRouter(tags=["Dashboard"])
+
+# --- PAINEL DE RH (PROTEGIDO) ---
+@router.get("/dashboard")
+async def dashboard(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    # Lê a tabela-resumo (app/aggregates.py), não os funcionários
+    stats = await load_dashboard(db)
+    return templates.TemplateResponse(
+        "dashboard/index.html",
+        {"request": request, "user": current_user, **stats}
+    )
+
+# --- RECÁLCULO DO PAINEL (PROTEGIDO) ---
+# Refaz a tabela-resumo a partir dos funcionários, em segundo plano
+@router.post("/dashboard/rebuild")
+async def rebuild_dashboard(
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    job_id = await run_in_threadpool(submit, "rebuild_aggregates", None, current_user.username)
+    return RedirectResponse(url=f"/jobs/{job_id}/view", status_code=status.HTTP_303_SEE_OTHER)
@@ -2,59 +2,82 @@
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi import APIRouter, Request, Depends, Form, HTTPException
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from starlette import status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from pathlib import Path
-from app.database import get_db
-from app import models # Importar models
+from app.database import get_async_db
+from app.templating import templates
+from app.fragments import fragment_cache, render_cached_list
+from app.refdata import reference_data
+from app.jobs import submit_once
+from app.softdelete import deleted_now
 from app.models import Department
-from app.auth import get_current_user_from_cookie # <<< IMPORTAR
+from app.auth import CachedUser, get_current_user_from_cookie # <<< IMPORTAR
 
 router = APIRouter()
-TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
 @router.get("/departments", tags=["Departments"])
-def list_departments(
+async def list_departments(
     request: Request, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
 ):
-    departments = db.scalars(select(Department).order_by(Department.name)).all()
-    return templates.TemplateResponse(
-        "departments/index.html", 
-        {"request": request, "departments": departments, "user": current_user} # <<< PASSAR 'user'
+    # O corpo da tabela fica em cache até um cadastro/exclusão (ver fragments.py)
+    async def load_rows():
+        departments = (await db.scalars(select(Department).order_by(Department.name))).all()
+        return {"departments": departments}
+
+    return await render_cached_list(
+        request,
+        key="departments",
+        page_template="departments/index.html",
+        rows_template="departments/_rows.html",
+        load_rows=load_rows,
+        context={"user": current_user} # <<< PASSAR 'user'
     )
 
 @router.post("/departments", tags=["Departments"])
-def create_department(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie), # <<< PROTEGIDO
+async def create_department(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie), # <<< PROTEGIDO
     name: str = Form(...)
 ):
     if not name.strip():
         raise HTTPException(status_code=400, detail="Nome é obrigatório")
     
-    new_dept = Department(name=name.strip())
-    db.add(new_dept)
-    db.commit()
+    # Excluído e ainda não apagado pela limpeza: o mesmo nome volta a valer
+    # (o UNIQUE do nome ainda vale para a linha excluída)
+    deleted = await db.scalar(
+        select(Department)
+        .where(Department.name == name.strip(), Department.deleted_at.is_not(None))
+        .execution_options(include_deleted=True)
+    )
+    if deleted is not None:
+        deleted.deleted_at = None
+    else:
+        new_dept = Department(name=name.strip())
+        db.add(new_dept)
+    await db.commit()
+    fragment_cache.invalidate("departments")
+    reference_data.invalidate()
     return RedirectResponse(url="/departments", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.delete("/departments/{department_id}")
-def delete_department(
+async def delete_department(
     department_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
 ):
-    department = db.get(Department, department_id)
+    department = await db.get(Department, department_id)
     if not department:
         raise HTTPException(status_code=404, detail="Departamento não encontrado")
 
-    # (Opcional) Aqui você poderia impedir a exclusão se tiver funcionários
-    # mas vamos deixar excluir direto por enquanto.
-    
-    db.delete(department)
-    db.commit()
+    # Exclusão lógica: os funcionários do departamento ficam sem departamento
+    # depois, na tarefa de limpeza (app/softdelete.py), fora do request
+    department.deleted_at = deleted_now()
+    await db.commit()
+    fragment_cache.invalidate("departments")
+    reference_data.invalidate()
+    await run_in_threadpool(submit_once, "purge_deleted", None, current_user.username)
     return JSONResponse(status_code=status.HTTP_204_NO_CONTENT, content=None)
\ No newline at end of file
@@ -1,25 +1,37 @@
 # app/routers/employees.py
-from fastapi import APIRouter, Request, Depends, Form, HTTPException
-from fastapi.responses import RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
+import os
+import shutil
+import uuid
+from decimal import Decimal
+from fastapi import APIRouter, Request, Depends, Form, Header, HTTPException, Query, UploadFile, File
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from starlette import status
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select
-from pathlib import Path
-from app.database import get_db
-from app import models # Importar 'models' para o 'current_user'
-from app.models import Employee, Department, Position 
-from app.helpers import format_brl_price, format_brl_date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from urllib.parse import urlencode
+from app.database import get_db, get_async_db
+from app.templating import templates, stream_template
+from app.fragments import fragment_cache
+from app.refdata import reference_data
+from app.search import format_cursor, parse_cursor, search_employees
+from app import config
+from app import models
+from app.models import Employee
+from app.importer import import_employees_xlsx, ImportFileError
+from app.filters import employee_filters, apply_employee_filters
+from app.exporters import stream_employees, MEDIA_TYPES
+from app.listing import EmployeeListing
+from app.audit import load_history
+from app.jobs import files_dir, submit, submit_once
+from app.softdelete import deleted_now
 # <<< 1. IMPORTAR A NOVA DEPENDÊNCIA >>>
-from app.auth import get_current_user_from_cookie
+from app.auth import CachedUser, get_current_user_from_cookie
 
 router = APIRouter()
 # <<< LINHA 'Base.metadata.create_all' REMOVIDA DAQUI >>>
 
-TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
-templates.env.filters["brl_price"] = format_brl_price
-templates.env.filters["brl_date"] = format_brl_date
 
 @router.get("/", include_in_schema=False)
 def root_redirect():
@@ -28,37 +40,60 @@ def root_redirect():
 
 # --- LISTAR FUNCIONÁRIOS (PROTEGIDO) ---
 @router.get("/employees")
-def list_employees(
+async def list_employees(
     request: Request, 
-    db: Session = Depends(get_db),
+    filters: dict = Depends(employee_filters),
+    after: int | None = None,   # cursor: mostra funcionários com id menor que este
+    before: int | None = None,  # cursor: mostra funcionários com id maior que este
+    limit: int = Query(config.EMPLOYEES_PAGE_SIZE, ge=1, le=config.EMPLOYEES_MAX_PAGE_SIZE),
+    paginate: bool = True,      # false: a lista inteira (filtrada) em uma única página
+    db: AsyncSession = Depends(get_async_db),
     # <<< 2. ADICIONAR DEPENDÊNCIA DE AUTENTICAÇÃO >>>
-    current_user: models.User = Depends(get_current_user_from_cookie)
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
 ):
-    query = (
-        select(Employee)
-        .options(
-            joinedload(Employee.department), 
-            joinedload(Employee.position)
-        )
-        .order_by(Employee.id.desc())
+    # Paginação por cursor (keyset) em Employee.id: cada página custa o mesmo,
+    # não importa a "profundidade", pois não usamos OFFSET.
+    # Nomes de departamento/cargo vêm do cache de referência (sem JOIN).
+    # A página é enviada em streaming: as linhas são lidas do banco (yield_per)
+    # à medida que o template as renderiza (ver app/listing.py).
+    paginate = paginate or not config.EMPLOYEES_ALLOW_UNPAGINATED
+    listing = EmployeeListing(
+        filters,
+        after=after if paginate else None,
+        before=before if paginate else None,
+        limit=limit if paginate else None,
     )
-    employees = db.scalars(query).all()
-    
-    return templates.TemplateResponse(
-        "employees/index.html", 
-        # <<< 3. PASSAR 'user' PARA O TEMPLATE (para o cabeçalho) >>>
-        {"request": request, "employees": employees, "user": current_user}
+
+    refs = await reference_data.get(db)
+
+    return StreamingResponse(
+        stream_template(
+            "employees/index.html",
+            # <<< 3. PASSAR 'user' PARA O TEMPLATE (para o cabeçalho) >>>
+            {
+                "request": request,
+                "employees": listing,
+                "filters": filters,
+                "limit": limit,
+                "paginate": paginate,
+                "departments": refs.departments,
+                "positions": refs.positions,
+                "department_names": refs.department_names,
+                "position_titles": refs.position_titles,
+                "user": current_user
+            }
+        ),
+        media_type="text/html; charset=utf-8",
     )
 
 # --- FORMULÁRIO DE NOVO FUNCIONÁRIO (PROTEGIDO) ---
 @router.get("/employees/new")
-def new_employee_form(
+async def new_employee_form(
     request: Request, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
 ): 
-    departments = db.scalars(select(Department).order_by(Department.name)).all()
-    positions = db.scalars(select(Position).order_by(Position.title)).all()
+    refs = await reference_data.get(db)
     
     return templates.TemplateResponse(
         "employees/new.html", 
@@ -67,26 +102,151 @@ def new_employee_form(
             "action": "/employees",
             "method_override": "POST",
             "employee": None,
-            "departments": departments, 
-            "positions": positions,
+            "departments": refs.departments, 
+            "positions": refs.positions,
             "user": current_user # <<< PASSAR 'user'
         }
     )
 
+# --- BUSCA TEXTUAL (PROTEGIDO) ---
+# Nome, email ou telefone (índice FTS5, ver app/search.py)
+@router.get("/employees/search")
+async def search_employees_page(
+    request: Request,
+    q: str = "",
+    after: str | None = None,   # cursor (rank:id): resultados depois deste
+    before: str | None = None,  # cursor (rank:id): resultados antes deste
+    limit: int = Query(config.EMPLOYEES_PAGE_SIZE, ge=1, le=config.EMPLOYEES_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    # Paginação por cursor em (rank, id), como a listagem: sem OFFSET,
+    # a centésima página custa o mesmo que a primeira
+    try:
+        after_cursor = parse_cursor(after) if after else None
+        before_cursor = parse_cursor(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+    employees, next_cursor, prev_cursor = await search_employees(
+        db, q, limit=limit, after=after_cursor, before=before_cursor
+    )
+    refs = await reference_data.get(db)
+
+    base_params = {"q": q}
+    if limit != config.EMPLOYEES_PAGE_SIZE:
+        base_params["limit"] = limit
+    next_url = "/employees/search?" + urlencode({**base_params, "after": format_cursor(next_cursor)}) if next_cursor else None
+    prev_url = "/employees/search?" + urlencode({**base_params, "before": format_cursor(prev_cursor)}) if prev_cursor else None
+
+    return templates.TemplateResponse(
+        "employees/search.html",
+        {
+            "request": request,
+            "q": q,
+            "employees": employees,
+            "next_url": next_url,
+            "prev_url": prev_url,
+            "department_names": refs.department_names,
+            "position_titles": refs.position_titles,
+            "user": current_user
+        }
+    )
+
+# --- IMPORTAÇÃO VIA EXCEL (PROTEGIDO) ---
+# Precisa vir antes de /employees/{employee_id} para não ser capturada por ela
+@router.get("/employees/import")
+def import_employees_form(
+    request: Request,
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    return templates.TemplateResponse(
+        "employees/import.html",
+        {"request": request, "report": None, "user": current_user}
+    )
+
+# Continua síncrona: copiar o upload (e, sem IMPORT_IN_BACKGROUND, ler o .xlsx)
+# é trabalho bloqueante, que deve ficar no threadpool
+@router.post("/employees/import")
+def import_employees(
+    request: Request,
+    file: UploadFile = File(...),
+    batch_size: int = Query(config.IMPORT_BATCH_SIZE, ge=1, le=50_000),
+    db: Session = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    if config.IMPORT_IN_BACKGROUND:
+        # A planilha vai para a pasta das tarefas e a importação roda em segundo
+        # plano (app/jobs.py); a página acompanha o progresso por /jobs/{id}
+        name = f"import-{uuid.uuid4().hex}.xlsx"
+        with open(os.path.join(files_dir(), name), "wb") as saved:
+            shutil.copyfileobj(file.file, saved, 1024 * 1024)
+        job_id = submit("import_employees", {"file": name, "batch_size": batch_size}, owner=current_user.username)
+        return templates.TemplateResponse(
+            "employees/import.html",
+            {"request": request, "report": None, "job_id": job_id, "user": current_user},
+            status_code=status.HTTP_202_ACCEPTED
+        )
+
+    # O upload já chega em um arquivo temporário; o openpyxl lê em modo streaming
+    try:
+        report = import_employees_xlsx(db, file.file, batch_size=batch_size)
+        # A planilha pode ter criado (ou restaurado) departamentos/cargos:
+        # formulários e as páginas /departments e /positions
+        reference_data.invalidate()
+        fragment_cache.invalidate("departments", "positions")
+    except ImportFileError as exc:
+        return templates.TemplateResponse(
+            "employees/import.html",
+            {"request": request, "report": None, "error_message": str(exc), "user": current_user},
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+    return templates.TemplateResponse(
+        "employees/import.html",
+        {"request": request, "report": report, "user": current_user}
+    )
+
+# --- EXPORTAÇÃO CSV/XLSX/NDJSON (PROTEGIDO) ---
+# Aceita os mesmos filtros da listagem. Os dados são enviados em pedaços,
+# então a memória não cresce com a quantidade de funcionários.
+@router.get("/employees/export")
+def export_employees(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx|ndjson)$"),
+    filters: dict = Depends(employee_filters),
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    return StreamingResponse(
+        stream_employees(export_format, filters),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="funcionarios.{export_format}"'}
+    )
+
+# Mesma exportação como tarefa em segundo plano: o arquivo fica pronto em
+# /jobs/{id}/download (útil para o .xlsx, que só sai depois de montado inteiro)
+@router.post("/employees/export")
+async def export_employees_background(
+    export_format: str = Query("xlsx", alias="format", pattern="^(csv|xlsx|ndjson)$"),
+    filters: dict = Depends(employee_filters),
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    job_id = await run_in_threadpool(
+        submit, "export_employees", {"format": export_format, "filters": filters}, current_user.username
+    )
+    return RedirectResponse(url=f"/jobs/{job_id}/view", status_code=status.HTTP_303_SEE_OTHER)
+
 # --- FORMULÁRIO DE EDIÇÃO (PROTEGIDO) ---
 @router.get("/employees/{employee_id}/edit")
-def edit_employee_form(
+async def edit_employee_form(
     employee_id: int, 
     request: Request, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
 ):
-    employee = db.get(Employee, employee_id)
+    employee = await db.get(Employee, employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
 
-    departments = db.scalars(select(Department).order_by(Department.name)).all()
-    positions = db.scalars(select(Position).order_by(Position.title)).all()
+    refs = await reference_data.get(db)
 
     return templates.TemplateResponse(
         "employees/edit.html", 
@@ -95,21 +255,22 @@ def edit_employee_form(
             "action": f"/employees/{employee.id}",
             "method_override": "PUT",
             "employee": employee,
-            "departments": departments,
-            "positions": positions,
+            "departments": refs.departments,
+            "positions": refs.positions,
             "user": current_user # <<< PASSAR 'user'
-        }
+        },
+        headers={"ETag": employee_etag(employee.version)}
     )
 
 # --- CRIAÇÃO DE FUNCIONÁRIO (PROTEGIDO) ---
 @router.post("/employees")
-def create_employee(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie), # <<< PROTEGIDO
+async def create_employee(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie), # <<< PROTEGIDO
     name: str = Form(...),
     email: str = Form(...),
     phone: str = Form(None),
-    salary: float = Form(0.0),
+    salary: Decimal = Form(Decimal("0.00")),
     department_id: int = Form(None),
     position_id: int = Form(None)
 ):
@@ -122,59 +283,148 @@ def create_employee(
         department_id=department_id,
         position_id=position_id
     ))
-    db.commit()
+    await db.commit()
     return RedirectResponse(url="/employees", status_code=status.HTTP_303_SEE_OTHER)
 
 # --- ATUALIZAÇÃO DE FUNCIONÁRIO (PROTEGIDO) ---
+# O formulário de edição envia 'If-Match' com a versão que a página mostrou
+# (ETag). A gravação é um único UPDATE ... WHERE id = ? AND version = ?: se
+# outra pessoa salvou no meio tempo, nenhuma linha muda e a resposta é 409,
+# sem lock e sem o SELECT antes. Sem 'If-Match', a última gravação vale.
+
+def employee_etag(version: int) -> str:
+    return f'"{version}"'
+
+def parse_if_match(header: str | None) -> list[int] | None:
+    """Versões aceitas pelo If-Match ('"3"', 'W/"3"' ou uma lista); None = sem condição"""
+    if header is None or header.strip() == "*":
+        return None
+    versions = []
+    for tag in header.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if not tag.isdigit():
+            raise HTTPException(status_code=400, detail="Cabeçalho If-Match inválido")
+        versions.append(int(tag))
+    return versions
+
 @router.put("/employees/{employee_id}")
-def update_employee(
+async def update_employee(
     employee_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie), # <<< PROTEGIDO
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie), # <<< PROTEGIDO
+    if_match: str | None = Header(None),
     name: str = Form(...),
     email: str = Form(...),
     phone: str = Form(None),
-    salary: float = Form(0.0),
+    salary: Decimal = Form(Decimal("0.00")),
     department_id: int = Form(None),
     position_id: int = Form(None)
 ):
-    # ... (lógica da rota permanece a mesma) ...
-    employee = db.get(Employee, employee_id)
-    if not employee:
-        raise HTTPException(status_code=404, detail="Funcionário não encontrado")
-    
-    employee.name = name.strip()
-    employee.email = email.strip()
-    employee.phone = phone.strip() if phone else None
-    employee.salary = salary
-    employee.department_id = department_id
-    employee.position_id = position_id
-    db.add(employee)
-    db.commit()
-    return JSONResponse(status_code=status.HTTP_204_NO_CONTENT, content=None)
+    statement = (
+        update(Employee)
+        .where(Employee.id == employee_id, Employee.deleted_at.is_(None))
+        .values(
+            name=name.strip(),
+            email=email.strip(),
+            phone=phone.strip() if phone else None,
+            salary=salary,
+            department_id=department_id,
+            position_id=position_id,
+            version=Employee.version + 1,
+        )
+        .returning(Employee.version)
+    )
+    versions = parse_if_match(if_match)
+    if versions is not None:
+        statement = statement.where(Employee.version.in_(versions))
+
+    new_version = await db.scalar(statement)
+    if new_version is None:
+        await db.rollback()
+        # Só no caminho de erro: não existe (404) ou mudou de versão (409)
+        current = await db.scalar(select(Employee.version).where(Employee.id == employee_id))
+        if current is None:
+            raise HTTPException(status_code=404, detail="Funcionário não encontrado")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Este funcionário foi alterado por outra pessoa. Recarregue a página e tente de novo.",
+            headers={"ETag": employee_etag(current)},
+        )
+    await db.commit()
+    return JSONResponse(
+        status_code=status.HTTP_204_NO_CONTENT, content=None, headers={"ETag": employee_etag(new_version)}
+    )
 
 # --- EXCLUSÃO DE FUNCIONÁRIO (PROTEGIDO) ---
 @router.delete("/employees/{employee_id}")
-def delete_employee(
+async def delete_employee(
     employee_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
 ):
-    # ... (lógica da rota permanece a mesma) ...
-    employee = db.get(Employee, employee_id)
+    employee = await db.get(Employee, employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
-    db.delete(employee)
-    db.commit()
+    # Exclusão lógica; a associação com projetos e a linha são apagadas
+    # depois, pela tarefa de limpeza (app/softdelete.py)
+    employee.deleted_at = deleted_now()
+    await db.commit()
+    fragment_cache.invalidate("projects") # pode ter saído de algum projeto
+    await run_in_threadpool(submit_once, "purge_deleted", None, current_user.username)
     return JSONResponse(status_code=status.HTTP_204_NO_CONTENT, content=None)
 
+# --- HISTÓRICO DE ALTERAÇÕES (PROTEGIDO) ---
+@router.get("/employees/{employee_id}/history")
+async def employee_history(
+    employee_id: int,
+    request: Request,
+    before: int | None = None,  # cursor: entradas com id menor que este
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    # Lido do log de auditoria (app/audit.py), que pode estar em outro banco;
+    # continua disponível depois que o funcionário é excluído
+    page = await run_in_threadpool(load_history, "employee", employee_id, before)
+    employee = await db.get(Employee, employee_id)
+    if employee is None and not page.entries:
+        raise HTTPException(status_code=404, detail="Funcionário não encontrado")
+
+    name = employee.name if employee else next(
+        (entry["changes"]["name"][0] for entry in page.entries if entry["action"] == "delete" and "name" in entry["changes"]),
+        f"funcionário {employee_id}",
+    )
+    project_ids = {entry["changes"]["project_id"] for entry in page.entries if "project_id" in entry["changes"]}
+    project_names = {}
+    if project_ids:
+        project_names = dict((await db.execute(
+            select(models.Project.id, models.Project.name).where(models.Project.id.in_(project_ids))
+        )).all())
+    refs = await reference_data.get(db)
+
+    return templates.TemplateResponse(
+        "employees/history.html",
+        {
+            "request": request,
+            "employee_id": employee_id,
+            "name": name,
+            "exists": employee is not None,
+            "entries": page.entries,
+            "before": before,
+            "next_before": page.next_before,
+            "project_names": project_names,
+            "department_names": refs.department_names,
+            "position_titles": refs.position_titles,
+            "user": current_user
+        }
+    )
+
 # --- DETALHE DE FUNCIONÁRIO (PROTEGIDO) ---
 @router.get("/employees/{employee_id}")
-def get_employee(
+async def get_employee(
     employee_id: int, 
     request: Request, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
 ):
     query = (
         select(Employee)
@@ -184,12 +434,13 @@ def get_employee(
             joinedload(Employee.position)
         )
     )
-    employee = db.scalar(query) 
+    employee = await db.scalar(query) 
 
     if not employee:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
 
     return templates.TemplateResponse(
         "employees/show.html", 
-        {"request": request, "employee": employee, "user": current_user} # <<< PASSAR 'user'
+        {"request": request, "employee": employee, "user": current_user}, # <<< PASSAR 'user'
+        headers={"ETag": employee_etag(employee.version)}
     )
\ No newline at end of file
@@ -0,0 +1,65 @@
+# app/routers/jobs.py
+import os
+
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from app.jobs import DONE, KIND_LABELS, cancel_job, files_dir, get_job
+from app.templating import templates
+from app.auth import CachedUser, get_current_user_from_cookie
+
+router = APIRouter(tags=["Tarefas"])
+
+# --- Tarefas em segundo plano (app/jobs.py) ---
+
+async def _job_or_404(job_id: int):
+    job = await run_in_threadpool(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return job
+
+# Status em JSON, consultado periodicamente pelas páginas (app.js)
+@router.get("/jobs/{job_id}")
+async def job_status(
+    job_id: int,
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    return (await _job_or_404(job_id)).as_dict()
+
+# Página com o progresso de qualquer tarefa (exportação, recálculos)
+@router.get("/jobs/{job_id}/view")
+async def job_page(
+    job_id: int,
+    request: Request,
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    job = await _job_or_404(job_id)
+    return templates.TemplateResponse(
+        "jobs/show.html",
+        {"request": request, "job": job, "label": KIND_LABELS.get(job.kind, job.kind), "user": current_user}
+    )
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel(
+    job_id: int,
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    job = await run_in_threadpool(cancel_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return job.as_dict()
+
+# Arquivo gerado por uma exportação em segundo plano
+@router.get("/jobs/{job_id}/download")
+async def download(
+    job_id: int,
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
+):
+    job = await _job_or_404(job_id)
+    if job.status != DONE or not job.result or not job.result.get("file"):
+        raise HTTPException(status_code=404, detail="Esta tarefa não gerou arquivo")
+    path = os.path.join(files_dir(), job.result["file"])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="O arquivo já expirou")
+    return FileResponse(path, filename=job.result.get("filename") or job.result["file"])
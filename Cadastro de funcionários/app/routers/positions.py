@@ -2,61 +2,84 @@
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi import APIRouter, Request, Depends, Form, HTTPException
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from starlette import status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from pathlib import Path
-from app.database import get_db
-from app import models # Importar models
+from app.database import get_async_db
+from app.templating import templates
+from app.fragments import fragment_cache, render_cached_list
+from app.refdata import reference_data
+from app.jobs import submit_once
+from app.softdelete import deleted_now
 from app.models import Position
-from app.auth import get_current_user_from_cookie # <<< IMPORTAR
+from app.auth import CachedUser, get_current_user_from_cookie # <<< IMPORTAR
 
 router = APIRouter()
-TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
 @router.get("/positions", tags=["Positions"])
-def list_positions(
+async def list_positions(
     request: Request, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie) # <<< PROTEGIDO
 ):
-    positions = db.scalars(select(Position).order_by(Position.title)).all()
-    return templates.TemplateResponse(
-        "positions/index.html", 
-        {"request": request, "positions": positions, "user": current_user} # <<< PASSAR 'user'
+    # O corpo da tabela fica em cache até um cadastro/exclusão (ver fragments.py)
+    async def load_rows():
+        positions = (await db.scalars(select(Position).order_by(Position.title))).all()
+        return {"positions": positions}
+
+    return await render_cached_list(
+        request,
+        key="positions",
+        page_template="positions/index.html",
+        rows_template="positions/_rows.html",
+        load_rows=load_rows,
+        context={"user": current_user} # <<< PASSAR 'user'
     )
 
 @router.post("/positions", tags=["Positions"])
-def create_position(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie), # <<< PROTEGIDO
+async def create_position(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie), # <<< PROTEGIDO
     title: str = Form(...)
 ):
     if not title.strip():
         raise HTTPException(status_code=400, detail="Título é obrigatório")
     
-    new_pos = Position(title=title.strip())
-    db.add(new_pos)
-    db.commit()
+    # Excluído e ainda não apagado pela limpeza: o mesmo título volta a valer
+    deleted = await db.scalar(
+        select(Position)
+        .where(Position.title == title.strip(), Position.deleted_at.is_not(None))
+        .execution_options(include_deleted=True)
+    )
+    if deleted is not None:
+        deleted.deleted_at = None
+    else:
+        new_pos = Position(title=title.strip())
+        db.add(new_pos)
+    await db.commit()
+    fragment_cache.invalidate("positions")
+    reference_data.invalidate()
     return RedirectResponse(url="/positions", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.delete("/positions/{position_id}")
-def delete_position(
+async def delete_position(
     position_id: int, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
 ):
     # Busca o cargo pelo ID
-    position = db.get(Position, position_id)
+    position = await db.get(Position, position_id)
     
     if not position:
         raise HTTPException(status_code=404, detail="Cargo não encontrado")
 
-    # Deleta do banco
-    db.delete(position)
-    db.commit()
+    # Exclusão lógica; os funcionários saem do cargo na tarefa de limpeza
+    position.deleted_at = deleted_now()
+    await db.commit()
+    fragment_cache.invalidate("positions")
+    reference_data.invalidate()
+    await run_in_threadpool(submit_once, "purge_deleted", None, current_user.username)
     
     # Retorna sucesso sem conteúdo (204)
     return JSONResponse(status_code=status.HTTP_204_NO_CONTENT, content=None)
\ No newline at end of file
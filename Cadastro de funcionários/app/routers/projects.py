@@ -1,15 +1,21 @@
 # app/routers/projects.py
-from fastapi import APIRouter, Request, Depends, Form, HTTPException
+from fastapi import APIRouter, Request, Depends, Form, HTTPException, Query
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 from starlette import status
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select
-from pathlib import Path
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, exists, or_
+from urllib.parse import urlencode
 
-from app.database import get_db
+from app.database import backend, get_async_db
+from app.templating import templates
+from app import config
+from app.fragments import fragment_cache, render_cached_list
+from app.memberships import add_members_statement, remove_members_statement
+from app.refdata import reference_data
 from app import models
-from app.auth import get_current_user_from_cookie # Importar para proteger
+from app.models import employee_project_association as membership
+from app.auth import CachedUser, get_current_user_from_cookie # Importar para proteger
 
 # Protege TODAS as rotas neste arquivo
 router = APIRouter(
@@ -18,89 +24,186 @@ router = APIRouter(
     dependencies=[Depends(get_current_user_from_cookie)]
 )
 
-TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
 # --- 1. Listar Projetos (Read) ---
 @router.get("/")
-def list_projects(
+async def list_projects(
     request: Request, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie) # Dependência duplicada é ok
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie) # Dependência duplicada é ok
 ):
-    projects = db.scalars(
-        select(models.Project).options(joinedload(models.Project.employees))
-    ).unique().all()
-    
-    return templates.TemplateResponse(
-        "projects/index.html", 
-        {"request": request, "projects": projects, "user": current_user}
+    async def load_rows():
+        # Só a quantidade de membros: um COUNT por projeto (índice de project_id),
+        # sem carregar os funcionários; a junção com Employee deixa de fora os
+        # excluídos ainda não apagados (filtro de app/models.py)
+        member_count = (
+            select(func.count())
+            .select_from(membership)
+            .join(models.Employee, models.Employee.id == membership.c.employee_id)
+            .where(membership.c.project_id == models.Project.id)
+            .scalar_subquery()
+        )
+        projects = (await db.execute(
+            select(
+                models.Project.id,
+                models.Project.name,
+                models.Project.description,
+                member_count.label("member_count"),
+            )
+            .order_by(models.Project.name)
+        )).all()
+        return {"projects": projects}
+
+    return await render_cached_list(
+        request,
+        key="projects",
+        page_template="projects/index.html",
+        rows_template="projects/_rows.html",
+        load_rows=load_rows,
+        context={"user": current_user}
     )
 
 # --- 2. Criar Projeto (Create) ---
 @router.post("/")
-def create_project(name: str = Form(...), description: str = Form(None), db: Session = Depends(get_db)):
+async def create_project(name: str = Form(...), description: str = Form(None), db: AsyncSession = Depends(get_async_db)):
     new_project = models.Project(name=name, description=description)
     db.add(new_project)
-    db.commit()
+    await db.commit()
+    fragment_cache.invalidate("projects")
     return RedirectResponse(url="/projects", status_code=status.HTTP_303_SEE_OTHER)
 
+# --- Seletor de funcionários (paginado) ---
+
+async def load_candidates(db, project_id: int, q: str | None, after: int | None, limit: int):
+    """
+    Funcionários que ainda não estão no projeto, em ordem de nome.
+    Filtra por prefixo do nome ('q') e pagina por cursor: 'after' é o id do
+    último funcionário da página anterior. Retorna (página, id do próximo cursor).
+    """
+    employee = models.Employee
+    name = backend.nocase(employee.name)
+    query = (
+        select(employee.id, employee.name, employee.email)
+        .where(~exists().where(
+            membership.c.project_id == project_id,
+            membership.c.employee_id == employee.id,
+        ))
+        .order_by(name, employee.id)
+        .limit(limit + 1)
+    )
+    if q:
+        query = query.where(backend.prefix_match(employee.name, q))
+    if after is not None:
+        after_name = await db.scalar(select(employee.name).where(employee.id == after))
+        if after_name is not None:
+            # (nome, id) > (after_name, after), no formato que usa o índice de nome
+            after_name = backend.nocase(after_name)
+            query = query.where(name >= after_name, or_(name > after_name, employee.id > after))
+
+    rows = (await db.execute(query)).all()
+    next_after = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_after
+
+@router.get("/{project_id}/candidates")
+async def project_candidates(
+    project_id: int,
+    q: str | None = Query(None),
+    after: int | None = Query(None),
+    limit: int = Query(config.PROJECT_PICKER_PAGE_SIZE, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """JSON para o campo de busca (typeahead) do seletor de funcionários"""
+    candidates, next_after = await load_candidates(db, project_id, q, after, limit)
+    return {
+        "items": [{"id": c.id, "name": c.name, "email": c.email} for c in candidates],
+        "next_after": next_after,
+    }
+
 # --- 3. Detalhes do Projeto (Read N-M) ---
 @router.get("/{project_id}")
-def project_details(
+async def project_details(
     project_id: int, 
     request: Request, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_from_cookie)
+    q: str | None = Query(None),       # filtro do seletor de funcionários
+    after: int | None = Query(None),   # cursor do seletor
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user_from_cookie)
 ):
-    project = db.scalar(
+    project = await db.scalar(
         select(models.Project)
         .where(models.Project.id == project_id)
-        .options(joinedload(models.Project.employees))
+        .options(selectinload(models.Project.employees))
     )
     if not project:
         raise HTTPException(status_code=404, detail="Projeto não encontrado")
 
-    all_employees = db.scalars(select(models.Employee).order_by(models.Employee.name)).all()
+    # Só uma página do seletor, não a empresa inteira
+    candidates, next_after = await load_candidates(db, project_id, q, after, config.PROJECT_PICKER_PAGE_SIZE)
+    next_url = None
+    if next_after is not None:
+        next_url = f"/projects/{project_id}?" + urlencode({k: v for k, v in {"q": q, "after": next_after}.items() if v})
 
     return templates.TemplateResponse(
         "projects/show.html",
         {
             "request": request,
             "project": project,
-            "all_employees": all_employees,
+            "members": sorted(project.employees, key=lambda e: e.name.casefold()),
+            "candidates": candidates,
+            "q": q or "",
+            "next_url": next_url,
+            "departments": (await reference_data.get(db)).departments,
             "user": current_user
         }
     )
 
 # --- 4. Adicionar Funcionário a um Projeto (Update N-M) ---
 @router.post("/{project_id}/add_employee")
-def add_employee_to_project(
+async def add_employee_to_project(
     project_id: int, 
     employee_id: int = Form(...), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
+):
+    if await db.get(models.Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Projeto não encontrado")
+
+    # INSERT direto na associação, sem carregar os membros:
+    # só insere se o funcionário existe e ainda não está no projeto
+    result = await db.execute(add_members_statement(project_id, employee_ids=[employee_id]))
+    await db.commit()
+    if result.rowcount:
+        fragment_cache.invalidate("projects") # a lista mostra a quantidade de membros
+
+    return RedirectResponse(url=f"/projects/{project_id}", status_code=status.HTTP_303_SEE_OTHER)
+
+# --- 4b. Adicionar um Departamento inteiro (Update N-M em lote) ---
+@router.post("/{project_id}/add_department")
+async def add_department_to_project(
+    project_id: int, 
+    department_id: int = Form(...), 
+    db: AsyncSession = Depends(get_async_db)
 ):
-    project = db.get(models.Project, project_id)
-    employee = db.get(models.Employee, employee_id)
+    if await db.get(models.Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Projeto não encontrado")
 
-    if employee not in project.employees:
-        project.employees.append(employee)
-        db.commit()
+    # Um único INSERT ... SELECT para todos os funcionários do departamento
+    result = await db.execute(add_members_statement(project_id, filters={"department_id": department_id}))
+    await db.commit()
+    if result.rowcount:
+        fragment_cache.invalidate("projects")
 
     return RedirectResponse(url=f"/projects/{project_id}", status_code=status.HTTP_303_SEE_OTHER)
 
 # --- 5. Remover Funcionário de um Projeto (Update N-M) ---
 @router.post("/{project_id}/remove_employee/{employee_id}")
-def remove_employee_from_project(
+async def remove_employee_from_project(
     project_id: int, 
     employee_id: int, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    project = db.get(models.Project, project_id)
-    employee = db.get(models.Employee, employee_id)
+    result = await db.execute(remove_members_statement(project_id, employee_ids=[employee_id]))
+    await db.commit()
+    if result.rowcount:
+        fragment_cache.invalidate("projects")
 
-    if employee in project.employees:
-        project.employees.remove(employee)
-        db.commit()
-
-    return RedirectResponse(url=f"/projects/{project_id}", status_code=status.HTTP_303_SEE_OTHER)
\ No newline at end of file
+    return RedirectResponse(url=f"/projects/{project_id}", status_code=status.HTTP_303_SEE_OTHER)
@@ -0,0 +1,112 @@
+# app/schemas.py
+from decimal import Decimal
+from typing import Annotated, Literal, Union
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from app import config
+
+# --- Schemas da API JSON (/api/v1) ---
+# As rotas HTML recebem formulários; a API recebe JSON validado por estes modelos.
+# Os limites de tamanho seguem as colunas de app/models.py.
+
+Name = Annotated[str, Field(min_length=1, max_length=100)]
+Email = Annotated[str, Field(min_length=3, max_length=100, pattern=r"^[^@\s]+@[^@\s]+$")]
+Phone = Annotated[str, Field(max_length=20)]
+# Mesmos limites da coluna NUMERIC(12, 2) (app/models.py: Money)
+Salary = Annotated[Decimal, Field(ge=0, max_digits=12, decimal_places=2)]
+
+class _Schema(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra="forbid")
+
+# --- Lote de funcionários ---
+
+class EmployeeCreate(_Schema):
+    op: Literal["create"]
+    name: Name
+    email: Email
+    phone: Phone | None = None
+    salary: Salary = Decimal("0.00")
+    department_id: int | None = None
+    position_id: int | None = None
+
+class EmployeeUpdate(_Schema):
+    """Atualização parcial: só os campos enviados são alterados"""
+    op: Literal["update"]
+    id: int
+    name: Name | None = None
+    email: Email | None = None
+    phone: Phone | None = None
+    salary: Salary | None = None
+    department_id: int | None = None
+    position_id: int | None = None
+    version: int | None = None  # versão esperada (como o If-Match do PUT); vazio = sem conferência
+
+    def changes(self) -> dict:
+        """Campos enviados no JSON (um 'null' explícito também conta)"""
+        return self.model_dump(include=self.model_fields_set - {"op", "id", "version"})
+
+class EmployeeDelete(_Schema):
+    op: Literal["delete"]
+    id: int
+
+EmployeeOperation = Annotated[
+    Union[EmployeeCreate, EmployeeUpdate, EmployeeDelete],
+    Field(discriminator="op"),
+]
+
+EmployeeBatch = Annotated[
+    list[EmployeeOperation],
+    Field(min_length=1, max_length=config.API_BATCH_MAX_ITEMS),
+]
+
+class BatchItemResult(BaseModel):
+    index: int                                   # posição da operação no array enviado
+    op: Literal["create", "update", "delete"]
+    status: Literal["ok", "error", "skipped"]    # skipped: válida, mas o lote atômico falhou
+    id: int | None = None
+    version: int | None = None                   # versão do funcionário depois do lote
+    error: str | None = None
+
+class BatchResult(BaseModel):
+    applied: bool
+    succeeded: int
+    failed: int
+    results: list[BatchItemResult]
+
+# --- Membros de projeto em lote ---
+
+class EmployeeFilter(_Schema):
+    """Mesmos filtros da listagem de funcionários (app/filters.py)"""
+    department_id: int | None = None
+    position_id: int | None = None
+    min_salary: float | None = None
+    max_salary: float | None = None
+    name: Annotated[str, Field(min_length=1, max_length=100)] | None = None
+
+    @model_validator(mode="after")
+    def _not_empty(self):
+        if not self.as_filters():
+            raise ValueError("Informe ao menos um filtro")
+        return self
+
+    def as_filters(self) -> dict:
+        return self.model_dump(exclude_none=True)
+
+class MembershipChange(_Schema):
+    """Funcionários a adicionar/remover: lista de ids, filtro ou os dois (interseção)"""
+    action: Literal["add", "remove"]
+    employee_ids: list[int] | None = Field(None, min_length=1, max_length=config.API_BATCH_MAX_ITEMS)
+    filter: EmployeeFilter | None = None
+
+    @model_validator(mode="after")
+    def _has_selection(self):
+        if self.employee_ids is None and self.filter is None:
+            raise ValueError("Informe 'employee_ids' ou 'filter'")
+        return self
+
+class MembershipResult(BaseModel):
+    project_id: int
+    action: Literal["add", "remove"]
+    changed: int    # adicionados (sem contar quem já era membro) ou removidos
+    members: int    # total de membros depois da alteração
@@ -0,0 +1,231 @@
+# app/search.py
+import math
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import column, func, literal_column, select, table, text, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.database import backend
+from app.models import Employee
+
+# --- Busca textual (SQLite FTS5) ---
+# Índice invertido sobre nome, email e telefone dos funcionários. É uma tabela
+# "external content": guarda só o índice, o texto continua em 'employees'.
+# Os triggers mantêm o índice em dia em qualquer INSERT/UPDATE/DELETE.
+# Na importação em lote, indexar linha a linha deixaria o INSERT ~10x mais
+# lento; ali o trigger de INSERT é pausado e as linhas novas são indexadas
+# de uma vez no fim (ver deferred_search_index).
+
+FTS_TABLE = "employees_fts"
+FTS_PAUSE_TABLE = "employees_fts_pause"
+
+FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, email, phone,
+        content='employees', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    # Só tem linha durante uma importação em lote (dentro da própria transação)
+    f"CREATE TABLE IF NOT EXISTS {FTS_PAUSE_TABLE} (id INTEGER PRIMARY KEY)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employees_fts_ai AFTER INSERT ON employees
+    WHEN NOT EXISTS (SELECT 1 FROM {FTS_PAUSE_TABLE}) BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, email, phone)
+        VALUES (new.id, new.name, new.email, new.phone);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employees_fts_ad AFTER DELETE ON employees BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email, phone)
+        VALUES ('delete', old.id, old.name, old.email, old.phone);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employees_fts_au AFTER UPDATE OF name, email, phone ON employees BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email, phone)
+        VALUES ('delete', old.id, old.name, old.email, old.phone);
+        INSERT INTO {FTS_TABLE}(rowid, name, email, phone)
+        VALUES (new.id, new.name, new.email, new.phone);
+    END
+    """,
+]
+
+# Peso de cada coluna no ranking (bm25): nome > email > telefone
+FTS_RANK = "bm25(10.0, 5.0, 1.0)"
+
+# --- PostgreSQL ---
+# Sem FTS5: um índice GIN sobre o tsvector de nome + email + telefone
+# (configuração 'simple', sem radicais). O translate() faz o papel do
+# 'remove_diacritics' e do tokenizador do FTS5: tira os acentos e separa
+# email e telefone nas pontuações ('ana.silva@x.com' -> ana silva x com).
+# O PostgreSQL mantém o índice sozinho, sem triggers nem pausa na importação.
+# A consulta precisa repetir a expressão do índice exatamente (SEARCH_DOCUMENT).
+
+PG_SEARCH_INDEX = "ix_employees_search"
+_ACCENTS = ("áàâãäåéèêëíìîïóòôõöúùûüçñý", "aaaaaaeeeeiiiiooooouuuucny")
+_SEPARATORS = "@.-_+"
+_TRANSLATION = str.maketrans(_ACCENTS[0] + _SEPARATORS, _ACCENTS[1] + " " * len(_SEPARATORS))
+
+def _pg_text(name: str) -> str:
+    return (
+        f"translate(lower(coalesce({name}, '')), "
+        f"'{_ACCENTS[0]}{_SEPARATORS}', '{_ACCENTS[1]}{' ' * len(_SEPARATORS)}')"
+    )
+
+SEARCH_DOCUMENT = (
+    f"to_tsvector('simple', {_pg_text('name')} || ' ' || {_pg_text('email')} || ' ' || {_pg_text('phone')})"
+)
+# Peso no ranking (ts_rank): nome (A) > email (B) > telefone (D); só é calculado para as linhas encontradas
+SEARCH_RANK_DOCUMENT = (
+    f"setweight(to_tsvector('simple', {_pg_text('name')}), 'A') || "
+    f"setweight(to_tsvector('simple', {_pg_text('email')}), 'B') || "
+    f"setweight(to_tsvector('simple', {_pg_text('phone')}), 'D')"
+)
+
+def create_search_index(conn: Connection):
+    """Cria a tabela FTS5 e os triggers e indexa os funcionários existentes (migração 1)"""
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS {PG_SEARCH_INDEX} ON employees USING gin (({SEARCH_DOCUMENT}))"
+        )
+        return
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in FTS_DDL:
+        conn.exec_driver_sql(statement)
+    rebuild_search_index(conn)
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', '{FTS_RANK}')")
+
+def rebuild_search_index(conn: Connection):
+    """Reindexa todos os funcionários a partir de 'employees' (tarefa 'rebuild_search')"""
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(f"REINDEX INDEX {PG_SEARCH_INDEX}")
+        return
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+@contextmanager
+def deferred_search_index(db: Session):
+    """
+    Pausa a indexação linha a linha durante um INSERT em lote e indexa as
+    linhas novas com um único INSERT ... SELECT no final.
+    Deve envolver apenas INSERTs, na mesma transação (o SQLite tem um único
+    escritor, então nenhuma outra conexão vê a pausa).
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        yield
+        return
+    # (com as linhas excluídas, que continuam indexadas até serem apagadas)
+    start_id = db.scalar(
+        select(func.coalesce(func.max(Employee.id), 0)).execution_options(include_deleted=True)
+    )
+    db.execute(text(f"INSERT INTO {FTS_PAUSE_TABLE} DEFAULT VALUES"))
+    yield
+    db.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE}(rowid, name, email, phone) "
+            "SELECT id, name, email, phone FROM employees WHERE id > :start_id"
+        ),
+        {"start_id": start_id},
+    )
+    db.execute(text(f"DELETE FROM {FTS_PAUSE_TABLE}"))
+
+# --- Consulta ---
+
+_fts = table(FTS_TABLE, column("rowid"), column(FTS_TABLE), column("rank"))
+
+def build_match_query(q: str) -> str | None:
+    """
+    Converte o texto digitado numa consulta FTS5: cada palavra vira um prefixo
+    e todas precisam aparecer. 'ana silv' -> '"ana"* "silv"*'
+    """
+    terms = re.findall(r"\w+", q or "")
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+def search_query(match: str):
+    """(SELECT de Employee + rank, rank) — rank do FTS5: menor = mais relevante"""
+    query = (
+        select(Employee, _fts.c.rank.label("rank"))
+        .join(_fts, _fts.c.rowid == Employee.id)
+        .where(_fts.c[FTS_TABLE].op("MATCH")(match))
+    )
+    return query, _fts.c.rank
+
+def build_tsquery(q: str) -> str | None:
+    """Mesma regra no PostgreSQL: 'Ana Silv' -> 'ana:* & silv:*'"""
+    terms = re.findall(r"\w+", (q or "").lower().translate(_TRANSLATION))
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+def pg_search_query(tsquery: str):
+    """Mesmo par no PostgreSQL, pelo índice GIN: o rank é -ts_rank (menor = mais relevante)"""
+    query = func.to_tsquery(literal_column("'simple'"), tsquery)
+    rank = -func.ts_rank(literal_column(SEARCH_RANK_DOCUMENT), query)
+    return select(Employee, rank.label("rank")).where(literal_column(SEARCH_DOCUMENT).op("@@")(query)), rank
+
+# --- Paginação por cursor ---
+# Como na listagem (app/listing.py), sem OFFSET: a página N custaria
+# ranquear e descartar todas as linhas das N-1 anteriores. O cursor é o par
+# (rank, id) da última (ou primeira) linha mostrada; o id desempata ranks iguais.
+
+SearchCursor = tuple[float, int]
+
+def format_cursor(cursor: SearchCursor) -> str:
+    """(-3.25, 42) -> '-3.25:42' (repr do float: volta exatamente o mesmo valor)"""
+    rank, id_ = cursor
+    return f"{rank!r}:{id_}"
+
+def parse_cursor(text: str) -> SearchCursor:
+    """'-3.25:42' -> (-3.25, 42); ValueError se o texto não for um cursor"""
+    rank, _, id_ = text.rpartition(":")
+    cursor = float(rank), int(id_)
+    if not math.isfinite(cursor[0]):
+        raise ValueError(text)
+    return cursor
+
+async def search_employees(
+    db, q: str, limit: int, after: SearchCursor | None = None, before: SearchCursor | None = None,
+) -> tuple[list[Employee], SearchCursor | None, SearchCursor | None]:
+    """
+    Retorna (funcionários da página, cursor da próxima, cursor da anterior),
+    em ordem de relevância. 'after'/'before': cursores recebidos dos links.
+    """
+    if backend.name == "postgresql":
+        tsquery = build_tsquery(q)
+        built = pg_search_query(tsquery) if tsquery else None
+    else:
+        match = build_match_query(q)
+        built = search_query(match) if match else None
+    if built is None:
+        return [], None, None
+    query, rank = built
+    position = tuple_(rank, Employee.id)
+    if before is not None:
+        # Voltando uma página: busca em ordem inversa e inverte depois
+        query = query.where(position < tuple_(*before)).order_by(rank.desc(), Employee.id.desc())
+    else:
+        if after is not None:
+            query = query.where(position > tuple_(*after))
+        query = query.order_by(rank, Employee.id)
+    # 1 registro a mais só para saber se existe outra página
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before is not None:
+        rows.reverse()
+    if not rows:
+        return [], None, None
+    has_next = True if before is not None else has_more
+    has_prev = has_more if before is not None else after is not None
+    return (
+        [row.Employee for row in rows],
+        (rows[-1].rank, rows[-1].Employee.id) if has_next else None,
+        (rows[0].rank, rows[0].Employee.id) if has_prev else None,
+    )
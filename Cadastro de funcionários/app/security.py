@@ -0,0 +1,109 @@
+# app/security.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from starlette import status
+
+from app import config
+from app.auth import verify_password, get_password_hash
+from app.metrics import record_bcrypt
+
+# --- Pool dedicado para o bcrypt ---
+# O bcrypt leva ~250ms de CPU por senha. Rodar isso no threadpool padrão
+# (o mesmo das rotas síncronas) trava as outras páginas durante picos de login.
+# Aqui ele roda em um pool próprio, pequeno, e com fila limitada:
+# quando a fila enche, o request recebe 503 na hora em vez de esperar.
+# (O bcrypt libera o GIL enquanto calcula o hash, então threads bastam.)
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hash_total = 0.0
+        self._hash_max = 0.0
+
+    def _record(self, wait: float, elapsed: float):
+        with self._lock:
+            self._completed += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self._hash_total += elapsed
+            self._hash_max = max(self._hash_max, elapsed)
+
+    async def run(self, func, *args):
+        """Executa 'func' no pool; levanta 503 se a fila já estiver cheia"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, tente novamente em instantes",
+                headers={"Retry-After": "1"},
+            )
+
+        submitted_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self._record(started_at - submitted_at, time.perf_counter() - started_at)
+
+        def release(_future=None):
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            record_bcrypt(time.perf_counter() - submitted_at)
+
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(job)
+        except BaseException:
+            release()
+            raise
+        # A vaga só volta quando a thread termina: se o request for cancelado
+        # (cliente desconectou) com o bcrypt já rodando, ela continua ocupada
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    def stats(self) -> dict:
+        """Métricas: fila atual, rejeitados (503) e tempos de espera/hash em segundos"""
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "queue_wait_avg": self._wait_total / completed,
+                "queue_wait_max": self._wait_max,
+                "queue_wait_total": self._wait_total,
+                "hash_time_avg": self._hash_total / completed,
+                "hash_time_max": self._hash_max,
+                "hash_time_total": self._hash_total,
+            }
+
+password_hasher = PasswordHasher(
+    workers=config.PASSWORD_WORKERS,
+    max_pending=config.PASSWORD_MAX_PENDING,
+)
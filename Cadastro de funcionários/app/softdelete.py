@@ -0,0 +1,125 @@
+# app/softdelete.py
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.models import Department, Employee, Position, employee_project_association as membership
+
+# --- Exclusão lógica e limpeza em segundo plano ---
+# As rotas de exclusão só preenchem 'deleted_at' (um UPDATE de uma linha ou,
+# na API em lote, um por bloco de ids) e colocam a tarefa 'purge_deleted' na
+# fila (app/jobs.py). O filtro de app/models.py já esconde a linha de todas
+# as consultas. O trabalho caro fica para a tarefa, em lotes de
+# PURGE_BATCH_SIZE linhas, cada lote na sua transação:
+#   1. funcionários excluídos: saem dos projetos e são apagados;
+#   2. departamentos/cargos excluídos: os funcionários que apontavam para
+#      eles ficam sem departamento/cargo, depois a linha é apagada.
+# As condições são reavaliadas a cada lote, então um departamento restaurado
+# no meio da limpeza (ex: recadastrado com o mesmo nome) não é apagado.
+
+employees = Employee.__table__
+
+# Modelo referenciado -> coluna de 'employees' que aponta para ele
+REFERENCES = {
+    Department: employees.c.department_id,
+    Position: employees.c.position_id,
+}
+
+def deleted_now() -> datetime:
+    """Valor de 'deleted_at' (UTC, sem fuso, como no restante do banco)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def soft_delete_statement(model, ids: list[int]):
+    """UPDATE ... SET deleted_at em massa (ids já excluídos são ignorados)"""
+    return (
+        update(model)
+        .where(model.id.in_(ids), model.deleted_at.is_(None))
+        .values(deleted_at=deleted_now())
+        .execution_options(synchronize_session=False)
+    )
+
+def restore_statement(model, ids: list[int]):
+    return (
+        update(model)
+        .where(model.id.in_(ids), model.deleted_at.is_not(None))
+        .values(deleted_at=None)
+        .execution_options(synchronize_session=False)
+    )
+
+def _deleted_ids(model):
+    table = model.__table__
+    return select(table.c.id).where(table.c.deleted_at.is_not(None))
+
+def pending_purge(conn: Connection) -> dict[str, int]:
+    """Quantas linhas esperam a limpeza, por tabela"""
+    return {
+        model.__tablename__: conn.scalar(select(func.count()).select_from(_deleted_ids(model).subquery()))
+        for model in (Employee, Department, Position)
+    }
+
+def purge_deleted(
+    engine: Engine,
+    batch_size: int,
+    progress: Callable[[int, int], None] | None = None,
+) -> dict[str, int]:
+    """
+    Apaga de vez as linhas excluídas, em lotes (tarefa 'purge_deleted').
+    Usa o Core direto: a exclusão já foi registrada na auditoria, e os
+    triggers do painel ignoram linhas com 'deleted_at'.
+    Retorna a quantidade por etapa.
+    """
+    report = {"employees": 0, "memberships": 0, "detached": 0, "departments": 0, "positions": 0}
+    with engine.connect() as conn:
+        total = sum(pending_purge(conn).values()) + sum(
+            conn.scalar(select(func.count()).select_from(employees).where(column.in_(_deleted_ids(model))))
+            for model, column in REFERENCES.items()
+        )
+    done = 0
+
+    def advance(count: int):
+        nonlocal done
+        done += count
+        if progress is not None:
+            progress(done, total)
+
+    # 1. Funcionários: associação com projetos e a própria linha
+    while True:
+        with engine.begin() as conn:
+            ids = conn.scalars(
+                select(employees.c.id).where(employees.c.deleted_at.is_not(None)).limit(batch_size)
+            ).all()
+            if not ids:
+                break
+            report["memberships"] += conn.execute(
+                delete(membership).where(membership.c.employee_id.in_(ids))
+            ).rowcount
+            report["employees"] += conn.execute(
+                delete(employees).where(employees.c.id.in_(ids), employees.c.deleted_at.is_not(None))
+            ).rowcount
+        advance(len(ids))
+
+    # 2. Departamentos e cargos: solta os funcionários e apaga a linha
+    for model, column in REFERENCES.items():
+        table = model.__table__
+        while True:
+            with engine.begin() as conn:
+                batch = select(employees.c.id).where(column.in_(_deleted_ids(model))).limit(batch_size)
+                count = conn.execute(
+                    update(employees).where(employees.c.id.in_(batch)).values({column.name: None})
+                ).rowcount
+            if not count:
+                break
+            report["detached"] += count
+            advance(count)
+        with engine.begin() as conn:
+            removed = conn.execute(
+                delete(table).where(
+                    table.c.deleted_at.is_not(None),
+                    ~exists().where(column == table.c.id),
+                )
+            ).rowcount
+        report[model.__tablename__] += removed
+        advance(removed)
+    return report
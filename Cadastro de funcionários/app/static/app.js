@@ -26,9 +26,15 @@ document.addEventListener('DOMContentLoaded', () => {
                 // FastAPI espera os dados do Form() como 'x-www-form-urlencoded'
                 const body = new URLSearchParams(formData); 
                 
+                // Versão que a página mostrou: se outra pessoa salvou antes, o servidor responde 409
+                const headers = { 'Content-Type': 'application/x-www-form-urlencoded' };
+                if (form.dataset.etag) {
+                    headers['If-Match'] = form.dataset.etag;
+                }
+
                 fetch(action, {
                     method: 'PUT',
-                    headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+                    headers: headers,
                     body: body
                 })
                 .then(response => {
@@ -36,6 +42,8 @@ document.addEventListener('DOMContentLoaded', () => {
                         // O 'employees.py' retorna 204
                         // Redireciona para a lista após sucesso
                         window.location.href = '/employees'; 
+                    } else if (response.status === 409) {
+                        alert('Este funcionário foi alterado por outra pessoa enquanto você editava. Recarregue a página para ver os dados atuais.');
                     } else {
                         alert('Erro ao atualizar. Verifique os dados.');
                     }
@@ -178,3 +186,121 @@ const deletePosButtons = document.querySelectorAll(".delete-position-btn");
         });
     });
 
+// --- SELETOR DE FUNCIONÁRIOS DO PROJETO (busca enquanto digita) ---
+// O campo tem 'data-candidates-url' (JSON paginado) e 'data-target' (id do <select>)
+document.addEventListener("DOMContentLoaded", () => {
+    const search = document.querySelector("input[data-candidates-url]");
+    if (!search) return;
+
+    const select = document.getElementById(search.dataset.target);
+    let timer = null;
+    let controller = null;
+
+    search.addEventListener("input", () => {
+        clearTimeout(timer);
+        // Espera o usuário parar de digitar antes de consultar
+        timer = setTimeout(() => {
+            if (controller) controller.abort(); // descarta a resposta anterior
+            controller = new AbortController();
+
+            const url = `${search.dataset.candidatesUrl}?q=${encodeURIComponent(search.value.trim())}`;
+            fetch(url, { signal: controller.signal })
+            .then(response => response.json())
+            .then(data => {
+                select.innerHTML = "";
+                data.items.forEach(emp => {
+                    select.add(new Option(`${emp.name} (${emp.email})`, emp.id));
+                });
+            })
+            .catch(error => {
+                if (error.name !== "AbortError") console.error("Erro na busca:", error);
+            });
+        }, 250);
+    });
+});
+
+// --- PROGRESSO DAS TAREFAS EM SEGUNDO PLANO (jobs/_progress.html) ---
+// Consulta /jobs/{id} a cada segundo até a tarefa terminar
+document.addEventListener("DOMContentLoaded", () => {
+    const STATUS_LABELS = {
+        queued: "Na fila",
+        running: "Em andamento",
+        done: "Concluída",
+        failed: "Falhou",
+        cancelled: "Cancelada",
+    };
+
+    document.querySelectorAll(".job-progress[data-job-url]").forEach(box => {
+        const url = box.dataset.jobUrl;
+        const bar = box.querySelector(".job-bar");
+        const cancel = box.querySelector(".job-cancel");
+        const download = box.querySelector(".job-download");
+        const result = box.querySelector(".job-result");
+
+        // Relatório da importação (mesmas informações da importação síncrona)
+        function showImportReport(report) {
+            const lines = [`Importados: ${report.imported}`, `Ignorados: ${report.skipped}`];
+            lines.forEach(text => {
+                const p = document.createElement("p");
+                p.textContent = text;
+                result.appendChild(p);
+            });
+            if (report.errors && report.errors.length) {
+                const title = document.createElement("h4");
+                title.textContent = "Erros";
+                const list = document.createElement("ul");
+                report.errors.forEach(e => {
+                    const item = document.createElement("li");
+                    item.textContent = `Linha ${e.row}: ${e.error}`;
+                    list.appendChild(item);
+                });
+                result.append(title, list);
+            }
+        }
+
+        function render(job) {
+            box.querySelector(".job-status").textContent = STATUS_LABELS[job.status] || job.status;
+            box.querySelector(".job-message").textContent = job.error || job.message || "";
+            if (job.percent === null) {
+                bar.removeAttribute("value"); // barra "indeterminada"
+            } else {
+                bar.value = job.percent;
+            }
+            box.querySelector(".job-count").textContent =
+                job.total ? `${job.progress} de ${job.total}` : (job.progress ? `${job.progress}` : "");
+
+            const finished = ["done", "failed", "cancelled"].includes(job.status);
+            cancel.hidden = finished || job.cancel_requested;
+            if (job.status === "done" && job.result) {
+                if (job.result.download_url) {
+                    download.href = job.result.download_url;
+                    download.hidden = false;
+                }
+                if (job.kind === "import_employees") showImportReport(job.result);
+            }
+            return finished;
+        }
+
+        function poll() {
+            fetch(url, { headers: { "Accept": "application/json" } })
+            .then(response => response.json())
+            .then(job => {
+                if (!render(job)) setTimeout(poll, 1000);
+            })
+            .catch(error => {
+                console.error("Erro ao consultar a tarefa:", error);
+                setTimeout(poll, 5000);
+            });
+        }
+
+        cancel.addEventListener("click", () => {
+            if (!confirm("Cancelar esta tarefa? O que já foi feito será desfeito.")) return;
+            fetch(`${url}/cancel`, { method: "POST" })
+            .then(response => response.json())
+            .then(render)
+            .catch(error => console.error("Erro ao cancelar:", error));
+        });
+
+        poll();
+    });
+});
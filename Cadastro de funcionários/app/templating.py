@@ -0,0 +1,62 @@
+# app/templating.py
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache, Template
+
+from app import config
+from app.helpers import format_brl_price, format_brl_date
+from app.metrics import record_template
+
+# --- Ambiente Jinja único (compartilhado por todos os routers) ---
+
+class TimedTemplate(Template):
+    """Template que soma o tempo de renderização nas métricas do request"""
+
+    def render(self, *args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            record_template(time.perf_counter() - started_at)
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+templates.env.template_class = TimedTemplate
+
+# Bytecode cache: os templates compilados ficam em disco, então um worker
+# novo (ou um restart) não precisa recompilar tudo no primeiro acesso
+_cache_dir = Path(config.TEMPLATE_CACHE_DIR or Path(tempfile.gettempdir()) / "cadastro-jinja-cache")
+_cache_dir.mkdir(parents=True, exist_ok=True)
+templates.env.bytecode_cache = FileSystemBytecodeCache(str(_cache_dir))
+
+# Filtros disponíveis em todos os templates
+templates.env.filters["brl_price"] = format_brl_price
+templates.env.filters["brl_date"] = format_brl_date
+
+# --- Renderização em streaming ---
+
+def stream_template(name: str, context: dict, chunk_size: int = config.TEMPLATE_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Renderiza com Template.generate() e entrega blocos de ~chunk_size
+    caracteres (para um StreamingResponse). 'context' precisa ter o 'request'.
+    O tempo medido inclui a leitura das linhas que o template percorre.
+    """
+    pieces = templates.get_template(name).generate(context)
+    buffer, size = [], 0
+    started_at = time.perf_counter()
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            record_template(time.perf_counter() - started_at)
+            yield "".join(buffer).encode("utf-8")
+            buffer.clear()
+            size = 0
+            started_at = time.perf_counter()
+    record_template(time.perf_counter() - started_at)
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
@@ -0,0 +1,7 @@
+# benchmarks/__init__.py
+# Benchmarks do projeto. Rode a partir da pasta do projeto, por exemplo:
+#   python -m benchmarks.sqlite_profile
+#   python -m benchmarks --json resultado.json   (carga + micro, JSON comparável)
+#   python -m benchmarks.compare antes.json depois.json
+#   python -m benchmarks.datagen /tmp/bench.db --employees 50000
+#   python -m benchmarks.load / python -m benchmarks.micro
@@ -0,0 +1,68 @@
+# benchmarks/__main__.py
+"""
+Roda a suíte completa (carga + micro) e grava um JSON comparável entre commits:
+
+    python -m benchmarks --json antes.json
+    git checkout outro-commit
+    python -m benchmarks --json depois.json
+    python -m benchmarks.compare antes.json depois.json
+
+A carga roda num SQLite temporário; com --database-url, num banco vazio
+qualquer (ex: PostgreSQL local), para comparar os dois backends.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200, help="requests por rota")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--database-url", help="banco vazio onde a carga gera os dados (padrão: SQLite temporário)")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+    }
+    # A carga vem primeiro: ela define o DATABASE_URL antes de qualquer import de 'app'
+    if not args.skip_load:
+        from benchmarks import load
+        report["load"] = load.run(
+            requests=args.requests,
+            concurrency=args.concurrency,
+            dataset={"employees": args.employees, "seed": args.seed},
+            database_url=args.database_url,
+        )
+    if not args.skip_micro:
+        from benchmarks import micro
+        report["micro"] = micro.run()
+
+    output = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/compare.py
+"""
+Compara dois resultados de 'python -m benchmarks --json' (ou de load/micro):
+
+    python -m benchmarks.compare antes.json depois.json
+"""
+import argparse
+import json
+
+# Métrica -> True se "maior é melhor"
+METRICS = {"rps": True, "p50_ms": False, "p99_ms": False, "ops_per_sec": True}
+
+def _flatten(report: dict) -> dict[tuple[str, str], float]:
+    """{(item, métrica): valor} para as rotas da carga e os micro-benchmarks"""
+    if "meta" in report:            # python -m benchmarks
+        sections = [(report.get("load") or {}).get("routes", {}), report.get("micro", {})]
+    elif "routes" in report:        # python -m benchmarks.load
+        sections = [report["routes"]]
+    else:                           # python -m benchmarks.micro
+        sections = [report]
+    values = {}
+    for section in sections:
+        for name, metrics in section.items():
+            if not isinstance(metrics, dict):
+                continue
+            for metric, value in metrics.items():
+                if metric in METRICS and isinstance(value, (int, float)):
+                    values[(name, metric)] = value
+    return values
+
+def compare(before: dict, after: dict) -> list[tuple[str, str, float, float, float]]:
+    old, new = _flatten(before), _flatten(after)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        name, metric = key
+        change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+        rows.append((name, metric, old[key], new[key], change))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as file:
+        before = json.load(file)
+    with open(args.after, encoding="utf-8") as file:
+        after = json.load(file)
+
+    rows = compare(before, after)
+    width = max((len(name) for name, *_ in rows), default=10)
+    print(f"{'item':<{width}}  {'métrica':<11} {'antes':>12} {'depois':>12} {'variação':>9}")
+    for name, metric, old, new, change in rows:
+        better = (change > 0) == METRICS[metric]
+        mark = "" if abs(change) < 5 else ("  melhor" if better else "  PIOR")
+        print(f"{name:<{width}}  {metric:<11} {old:>12.2f} {new:>12.2f} {change:>+8.1f}%{mark}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/datagen.py
+"""
+Gera um banco com dados sintéticos e reprodutíveis (mesma semente = mesmos
+dados): departamentos, cargos, funcionários, projetos e membros.
+
+    python -m benchmarks.datagen /tmp/bench.db --employees 50000 --seed 42
+    python -m benchmarks.datagen postgresql+psycopg2://localhost/bench    # banco vazio
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from sqlalchemy import insert
+
+from app.backends import get_backend
+from app.database import Base, create_db_engine
+from app.migrations import upgrade
+from app.models import Department, Employee, Position, Project, User, employee_project_association
+
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench-password"
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Henrique",
+               "Isabela", "João", "Karina", "Lucas", "Mariana", "Nicolas", "Olívia", "Pedro",
+               "Quésia", "Rafael", "Sofia", "Tiago", "Úrsula", "Vinícius", "Wagner", "Yasmin"]
+LAST_NAMES = ["Almeida", "Barbosa", "Cardoso", "Dias", "Esteves", "Ferreira", "Gomes", "Hernandes",
+              "Lima", "Martins", "Nascimento", "Oliveira", "Pereira", "Ribeiro", "Santos", "Teixeira"]
+
+def generate(
+    url: str,
+    departments: int = 20,
+    positions: int = 40,
+    employees: int = 20_000,
+    projects: int = 50,
+    members_per_project: int = 100,
+    seed: int = 42,
+    batch_size: int = 5_000,
+) -> dict:
+    """Cria o esquema (create_all + migrações) e insere os dados; retorna os totais"""
+    rnd = random.Random(seed)
+    backend = get_backend(url)
+    engine = create_db_engine(url)
+    Base.metadata.create_all(engine)
+    upgrade(engine)
+
+    from app.auth import get_password_hash  # bcrypt só é carregado se for gerar o banco
+
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"username": BENCH_USERNAME, "hashed_password": get_password_hash(BENCH_PASSWORD)}
+        ])
+        conn.execute(insert(Department.__table__), [
+            {"id": i, "name": f"Departamento {i:03d}"} for i in range(1, departments + 1)
+        ])
+        conn.execute(insert(Position.__table__), [
+            {"id": i, "title": f"Cargo {i:03d}"} for i in range(1, positions + 1)
+        ])
+
+        batch = []
+        for i in range(1, employees + 1):
+            batch.append({
+                "id": i,
+                "name": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)} {i}",
+                "email": f"funcionario{i}@empresa.com",
+                "phone": f"11 9{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}",
+                "salary": round(rnd.lognormvariate(8.3, 0.5), 2),
+                # ~5% sem departamento/cargo, como na base real
+                "department_id": rnd.randint(1, departments) if rnd.random() > 0.05 else None,
+                "position_id": rnd.randint(1, positions) if rnd.random() > 0.05 else None,
+            })
+            if len(batch) >= batch_size:
+                backend.bulk_insert(conn, Employee.__table__, batch)
+                batch.clear()
+        if batch:
+            backend.bulk_insert(conn, Employee.__table__, batch)
+
+        conn.execute(insert(Project.__table__), [
+            {"id": i, "name": f"Projeto {i:03d}", "description": f"Projeto sintético {i}"}
+            for i in range(1, projects + 1)
+        ])
+        memberships = [
+            {"project_id": project_id, "employee_id": employee_id}
+            for project_id in range(1, projects + 1)
+            for employee_id in rnd.sample(range(1, employees + 1), min(members_per_project, employees))
+        ]
+        if memberships:
+            conn.execute(insert(employee_project_association), memberships)
+        # Os ids foram informados: os próximos cadastros continuam depois deles
+        backend.reset_sequences(conn, [Department.__table__, Position.__table__, Employee.__table__, Project.__table__])
+    engine.dispose()
+
+    return {
+        "seed": seed,
+        "departments": departments,
+        "positions": positions,
+        "employees": employees,
+        "projects": projects,
+        "members_per_project": members_per_project,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="arquivo .db a criar (não pode existir) ou URL de um banco vazio")
+    parser.add_argument("--departments", type=int, default=20)
+    parser.add_argument("--positions", type=int, default=40)
+    parser.add_argument("--employees", type=int, default=20_000)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--members-per-project", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    is_url = "://" in args.path
+    if not is_url and os.path.exists(args.path):
+        parser.error(f"{args.path} já existe")
+
+    started = time.perf_counter()
+    totals = generate(
+        args.path if is_url else f"sqlite:///{args.path}",
+        departments=args.departments,
+        positions=args.positions,
+        employees=args.employees,
+        projects=args.projects,
+        members_per_project=args.members_per_project,
+        seed=args.seed,
+    )
+    totals["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(totals, indent=2))
+
+if __name__ == "__main__":
+    main()
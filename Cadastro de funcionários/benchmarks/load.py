@@ -0,0 +1,146 @@
+# benchmarks/load.py
+"""
+Teste de carga em processo: httpx (ASGITransport) chamando main:app, sem
+rede nem servidor. Mede p50/p99 e requests/s das rotas principais sobre um
+banco gerado por benchmarks.datagen.
+
+    python -m benchmarks.load --employees 20000 --requests 300 --concurrency 8 --json load.json
+    python -m benchmarks.load --db /tmp/bench.db      # reaproveita um banco já gerado
+    python -m benchmarks.load --database-url postgresql+psycopg2://localhost/bench   # banco vazio
+
+Cliente e servidor dividem o mesmo processo e event loop: os números servem
+para comparar commits entre si, não para estimar a capacidade em produção.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+# Rotas medidas (a página de um funcionário/projeto usa o id 1 do banco gerado)
+ROUTES = [
+    "/employees",
+    "/employees?name=Ana",
+    "/employees?department_id=3",
+    "/employees/search?q=mari",
+    "/employees/1",
+    "/departments",
+    "/projects/",
+    "/projects/1",
+    "/dashboard",
+    "/api/v1/dashboard",
+]
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def _measure(client, path: str, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+    }
+
+async def _run(routes: list[str], requests: int, concurrency: int, warmup: int) -> dict:
+    # Importado só aqui: DATABASE_URL já precisa apontar para o banco de teste
+    import httpx
+    import main
+    from app.auth import create_access_token
+    from benchmarks.datagen import BENCH_USERNAME
+
+    token = create_access_token({"sub": BENCH_USERNAME})
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+        cookies={"access_token": f"Bearer {token}"},
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+        results = {}
+        for path in routes:
+            for _ in range(warmup):
+                await client.get(path)
+            results[path] = await _measure(client, path, requests, concurrency)
+    if main.async_engine is not None:
+        await main.async_engine.dispose()
+    return results
+
+def run(
+    db_path: str | None = None,
+    routes: list[str] = ROUTES,
+    requests: int = 200,
+    concurrency: int = 8,
+    warmup: int = 10,
+    dataset: dict | None = None,
+    database_url: str | None = None,
+) -> dict:
+    """
+    Gera o banco (se 'db_path' não for informado), aponta a aplicação para
+    ele e mede as rotas. Precisa rodar antes de qualquer import de 'app'.
+    Com 'database_url' (um banco vazio, ex: PostgreSQL local), os dados são
+    gerados nele em vez de num SQLite temporário.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        generated = None
+        if db_path is not None and database_url is None:
+            os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        else:
+            os.environ["DATABASE_URL"] = database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            from benchmarks.datagen import generate
+            generated = generate(os.environ["DATABASE_URL"], **(dataset or {}))
+        results = asyncio.run(_run(routes, requests, concurrency, warmup))
+    from app.database import backend
+    return {"dataset": generated, "database": backend.name, "routes": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="banco já gerado por benchmarks.datagen (padrão: gera um temporário)")
+    parser.add_argument("--database-url", help="gera os dados neste banco vazio (ex: PostgreSQL) e mede nele")
+    parser.add_argument("--employees", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200, help="requests por rota")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--route", action="append", help="mede só esta rota (pode repetir)")
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+
+    results = run(
+        db_path=args.db,
+        routes=args.route or ROUTES,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        dataset={"employees": args.employees, "seed": args.seed},
+        database_url=args.database_url,
+    )
+    output = json.dumps(results, indent=2)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# benchmarks/micro.py
+"""
+Micro-benchmarks das funções chamadas a cada linha/request:
+formatação e leitura de preços (R$), decodificação do JWT e renderização
+de templates. Não precisam de banco.
+
+Antes de medir, confere que os helpers de preço dão exatamente o mesmo
+resultado que as versões anteriores (_legacy_*, medidas junto para comparação).
+
+    python -m benchmarks.micro --json micro.json
+"""
+import argparse
+import json
+import random
+import timeit
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.helpers import (
+    format_brl_price, format_brl_prices, parse_brl_decimal, parse_brl_price, parse_brl_prices,
+)
+
+# --- Equivalência dos helpers de preço ---
+
+def _legacy_format_brl_price(value):
+    """format_brl_price original (as mesmas três trocas, sem o retorno antecipado para None)"""
+    if value is None:
+        value = 0.0
+    try:
+        formatted_str = f"{value:,.2f}"
+        formatted_str = formatted_str.replace(",", "v")
+        formatted_str = formatted_str.replace(".", ",")
+        formatted_str = formatted_str.replace("v", ".")
+        return f"R$ {formatted_str}"
+    except (ValueError, TypeError):
+        return "R$ 0,00"
+
+def _legacy_parse_brl_price(value):
+    """parse_brl_price antes do caminho rápido para str"""
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        s = str(value).strip().replace("R$", "").replace(".", "")
+        s = s.replace(",", ".")
+        return float(s)
+    except (ValueError, TypeError):
+        return 0.0
+
+# Casos de borda além dos valores aleatórios
+EDGE_PRICES = [None, 0, 0.0, -0.0, 0.005, 0.015, 1.005, -1234.5, 999.999, 1e15, -1e-9,
+               float("nan"), float("inf"), float("-inf"), True, "abc", 12345678901234.56]
+EDGE_TEXTS = [None, "", " ", "R$", "R$ 0,00", "R$ 1.234,50", "  R$ 1.234,50  ", "R$\u00a01.234,50",
+              "1234.50", "1234,5", "-R$ 12,00", "R$ -12,00", "1_000,00", "1.2.3", "abc", "nan", "inf",
+              0, 12, 12.5, -3.25, True, "R$ 12,345,678"]
+
+def check_brl_equivalence(prices: list[float], texts: list[str]) -> None:
+    """AssertionError se algum helper novo divergir da versão anterior"""
+    for value in prices + EDGE_PRICES:
+        expected = _legacy_format_brl_price(value)
+        assert format_brl_price(value) == expected, (value, format_brl_price(value), expected)
+    assert format_brl_prices(prices) == [_legacy_format_brl_price(value) for value in prices]
+
+    def same(a, b):
+        return a == b or (a != a and b != b)  # nan == nan
+
+    for text in texts + EDGE_TEXTS:
+        expected = _legacy_parse_brl_price(text)
+        assert same(parse_brl_price(text), expected), (text, parse_brl_price(text), expected)
+    assert parse_brl_prices(texts) == [_legacy_parse_brl_price(text) for text in texts]
+
+    # Decimal: mesmo número que o float, já em centavos exatos
+    for text in texts:
+        assert parse_brl_decimal(text) == Decimal(repr(_legacy_parse_brl_price(text))).quantize(Decimal("0.01"))
+    assert parse_brl_decimal("R$ 1.234,505") == Decimal("1234.51")
+    assert parse_brl_decimal("0,1") + parse_brl_decimal("0,2") == Decimal("0.30")
+    assert format_brl_price(Decimal("1234567.89")) == "R$ 1.234.567,89"
+
+def _request_stub():
+    """Request mínimo para o url_for() do base.html"""
+    from starlette.requests import Request
+    from starlette.routing import Mount, Router
+    from starlette.staticfiles import StaticFiles
+
+    router = Router(routes=[Mount("/static", app=StaticFiles(directory="."), name="static")])
+    return Request({
+        "type": "http", "method": "GET", "path": "/employees", "root_path": "",
+        "scheme": "http", "server": ("localhost", 8000), "headers": [], "query_string": b"",
+        "app": SimpleNamespace(), "router": router,
+    })
+
+def _employee_page_context(rows: int) -> dict:
+    rnd = random.Random(1)
+    employees = [
+        SimpleNamespace(
+            id=i, name=f"Funcionário {i}", email=f"func{i}@empresa.com", phone="11 91234-5678",
+            salary=round(rnd.uniform(1500, 30000), 2), department_id=i % 10, position_id=i % 20,
+        )
+        for i in range(rows)
+    ]
+    departments = [SimpleNamespace(id=i, name=f"Departamento {i}") for i in range(10)]
+    positions = [SimpleNamespace(id=i, title=f"Cargo {i}") for i in range(20)]
+    return {
+        "request": _request_stub(),
+        "employees": employees,
+        "departments": departments,
+        "positions": positions,
+        "department_names": {d.id: d.name for d in departments},
+        "position_titles": {p.id: p.title for p in positions},
+        "filters": {},
+        "limit": rows,
+        "paginate": True,
+        "next_url": "/employees?after=1",
+        "prev_url": None,
+        "user": SimpleNamespace(username="bench"),
+    }
+
+def benchmarks(rows: int = 50) -> dict:
+    """nome -> função sem argumentos a ser medida"""
+    from app.auth import ALGORITHM, SECRET_KEY, create_access_token
+    from app.templating import templates
+    from jose import jwt
+
+    rnd = random.Random(42)
+    prices = [rnd.uniform(0, 100_000) for _ in range(1000)]
+    texts = [format_brl_price(price) for price in prices]
+    check_brl_equivalence(prices, texts)
+    token = create_access_token({"sub": "bench"})
+    page = templates.get_template("employees/index.html")
+    context = _employee_page_context(rows)
+
+    return {
+        "format_brl_price": lambda: [format_brl_price(price) for price in prices],
+        "format_brl_price_legacy": lambda: [_legacy_format_brl_price(price) for price in prices],
+        "format_brl_prices": lambda: format_brl_prices(prices),
+        "parse_brl_price": lambda: [parse_brl_price(text) for text in texts],
+        "parse_brl_price_legacy": lambda: [_legacy_parse_brl_price(text) for text in texts],
+        "parse_brl_prices": lambda: parse_brl_prices(texts),
+        "parse_brl_decimal": lambda: [parse_brl_decimal(text) for text in texts],
+        "jwt_decode": lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]),
+        f"render_employees_index_{rows}_rows": lambda: page.render(context),
+    }
+
+# Quantas chamadas cada item representa (os de preço processam 1000 valores)
+ITEMS_PER_CALL = {
+    name: 1000
+    for name in ("format_brl_price", "format_brl_price_legacy", "format_brl_prices",
+                 "parse_brl_price", "parse_brl_price_legacy", "parse_brl_prices", "parse_brl_decimal")
+}
+
+def run(repeat: int = 5, min_time: float = 0.2, rows: int = 50) -> dict:
+    """Melhor de 'repeat' rodadas de pelo menos 'min_time' segundos cada"""
+    results = {}
+    for name, func in benchmarks(rows).items():
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        number = max(1, int(number * min_time / 0.2))
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        per_item = best / ITEMS_PER_CALL.get(name, 1)
+        results[name] = {
+            "ns_per_op": round(per_item * 1e9, 1),
+            "ops_per_sec": round(1 / per_item, 1),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="segundos por rodada")
+    parser.add_argument("--rows", type=int, default=50, help="linhas na página renderizada")
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.min_time, args.rows)
+    output = json.dumps(results, indent=2)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/sqlite_profile.py
+"""
+Compara a vazão de leitura/escrita mista do SQLite nos perfis "legacy"
+(rollback journal, padrão do SQLite) e "production" (WAL + pragmas).
+
+    python -m benchmarks.sqlite_profile --threads 8 --seconds 5 --write-ratio 0.2
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Employee
+
+def seed(url: str, employees: int):
+    engine = create_db_engine(url, profile="legacy")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Employee.__table__), [
+            {"name": f"Funcionário {i}", "email": f"func{i}@empresa.com", "salary": 1000 + i % 9000}
+            for i in range(employees)
+        ])
+    engine.dispose()
+
+def run_profile(url: str, profile: str, threads: int, seconds: float, write_ratio: float, employees: int) -> dict:
+    engine = create_db_engine(url, profile=profile)
+    Session = sessionmaker(bind=engine)
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed_value: int):
+        rnd = random.Random(seed_value)
+        local = {"reads": 0, "writes": 0, "locked": 0}
+        while time.perf_counter() < deadline:
+            with Session() as db:
+                try:
+                    if rnd.random() < write_ratio:
+                        db.execute(
+                            update(Employee)
+                            .where(Employee.id == rnd.randint(1, employees))
+                            .values(salary=rnd.randint(1000, 20000))
+                        )
+                        db.commit()
+                        local["writes"] += 1
+                    else:
+                        cursor = rnd.randint(50, employees)
+                        db.scalars(
+                            select(Employee).where(Employee.id < cursor).order_by(Employee.id.desc()).limit(50)
+                        ).all()
+                        local["reads"] += 1
+                except OperationalError:
+                    # "database is locked"
+                    db.rollback()
+                    local["locked"] += 1
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    return {
+        "profile": profile,
+        "ops_per_sec": round((counts["reads"] + counts["writes"]) / elapsed, 1),
+        "reads_per_sec": round(counts["reads"] / elapsed, 1),
+        "writes_per_sec": round(counts["writes"] / elapsed, 1),
+        "locked_errors": counts["locked"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--employees", type=int, default=20_000)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in ("legacy", "production"):
+            # Banco novo por perfil (o modo WAL fica gravado no arquivo)
+            url = f"sqlite:///{os.path.join(tmp, profile + '.db')}"
+            seed(url, args.employees)
+            results.append(run_profile(url, profile, args.threads, args.seconds, args.write_ratio, args.employees))
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
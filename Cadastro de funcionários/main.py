@@ -1,12 +1,21 @@
 # main.py
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.responses import RedirectResponse
 from pathlib import Path
 from contextlib import asynccontextmanager
+import os
 
 # Importa a 'Base' e 'engine' da sua database
-from app.database import Base, engine 
+from app.database import engine, async_engine
+from app.security import password_hasher
+from app.metrics import MetricsMiddleware, registry, render_gauges
+from app.migrations import SCHEMA_READY_ENV, setup_schema
+from app.cachesync import CacheSyncMiddleware, cache_sync
+from app.audit import audit_writer
+from app.jobs import job_runner
+from app import config
 
 # Importa TODOS os routers
 from app.routers import (
@@ -14,29 +23,55 @@ from app.routers import (
     departments_router, 
     positions_router,
     auth_router,        
-    projects_router     
+    projects_router,
+    api_router,
+    dashboard_router,
+    jobs_router
 )
 
 # --- Evento de Startup (Lifespan) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Isto roda ANTES do servidor ligar
-    print("Servidor iniciando... Criando tabelas...")
-    Base.metadata.create_all(bind=engine)
-    print("Tabelas prontas.")
+    # Com o serve.py as tabelas e migrações já foram feitas, uma vez, no processo principal
+    if not os.environ.get(SCHEMA_READY_ENV):
+        print("Servidor iniciando... Criando tabelas...")
+        # create_all + migrações pendentes (índices, busca textual...), sob um lock
+        # em arquivo para que vários workers não façam isso ao mesmo tempo
+        setup_schema(engine)
+        print("Tabelas prontas.")
+    # Importações/exportações longas rodam em segundo plano neste worker (app/jobs.py)
+    if config.JOB_RUNNER:
+        job_runner.start()
     yield
-    # Isto roda DEPOIS do servidor desligar
+    # Isto roda DEPOIS do servidor desligar (requests em andamento já terminaram)
     print("Servidor desligando...")
+    # Tarefas em andamento desfazem o lote e voltam para a fila
+    await job_runner.stop()
+    # Grava as entradas de auditoria que ainda estão na fila
+    audit_writer.stop()
+    cache_sync.close()
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
 
 # Cria a instância principal do FastAPI
 app = FastAPI(title="Projeto de RH", lifespan=lifespan)
 
+# Latência, SQL e templates por request (Server-Timing e /metrics)
+app.add_middleware(MetricsMiddleware)
+# Caches invalidados por outros workers (fica por fora, fora das métricas do request)
+app.add_middleware(CacheSyncMiddleware)
+
 # --- INCLUSÃO DE ROUTERS ---
 app.include_router(auth_router)        
 app.include_router(projects_router)    
 app.include_router(employees_router)
 app.include_router(departments_router)
 app.include_router(positions_router)
+app.include_router(api_router)
+app.include_router(dashboard_router)
+app.include_router(jobs_router)
 
 # --- ARQUIVOS ESTÁTICOS ---
 BASE_DIR = Path(__file__).resolve().parent
@@ -57,4 +92,13 @@ def status(request: Request):
         "status": "ok",
         "host": request.client.host,
         "port": request.url.port or 80,
-    }
\ No newline at end of file
+        "password_pool": password_hasher.stats(),
+        "audit": audit_writer.stats(),
+        "jobs": job_runner.stats(),
+    }
+
+# Métricas no formato do Prometheus
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    pool = render_gauges("password_pool", password_hasher.stats(), "Pool do bcrypt (ver /status).")
+    return PlainTextResponse(registry.render() + pool, media_type="text/plain; version=0.0.4")
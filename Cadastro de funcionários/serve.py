@@ -0,0 +1,120 @@
+# serve.py
+"""
+Servidor de produção: vários workers uvicorn atendendo o mesmo socket.
+
+    python serve.py --workers 4 --port 8000
+    python serve.py --workers 4 --preload     # importa a aplicação antes do fork
+
+O processo principal:
+  1. cria as tabelas e aplica as migrações uma única vez (lock em arquivo);
+  2. abre o socket e cria os workers (fork). Com --preload a aplicação já
+     vem importada (módulos, templates) e é compartilhada por copy-on-write;
+  3. recria um worker que morrer;
+  4. no SIGTERM/SIGINT (Ctrl+C) avisa os workers: cada um para de aceitar
+     conexões, espera os requests em andamento (até --graceful-timeout) e
+     fecha os pools de conexões no lifespan. Quem passar do prazo é morto.
+
+Os caches de cada worker ficam coerentes pela tabela cache_versions
+(app/cachesync.py). Para desenvolvimento continue usando
+'uvicorn main:app --reload'.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+
+import uvicorn
+
+from app import config
+
+def _run_worker(uvicorn_config: uvicorn.Config, sock):
+    # Grupo de processos próprio: o Ctrl+C do terminal chega só ao processo
+    # principal, que avisa cada worker uma única vez (um segundo sinal faria
+    # o uvicorn sair sem esperar os requests)
+    os.setpgrp()
+    uvicorn.Server(uvicorn_config).run(sockets=[sock])
+
+def _stop_workers(workers: dict, timeout: float):
+    for process in workers.values():
+        process.terminate()  # SIGTERM: desligamento gracioso do uvicorn
+    deadline = time.monotonic() + timeout
+    for process in workers.values():
+        process.join(max(0.0, deadline - time.monotonic()))
+    for pid, process in workers.items():
+        if process.is_alive():
+            print(f"Worker {pid} não terminou a tempo; encerrando à força.")
+            process.kill()
+            process.join()
+
+def serve(host: str, port: int, workers: int, preload: bool, graceful_timeout: int):
+    from app.database import engine
+    from app.migrations import SCHEMA_READY_ENV, setup_schema
+
+    print("Criando tabelas e aplicando migrações...")
+    setup_schema(engine)
+    # Nenhuma conexão aberta pode atravessar o fork
+    engine.dispose()
+    os.environ[SCHEMA_READY_ENV] = "1"
+
+    if os.name == "nt":
+        # Sem fork no Windows: o próprio uvicorn cria os workers (sem preload)
+        uvicorn.run("main:app", host=host, port=port, workers=workers,
+                    timeout_graceful_shutdown=graceful_timeout)
+        return
+
+    app = "main:app"
+    if preload:
+        import main
+        app = main.app
+    uvicorn_config = uvicorn.Config(app, host=host, port=port, timeout_graceful_shutdown=graceful_timeout)
+    sock = uvicorn_config.bind_socket()
+
+    context = multiprocessing.get_context("fork")
+    running: dict[int, multiprocessing.Process] = {}
+
+    def spawn():
+        process = context.Process(target=_run_worker, args=(uvicorn_config, sock))
+        process.start()
+        running[process.pid] = process
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    print(f"Iniciando {workers} worker(s) em http://{host}:{port} (preload={'sim' if preload else 'não'})")
+    for _ in range(workers):
+        spawn()
+
+    while not stopping:
+        time.sleep(0.5)
+        for pid, process in list(running.items()):
+            if not process.is_alive() and not stopping:
+                print(f"Worker {pid} saiu (código {process.exitcode}); criando outro.")
+                del running[pid]
+                spawn()
+
+    print("Desligando: aguardando os requests em andamento...")
+    # Margem para o lifespan fechar os pools depois do prazo dos requests
+    _stop_workers(running, graceful_timeout + 5)
+    sock.close()
+    print("Servidor desligado.")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.WEB_WORKERS)
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=config.WEB_PRELOAD)
+    parser.add_argument("--graceful-timeout", type=int, default=config.WEB_GRACEFUL_TIMEOUT,
+                        help="segundos para os requests em andamento terminarem")
+    args = parser.parse_args()
+    serve(args.host, args.port, max(1, args.workers), args.preload, args.graceful_timeout)
+
+if __name__ == "__main__":
+    main()
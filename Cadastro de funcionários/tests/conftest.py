@@ -0,0 +1,57 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# --- Banco dos testes ---
+# app/config.py lê o ambiente na importação, então o banco é definido aqui,
+# antes do primeiro 'import app'. Por padrão, um SQLite temporário; com
+# TEST_DATABASE_URL, o banco indicado (ex: um PostgreSQL vazio), para rodar
+# a mesma suíte nos dois backends:
+#   python -m pytest
+#   TEST_DATABASE_URL=postgresql+psycopg2://localhost/cadastro_test python -m pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.mkdtemp(prefix="cadastro-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_tmp}/test.db"
+os.environ["JOBS_DATABASE_URL"] = f"sqlite:///{_tmp}/jobs.db"
+os.environ["JOB_FILES_DIR"] = _tmp
+os.environ["JOB_RUNNER"] = "0"
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    """Tabelas e migrações, uma vez por execução"""
+    from app.database import engine
+    from app.migrations import setup_schema
+
+    setup_schema(engine)
+    return engine
+
+@pytest.fixture(scope="session")
+def client(schema):
+    """
+    TestClient da aplicação, já logado (cookie das telas e cabeçalho da API)
+    como o usuário 'tests'
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy import select
+
+    import main
+    from app.auth import create_access_token
+    from app.database import SessionLocal
+    from app.models import User
+
+    with SessionLocal() as db:
+        if db.scalar(select(User).where(User.username == "tests")) is None:
+            db.add(User(username="tests", hashed_password="-"))
+            db.commit()
+
+    token = "Bearer " + create_access_token({"sub": "tests"})
+    with TestClient(main.app, follow_redirects=False) as test_client:
+        test_client.cookies.set("access_token", token)
+        test_client.headers["Authorization"] = token
+        yield test_client
@@ -0,0 +1,167 @@
+# tests/test_api_batch.py
+import time
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import select, update
+
+from app import batch, config
+from app.database import SessionLocal, engine
+from app.models import Employee
+
+# --- Lote de funcionários (POST /api/v1/employees/batch) ---
+
+URL = "/api/v1/employees/batch"
+
+@pytest.fixture
+def people(client):
+    """Três funcionários novos; retorna [(id, email)]"""
+    suffix = time.time_ns()
+    emails = [f"lote{i}.{suffix}@x.com" for i in range(3)]
+    response = client.post(URL, json=[{"op": "create", "name": f"Lote {i}", "email": email} for i, email in enumerate(emails)])
+    assert response.status_code == 200
+    return [(item["id"], email) for item, email in zip(response.json()["results"], emails)]
+
+def _row(employee_id: int):
+    with SessionLocal() as db:
+        return db.execute(
+            select(Employee.name, Employee.email, Employee.version, Employee.deleted_at)
+            .where(Employee.id == employee_id)
+            .execution_options(include_deleted=True)
+        ).one_or_none()
+
+def test_mixed_operations_report_each_item(client, people):
+    (first, _), (second, second_email), (third, _) = people
+    new_email = f"novo.{time.time_ns()}@x.com"
+    response = client.post(URL, json=[
+        {"op": "update", "id": first, "name": "Primeiro", "version": 1},
+        {"op": "delete", "id": second},
+        {"op": "create", "name": "Novo", "email": new_email},
+        {"op": "create", "name": "Repetido", "email": second_email},  # email ainda ocupado (exclusão lógica)
+        {"op": "update", "id": 0, "name": "Ninguém"},
+        {"op": "update", "id": third, "department_id": 999_999},
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["applied"], body["succeeded"], body["failed"]) == (True, 3, 3)
+    assert [(item["index"], item["status"]) for item in body["results"]] == [
+        (0, "ok"), (1, "ok"), (2, "ok"), (3, "error"), (4, "error"), (5, "error"),
+    ]
+    assert body["results"][0]["version"] == 2
+    assert body["results"][2]["version"] == 1
+    assert "já cadastrado" in body["results"][3]["error"]
+    assert body["results"][4]["error"] == "Funcionário não encontrado"
+    assert "Departamento 999999" in body["results"][5]["error"]
+
+    assert _row(first)[:3] == ("Primeiro", people[0][1], 2)
+    assert _row(second).deleted_at is not None
+    assert _row(body["results"][2]["id"]).name == "Novo"
+    assert _row(third).version == 1
+
+def test_stale_version_is_an_item_error(client, people):
+    (first, _), (second, _), _ = people
+    response = client.post(URL, json=[
+        {"op": "update", "id": first, "name": "Velho", "version": 7},
+        {"op": "update", "id": second, "name": "Atual", "version": 1},
+    ])
+
+    body = response.json()
+    assert response.status_code == 200
+    assert [item["status"] for item in body["results"]] == ["error", "ok"]
+    assert "versão atual: 1" in body["results"][0]["error"]
+    assert _row(first).name == "Lote 0"
+    assert _row(second)[::2] == ("Atual", 2)
+
+def test_repeated_updates_of_one_employee(client, people):
+    (first, _), _, _ = people
+    response = client.post(URL, json=[
+        {"op": "update", "id": first, "name": "Uma", "version": 1},
+        {"op": "update", "id": first, "phone": "11 9999-0000", "version": 2},
+    ])
+
+    assert [item["version"] for item in response.json()["results"]] == [2, 3]
+    with SessionLocal() as db:
+        assert db.execute(select(Employee.name, Employee.phone, Employee.version).where(Employee.id == first)).one() == (
+            "Uma", "11 9999-0000", 3
+        )
+
+def test_concurrent_change_during_batch_is_an_item_error(client, people, monkeypatch):
+    """Outro request altera o funcionário depois da leitura e antes do UPDATE do lote"""
+    (first, _), (second, _), _ = people
+    original = batch._update_versioned
+
+    def edited_meanwhile(db, rows):
+        with engine.begin() as conn:
+            conn.execute(update(Employee).where(Employee.id == first).values(name="Outra pessoa", version=Employee.version + 1))
+        return original(db, rows)
+
+    monkeypatch.setattr(batch, "_update_versioned", edited_meanwhile)
+    response = client.post(URL, json=[
+        {"op": "update", "id": first, "name": "Do lote"},
+        {"op": "update", "id": first, "phone": "11 1111-1111"},
+        {"op": "update", "id": second, "name": "Segundo"},
+    ])
+
+    body = response.json()
+    assert (body["applied"], body["succeeded"], body["failed"]) == (True, 1, 2)
+    assert [item["status"] for item in body["results"]] == ["error", "error", "ok"]
+    assert body["results"][0]["error"] == "Alterado por outra pessoa durante o lote"
+    assert _row(first)[::2] == ("Outra pessoa", 2)
+    assert _row(second)[::2] == ("Segundo", 2)
+
+def test_concurrent_change_rejects_atomic_batch(client, people, monkeypatch):
+    (first, _), (second, _), _ = people
+    original = batch._update_versioned
+
+    def edited_meanwhile(db, rows):
+        with engine.begin() as conn:
+            conn.execute(update(Employee).where(Employee.id == first).values(version=Employee.version + 1))
+        return original(db, rows)
+
+    monkeypatch.setattr(batch, "_update_versioned", edited_meanwhile)
+    response = client.post(URL, params={"atomic": True}, json=[
+        {"op": "update", "id": second, "name": "Não grava"},
+        {"op": "update", "id": first, "name": "Do lote"},
+    ])
+
+    assert response.status_code == 409
+    assert [item["status"] for item in response.json()["results"]] == ["skipped", "error"]
+    assert _row(second)[::2] == ("Lote 1", 1)
+
+def test_atomic_batch_with_error_applies_nothing(client, people):
+    (first, _), (second, _), _ = people
+    response = client.post(URL, params={"atomic": True}, json=[
+        {"op": "delete", "id": first},
+        {"op": "update", "id": second, "name": "x", "version": 9},
+    ])
+
+    assert response.status_code == 409
+    body = response.json()
+    assert body["applied"] is False
+    assert [item["status"] for item in body["results"]] == ["skipped", "error"]
+    assert _row(first).deleted_at is None
+
+def test_over_limit_batch_is_rejected(client):
+    operations = [{"op": "delete", "id": 1}] * (config.API_BATCH_MAX_ITEMS + 1)
+    response = client.post(URL, json=operations)
+    assert response.status_code == 422
+
+def test_unexpected_failure_rolls_back_whole_batch(client, people, monkeypatch):
+    (first, _), (second, _), _ = people
+
+    @contextmanager
+    def broken_index(db):
+        raise RuntimeError("falha no meio do lote")
+        yield
+
+    monkeypatch.setattr(batch, "deferred_search_index", broken_index)
+    with pytest.raises(RuntimeError):
+        client.post(URL, json=[
+            {"op": "delete", "id": first},
+            {"op": "update", "id": second, "name": "Não grava"},
+            {"op": "create", "name": "Não grava", "email": f"falha.{time.time_ns()}@x.com"},
+        ])
+
+    assert _row(first).deleted_at is None
+    assert _row(second)[::2] == ("Lote 1", 1)
@@ -0,0 +1,58 @@
+# tests/test_auth_cache.py
+import time
+
+import pytest
+from sqlalchemy import select
+
+from app.auth import create_access_token, token_cache
+from app.cachesync import CacheSync
+from app.database import SessionLocal
+from app.models import User
+
+# --- Cache de tokens: usuário alterado ou excluído ---
+
+URL = "/api/v1/dashboard"
+
+@pytest.fixture
+def login():
+    """Usuário novo; retorna (username, cabeçalho Authorization)"""
+    username = f"cache{time.time_ns()}"
+    with SessionLocal() as db:
+        db.add(User(username=username, hashed_password="-"))
+        db.commit()
+    return username, "Bearer " + create_access_token({"sub": username})
+
+def _change(username: str, change):
+    with SessionLocal() as db:
+        change(db, db.scalar(select(User).where(User.username == username)))
+        db.commit()
+
+def _rename(db, user):
+    user.username += "-renomeado"
+
+def _remove(db, user):
+    db.delete(user)
+
+@pytest.mark.parametrize("change", [_rename, _remove])
+def test_changed_user_is_not_served_from_cache(client, login, change):
+    username, token = login
+    assert client.get(URL, headers={"Authorization": token}).status_code == 200
+    assert token_cache.get(token) is not None
+
+    _change(username, change)
+
+    assert token_cache.get(token) is None
+    assert client.get(URL, headers={"Authorization": token}).status_code == 401
+
+def test_change_is_published_to_other_workers(login):
+    username, _ = login
+    cleared = []
+    other = CacheSync(interval_ms=0, enabled=True)  # o cache_sync de outro worker
+    other.register("users", lambda: cleared.append(True))
+    other.check()  # primeira leitura: só guarda as versões
+
+    _change(username, _rename)
+    other.check()
+
+    assert cleared == [True]
+    other.close()
@@ -0,0 +1,208 @@
+# tests/test_backends_postgresql.py
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select, text
+
+from app import cachesync
+from app.aggregates import STATS_DELTA_TABLE, STATS_TABLE, _dashboard_query, fold_stats_deltas, rebuild_aggregates
+from app.database import SessionLocal, backend, engine
+from app.importer import _name_map, _resolve
+from app.memberships import add_members_statement
+from app.models import Department, Employee, Project, employee_project_association as membership
+from app.softdelete import restore_statement, soft_delete_statement
+
+# --- Caminhos próprios do PostgreSQL ---
+# COPY para a tabela temporária, INSERT ... ON CONFLICT, LIKE com lower() e
+# as diferenças dos triggers do painel. Só rodam com TEST_DATABASE_URL
+# apontando para um PostgreSQL vazio (ver tests/conftest.py).
+
+pytestmark = pytest.mark.skipif(backend.name != "postgresql", reason="sem PostgreSQL (TEST_DATABASE_URL)")
+
+@pytest.fixture
+def suffix():
+    """Sufixo único para nomes e emails (o banco é compartilhado pelos testes)"""
+    return str(time.time_ns())
+
+def _stats(conn) -> dict:
+    return {
+        (dimension, key): (headcount, payroll_cents)
+        for dimension, key, headcount, payroll_cents in conn.execute(
+            text(f"SELECT dimension, key, headcount, payroll_cents FROM {STATS_TABLE}")
+        )
+    }
+
+def _dashboard(conn) -> dict:
+    """Painel como o load_dashboard lê: tabela-resumo + diferenças pendentes"""
+    return {
+        (dimension, key): (headcount, payroll_cents)
+        for dimension, key, headcount, payroll_cents, _ in conn.execute(_dashboard_query())
+        if headcount > 0
+    }
+
+# --- COPY (bulk_insert) ---
+
+def test_bulk_insert_copy_round_trip(suffix):
+    rows = [
+        {"name": "Tab\tBarra\\N", "email": f"copy0.{suffix}@x.com", "phone": "11\n9\r8", "salary": 1000.5, "department_id": None},
+        {"name": "Nulo", "email": f"copy1.{suffix}@x.com", "phone": None, "salary": None, "department_id": None},
+        {"name": "\\N", "email": f"copy2.{suffix}@x.com", "phone": "", "salary": 0.1, "department_id": None},
+    ]
+    with SessionLocal() as db:
+        assert db.get_bind().dialect.driver in backend.COPY_DRIVERS
+        backend.bulk_insert(db, Employee.__table__, rows[:2])
+        # Segundo lote na mesma transação: a tabela temporária é reaproveitada e esvaziada
+        backend.bulk_insert(db, Employee.__table__, rows[2:])
+        db.commit()
+
+        saved = db.execute(
+            select(Employee.name, Employee.phone, Employee.salary, Employee.version)
+            .where(Employee.email.like(f"copy%.{suffix}@x.com"))
+            .order_by(Employee.email)
+        ).all()
+    assert [tuple(row) for row in saved] == [
+        ("Tab\tBarra\\N", "11\n9\r8", Decimal("1000.50"), 1),
+        ("Nulo", None, None, 1),
+        ("\\N", "", Decimal("0.10"), 1),
+    ]
+
+# --- INSERT ... ON CONFLICT ---
+
+def test_upsert_do_nothing_returns_nothing_on_conflict(suffix):
+    name = f"Upsert {suffix}"
+    query = backend.upsert(Department).values(name=name).on_conflict_do_nothing(
+        index_elements=[Department.name]
+    ).returning(Department.id)
+    with engine.begin() as conn:
+        first = conn.execute(query).scalar()
+        second = conn.execute(query).scalar()
+    assert first is not None
+    assert second is None
+
+def test_bump_version_counts_from_one(suffix):
+    with engine.begin() as conn:
+        versions = [cachesync.bump_version(conn, f"teste {suffix}") for _ in range(3)]
+    assert versions == [1, 2, 3]
+
+def test_resolve_reuses_name_created_meanwhile_and_restores_deleted(suffix):
+    with SessionLocal() as db:
+        gone = Department(name=f"Excluído {suffix}")
+        db.add(gone)
+        db.flush()
+        db.execute(soft_delete_statement(Department, [gone.id]))
+        db.commit()
+
+        cache, deleted = _name_map(db, Department, "name")
+        assert gone.id in deleted
+
+        # Cadastrado por outra conexão depois do mapa montado
+        with engine.begin() as conn:
+            other = conn.execute(
+                Department.__table__.insert().values(name=f"Concorrente {suffix}").returning(Department.id)
+            ).scalar_one()
+
+        assert _resolve(db, cache, deleted, Department, "name", f"Concorrente {suffix}") == other
+        assert _resolve(db, cache, deleted, Department, "name", f"Excluído {suffix}") == gone.id
+        created = _resolve(db, cache, deleted, Department, "name", f"Novo {suffix}")
+        assert created not in (None, other, gone.id)
+        assert _resolve(db, cache, deleted, Department, "name", f"Novo {suffix}") == created
+        db.commit()
+
+        restored = db.scalar(select(Department.deleted_at).where(Department.id == gone.id))
+    assert restored is None
+
+def test_concurrent_add_members_skip_conflict(suffix):
+    """Duas inclusões ao mesmo tempo: a segunda espera a primeira na chave e ignora o conflito"""
+    with SessionLocal() as db:
+        project = Project(name=f"Corrida {suffix}")
+        employee = Employee(name="Corrida", email=f"corrida.{suffix}@x.com")
+        db.add_all([project, employee])
+        db.commit()
+        project_id, employee_id = project.id, employee.id
+
+    results = {}
+    with engine.connect() as first:
+        # Primeira inclusão ainda sem commit: a segunda já passou pelo NOT EXISTS
+        first.execute(membership.insert().values(employee_id=employee_id, project_id=project_id))
+
+        def second():
+            with engine.begin() as conn:
+                results["rowcount"] = conn.execute(add_members_statement(project_id, employee_ids=[employee_id])).rowcount
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        thread.join(0.5)
+        assert thread.is_alive()  # esperando o lock da chave primária
+        first.commit()
+        thread.join(10)
+
+    assert results == {"rowcount": 0}
+
+# --- prefix_match ---
+
+@pytest.mark.parametrize(("prefix", "expected"), [
+    ("ana", ["Ana_Maria", "ana%x", "ANAx"]),
+    ("ANA_", ["Ana_Maria"]),  # '_' é literal, não "qualquer caractere"
+    ("ana%", ["ana%x"]),
+    ("a/b", ["a/b c"]),  # o caractere de escape também é escapado
+    ("", ["Ana_Maria", "ana%x", "ANAx", "a/b c", "abc"]),
+])
+def test_prefix_match_escapes_wildcards(suffix, prefix, expected):
+    names = ["Ana_Maria", "ana%x", "ANAx", "a/b c", "abc"]
+    with engine.connect() as conn:  # desfeito ao fechar
+        conn.execute(Employee.__table__.insert(), [
+            {"name": name, "email": f"prefix{i}.{suffix}@x.com", "salary": 0} for i, name in enumerate(names)
+        ])
+        found = conn.scalars(
+            select(Employee.name)
+            .where(Employee.email.like(f"prefix%.{suffix}@x.com"), backend.prefix_match(Employee.name, prefix))
+        ).all()
+    assert sorted(found) == sorted(expected)
+
+# --- Painel: diferenças dos triggers ---
+
+def test_fold_stats_deltas_matches_rebuild(suffix):
+    with engine.begin() as conn:
+        rebuild_aggregates(conn)
+    with SessionLocal() as db:
+        department = Department(name=f"Painel {suffix}")
+        db.add(department)
+        db.flush()
+        department_id = department.id
+        # INSERT por statement (com COPY), UPDATE por linha, exclusão lógica, restauração e DELETE
+        backend.bulk_insert(db, Employee.__table__, [
+            {"name": f"P{i}", "email": f"fold{i}.{suffix}@x.com", "phone": None,
+             "salary": 1000.1 + i, "department_id": department_id}
+            for i in range(5)
+        ])
+        db.flush()
+        ids = db.scalars(
+            select(Employee.id).where(Employee.email.like(f"fold%.{suffix}@x.com")).order_by(Employee.email)
+        ).all()
+        db.execute(text("UPDATE employees SET salary = 0.3 WHERE id = :id"), {"id": ids[0]})
+        db.execute(text("UPDATE employees SET department_id = NULL WHERE id = :id"), {"id": ids[1]})
+        db.execute(soft_delete_statement(Employee, ids[2:4]))
+        db.execute(restore_statement(Employee, ids[3:4]))
+        db.execute(text("DELETE FROM employees WHERE id = :id"), {"id": ids[4]})
+        db.commit()
+
+    with engine.connect() as conn:
+        assert conn.scalar(text(f"SELECT count(*) FROM {STATS_DELTA_TABLE}")) > 0
+        pending = _dashboard(conn)
+
+    with SessionLocal() as db:
+        fold_stats_deltas(db)
+        db.commit()
+    with engine.connect() as conn:
+        assert conn.scalar(text(f"SELECT count(*) FROM {STATS_DELTA_TABLE}")) == 0
+        folded = _stats(conn)
+    with engine.begin() as conn:
+        rebuild_aggregates(conn)
+        rebuilt = _stats(conn)
+
+    assert folded == rebuilt
+    assert pending == rebuilt
+    # 0,30 + 1.003,10 (o que ficou no departamento, já sem o excluído/apagado)
+    assert rebuilt[("department", department_id)] == (2, 30 + 100310)
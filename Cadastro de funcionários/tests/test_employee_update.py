@@ -0,0 +1,75 @@
+# tests/test_employee_update.py
+import time
+
+import pytest
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models import Employee
+from app.softdelete import soft_delete_statement
+
+# --- PUT /employees/{id} com If-Match (ETag = versão) ---
+
+@pytest.fixture
+def employee():
+    """Funcionário novo, na versão 1; retorna (id, email)"""
+    email = f"edicao.{time.time_ns()}@x.com"
+    with SessionLocal() as db:
+        employee = Employee(name="Edição", email=email)
+        db.add(employee)
+        db.commit()
+        return employee.id, email
+
+def _saved(employee_id: int):
+    with SessionLocal() as db:
+        return db.execute(select(Employee.name, Employee.version).where(Employee.id == employee_id)).one()
+
+def test_matching_if_match_updates_and_returns_new_etag(client, employee):
+    employee_id, email = employee
+    assert client.get(f"/employees/{employee_id}/edit").headers["ETag"] == '"1"'
+
+    response = client.put(f"/employees/{employee_id}", data={"name": "Nova", "email": email}, headers={"If-Match": '"1"'})
+
+    assert response.status_code == 204
+    assert response.headers["ETag"] == '"2"'
+    assert _saved(employee_id) == ("Nova", 2)
+    assert client.get(f"/employees/{employee_id}").headers["ETag"] == '"2"'
+
+def test_stale_if_match_is_conflict(client, employee):
+    employee_id, email = employee
+    client.put(f"/employees/{employee_id}", data={"name": "Primeira", "email": email}, headers={"If-Match": '"1"'})
+
+    # Outra aba ainda com a versão 1
+    response = client.put(f"/employees/{employee_id}", data={"name": "Segunda", "email": email}, headers={"If-Match": 'W/"1"'})
+
+    assert response.status_code == 409
+    assert response.headers["ETag"] == '"2"'
+    assert _saved(employee_id) == ("Primeira", 2)
+
+def test_missing_or_deleted_employee_is_not_found(client, employee):
+    employee_id, email = employee
+    response = client.put("/employees/0", data={"name": "x", "email": "x@x.com"}, headers={"If-Match": '"1"'})
+    assert response.status_code == 404
+
+    with SessionLocal() as db:
+        db.execute(soft_delete_statement(Employee, [employee_id]))
+        db.commit()
+    for headers in ({"If-Match": '"1"'}, {}):
+        response = client.put(f"/employees/{employee_id}", data={"name": "x", "email": email}, headers=headers)
+        assert response.status_code == 404
+
+def test_without_if_match_last_write_wins(client, employee):
+    employee_id, email = employee
+    client.put(f"/employees/{employee_id}", data={"name": "Primeira", "email": email})
+
+    response = client.put(f"/employees/{employee_id}", data={"name": "Segunda", "email": email})
+
+    assert response.status_code == 204
+    assert response.headers["ETag"] == '"3"'
+    assert _saved(employee_id) == ("Segunda", 3)
+
+def test_invalid_if_match_is_bad_request(client, employee):
+    employee_id, email = employee
+    response = client.put(f"/employees/{employee_id}", data={"name": "x", "email": email}, headers={"If-Match": "abc"})
+    assert response.status_code == 400
+    assert _saved(employee_id) == ("Edição", 1)
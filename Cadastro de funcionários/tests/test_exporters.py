@@ -0,0 +1,38 @@
+# tests/test_exporters.py
+import csv
+import io
+import json
+import time
+from decimal import Decimal
+
+import pytest
+
+from app.database import SessionLocal
+from app.exporters import stream_employees
+from app.models import Employee
+
+# --- Exportação: salários exatos e iguais no CSV e no NDJSON ---
+
+SALARIES = [Decimal("10"), Decimal("0.1"), Decimal("1234.5"), Decimal("9999999999.99"), Decimal("0")]
+
+@pytest.fixture(scope="module")
+def exported():
+    """Funcionários com os salários acima; retorna o filtro que os seleciona"""
+    prefix = f"Exporta{time.time_ns()}"
+    with SessionLocal() as db:
+        db.add_all(
+            Employee(name=f"{prefix} {i}", email=f"{prefix.lower()}.{i}@x.com", salary=salary)
+            for i, salary in enumerate(SALARIES)
+        )
+        db.commit()
+    return {"name": prefix}
+
+def _export(export_format: str, filters: dict) -> str:
+    return b"".join(stream_employees(export_format, filters, chunk_size=2)).decode("utf-8")
+
+def test_csv_and_ndjson_salaries_match(exported):
+    csv_salaries = [row["Salário"] for row in csv.DictReader(io.StringIO(_export("csv", exported)))]
+    ndjson_salaries = [json.loads(line)["salary"] for line in _export("ndjson", exported).splitlines()]
+
+    assert csv_salaries == ["10.00", "0.10", "1234.50", "9999999999.99", "0.00"]
+    assert ndjson_salaries == ["10.00", "0.10", "1234.50", "9999999999.99", "0.00"]
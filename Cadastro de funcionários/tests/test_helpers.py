@@ -0,0 +1,127 @@
+# tests/test_helpers.py
+from decimal import Decimal
+
+import pytest
+
+from app.helpers import (
+    format_brl_price, format_brl_prices, parse_brl_decimal, parse_brl_price, parse_brl_prices, to_money,
+)
+
+class _Cell:
+    """Objeto que não é str (célula de planilha, por exemplo): passa pelo caminho lento"""
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+# --- parse_brl_price ---
+
+@pytest.mark.parametrize("text, expected", [
+    ("R$ 1.234,50", 1234.5),
+    ("  R$ 1.234,50  ", 1234.5),
+    ("R$\u00a01.234,50", 1234.5),  # espaço não separável (Excel)
+    ("1234,5", 1234.5),
+    ("1234.50", 123450.0),  # o ponto é sempre separador de milhar
+    ("R$ 0,00", 0.0),
+    ("R$ 12.345.678,90", 12345678.9),
+])
+def test_parse_brl_price_fast_and_slow_path_agree(text, expected):
+    assert parse_brl_price(text) == expected
+    assert parse_brl_price(_Cell(text)) == expected
+
+@pytest.mark.parametrize("text", ["", " ", "R$", "abc", "1,2,3", "R$ 12,345,678", "12 34"])
+def test_parse_brl_price_malformed_is_zero(text):
+    assert parse_brl_price(text) == 0.0
+    assert parse_brl_price(_Cell(text)) == 0.0
+
+@pytest.mark.parametrize("text, expected", [
+    ("R$ -12,00", -12.0),
+    ("R$ -1.234,50", -1234.5),
+    ("-0,01", -0.01),
+    ("-R$ 1.234,50", 0.0),  # sinal antes do R$ vira '- 1234.50': não é número, como sempre foi
+])
+def test_parse_brl_price_negative(text, expected):
+    assert parse_brl_price(text) == expected
+    assert parse_brl_price(_Cell(text)) == expected
+
+@pytest.mark.parametrize("value, expected", [
+    (None, 0.0), (0, 0.0), (12, 12.0), (-3.25, -3.25), (Decimal("1234.56"), 1234.56),
+])
+def test_parse_brl_price_numbers(value, expected):
+    assert parse_brl_price(value) == expected
+
+def test_parse_brl_prices_matches_single_calls():
+    values = ["R$ 1.234,50", "abc", None, 12, "-R$ 1,00", _Cell("R$ 2,00"), Decimal("3.5")]
+    assert parse_brl_prices(values) == [parse_brl_price(value) for value in values]
+    assert parse_brl_prices(iter(values)) == parse_brl_prices(values)
+    assert parse_brl_prices([]) == []
+
+# --- to_money / parse_brl_decimal ---
+
+@pytest.mark.parametrize("value, expected", [
+    (0.1, "0.10"),
+    (0.005, "0.01"),
+    (2.675, "2.68"),  # em binário é 2.67499..., mas o repr é 2.675
+    (-2.675, "-2.68"),  # meio para cima em valor absoluto
+    ("1.005", "1.01"),
+    (1, "1.00"),
+    (Decimal("1234.5"), "1234.50"),
+    ("nan", "0.00"),
+    (float("inf"), "0.00"),
+    ("x", "0.00"),
+    ("1e999999999", "0.00"),
+])
+def test_to_money_rounding(value, expected):
+    assert to_money(value) == Decimal(expected)
+    assert str(to_money(value)) == expected
+
+def test_to_money_none_is_none():
+    assert to_money(None) is None
+
+@pytest.mark.parametrize("text, expected", [
+    ("R$ 1.234,505", "1234.51"),
+    ("R$ 1.234,504", "1234.50"),
+    ("  R$ 0,1 ", "0.10"),
+    ("R$ -1.234,50", "-1234.50"),
+    ("-R$ 1.234,50", "0.00"),
+    ("R$ -0,005", "-0.01"),
+    ("abc", "0.00"),
+    ("", "0.00"),
+    (None, "0.00"),
+    (12.5, "12.50"),
+])
+def test_parse_brl_decimal(text, expected):
+    assert parse_brl_decimal(text) == Decimal(expected)
+
+def test_parse_brl_decimal_sums_exactly():
+    assert parse_brl_decimal("0,1") + parse_brl_decimal("0,2") == Decimal("0.30")
+    assert parse_brl_price("0,1") + parse_brl_price("0,2") != 0.3
+
+# --- format_brl_price ---
+
+@pytest.mark.parametrize("value, expected", [
+    (1234.5, "R$ 1.234,50"),
+    (0, "R$ 0,00"),
+    (None, "R$ 0,00"),
+    (-1234.5, "R$ -1.234,50"),
+    (1234567.891, "R$ 1.234.567,89"),
+    (0.125, "R$ 0,12"),  # float: arredondamento do format(), meio para o par
+    (Decimal("1234567.89"), "R$ 1.234.567,89"),
+    (Decimal("0.125"), "R$ 0,12"),
+    ("abc", "R$ 0,00"),
+])
+def test_format_brl_price(value, expected):
+    assert format_brl_price(value) == expected
+
+def test_format_and_parse_round_trip():
+    for value in (0.0, 0.01, 999.99, 1234.5, -1234.5, 12345678.9):
+        assert parse_brl_price(format_brl_price(value)) == value
+        assert parse_brl_decimal(format_brl_price(value)) == to_money(value)
+
+def test_format_brl_prices_matches_single_calls():
+    values = [1234.5, None, -1, Decimal("0.5"), "abc"]
+    assert format_brl_prices(values) == [format_brl_price(value) for value in values]
+    assert format_brl_prices(iter(values)) == format_brl_prices(values)
+    assert format_brl_prices([]) == []
@@ -0,0 +1,79 @@
+# tests/test_importer.py
+import io
+import time
+
+import pytest
+from openpyxl import Workbook
+from sqlalchemy import event, select
+
+from app.database import SessionLocal, engine
+from app.importer import import_employees_xlsx
+from app.models import Department, Employee
+from app.softdelete import soft_delete_statement
+
+# --- Importação de planilha: emails repetidos ---
+
+def _xlsx(rows) -> io.BytesIO:
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Nome", "Email", "Salário", "Departamento"])
+    for row in rows:
+        sheet.append(row)
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+    return file
+
+@pytest.fixture
+def registered():
+    """Um funcionário ativo e um excluído (ainda não apagado); retorna (sufixo, emails)"""
+    suffix = time.time_ns()
+    emails = [f"ativo.{suffix}@x.com", f"excluido.{suffix}@x.com"]
+    with SessionLocal() as db:
+        employees = [Employee(name="Cadastrado", email=email) for email in emails]
+        db.add_all(employees)
+        db.flush()
+        db.execute(soft_delete_statement(Employee, [employees[1].id]))
+        db.commit()
+    return suffix, emails
+
+def test_duplicate_emails_are_skipped_per_batch(registered):
+    suffix, (active, deleted) = registered
+    new = [f"novo{i}.{suffix}@x.com" for i in range(3)]
+    file = _xlsx([
+        ["Novo 0", new[0], "R$ 10,00", None],
+        ["Repetido", active, None, f"Recusado {suffix}"],
+        ["Novo 1", new[1], None, f"Aceito {suffix}"],
+        ["Excluído", deleted, None, None],
+        ["Novo 0 de novo", new[0], None, None],  # repetido na própria planilha
+        ["Novo 2", new[2], None, None],
+    ])
+
+    with SessionLocal() as db:
+        report = import_employees_xlsx(db, file, batch_size=2)
+
+    assert (report["imported"], report["skipped"]) == (3, 3)
+    assert [error["row"] for error in report["errors"]] == [3, 5, 6]
+    assert all("já cadastrado" in error["error"] for error in report["errors"])
+    with SessionLocal() as db:
+        assert sorted(db.scalars(select(Employee.email).where(Employee.email.in_(new)))) == new
+        departments = db.scalars(select(Department.name).where(Department.name.like(f"% {suffix}"))).all()
+    assert departments == [f"Aceito {suffix}"]
+
+def test_existing_emails_are_not_loaded_all_at_once(registered):
+    suffix, _ = registered
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "employees.email" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with SessionLocal() as db:
+            import_employees_xlsx(db, _xlsx([["Lote", f"lote.{suffix}@x.com", None, None]]))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert statements
+    assert all(" IN " in statement.upper() for statement in statements)
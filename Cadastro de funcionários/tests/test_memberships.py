@@ -0,0 +1,50 @@
+# tests/test_memberships.py
+import time
+
+import pytest
+
+from app.database import SessionLocal
+from app.memberships import add_members_statement, member_count_statement, remove_members_statement
+from app.models import Department, Employee, Project
+
+# --- Membros de projeto em lote ---
+
+@pytest.fixture
+def team():
+    """Projeto vazio e um departamento com três funcionários; retorna (projeto, departamento, ids)"""
+    suffix = time.time_ns()
+    with SessionLocal() as db:
+        project = Project(name=f"Projeto {suffix}")
+        department = Department(name=f"Equipe {suffix}")
+        employees = [Employee(name=f"Membro {i}", email=f"membro{i}.{suffix}@x.com", department=department) for i in range(3)]
+        db.add_all([project, *employees])
+        db.commit()
+        return project.id, department.id, [employee.id for employee in employees]
+
+def test_add_members_counts_only_new_members(team):
+    project_id, department_id, ids = team
+    with SessionLocal() as db:
+        assert db.execute(add_members_statement(project_id, employee_ids=ids[:2] + [0])).rowcount == 2
+        # Departamento inteiro: dois já eram membros
+        assert db.execute(add_members_statement(project_id, filters={"department_id": department_id})).rowcount == 1
+        assert db.execute(add_members_statement(project_id, employee_ids=ids)).rowcount == 0
+        assert db.scalar(member_count_statement(project_id)) == 3
+
+        assert db.execute(remove_members_statement(project_id, employee_ids=ids[:1])).rowcount == 1
+        assert db.scalar(member_count_statement(project_id)) == 2
+        db.commit()
+
+def test_add_members_api(client, team):
+    project_id, department_id, ids = team
+    url = f"/api/v1/projects/{project_id}/members"
+
+    response = client.post(url, json={"action": "add", "employee_ids": ids[:1]})
+    assert response.json() == {"project_id": project_id, "action": "add", "changed": 1, "members": 1}
+    response = client.post(url, json={"action": "add", "filter": {"department_id": department_id}})
+    assert response.json()["changed"] == 2
+    response = client.post(url, json={"action": "add", "filter": {"department_id": department_id}})
+    assert (response.status_code, response.json()["changed"], response.json()["members"]) == (200, 0, 3)
+
+    with SessionLocal() as db:
+        project = db.get(Project, project_id)
+        assert sorted(employee.id for employee in project.employees) == ids
@@ -0,0 +1,94 @@
+# tests/test_query_plans.py
+import asyncio
+import time
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.database import SessionLocal, SyncSessionAdapter, backend, engine
+from app.listing import EmployeeListing
+from app.models import Department, Employee, Position
+from app.routers.projects import load_candidates
+from app.softdelete import purge_deleted
+
+# --- Índices usados pelas consultas reais ---
+# As consultas saem do próprio código (listagem, filtros, seletor de membros
+# dos projetos, limpeza), com o "deleted_at IS NULL" que o ORM acrescenta;
+# o SQL capturado a caminho do banco passa pelo EXPLAIN QUERY PLAN.
+# (O 'python -m app.migrations check' confere o mesmo num banco de produção.)
+
+pytestmark = pytest.mark.skipif(backend.name != "sqlite", reason="planos do SQLite")
+
+@contextmanager
+def captured_selects():
+    """SELECTs (SQL e parâmetros) executados pelo engine dentro do bloco"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+def query_plan(statement: str, parameters) -> str:
+    with engine.connect() as conn:
+        return " | ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+
+@pytest.fixture(scope="module")
+def employee_id():
+    """Alguns funcionários para as consultas terem o que percorrer"""
+    suffix = time.time_ns()
+    with SessionLocal() as db:
+        department = Department(name=f"Planos {suffix}")
+        position = Position(title=f"Planos {suffix}")
+        employees = [
+            Employee(name=name, email=f"{name.lower()}.{suffix}@x.com", department=department, position=position)
+            for name in ("Ana", "Bruno", "Carla", "Diego")
+        ]
+        db.add_all(employees)
+        db.commit()
+        return employees[0].id
+
+@pytest.mark.parametrize(
+    ("filters", "after", "index"),
+    [
+        ({}, None, "ix_employees_active"),
+        ({}, 100, "ix_employees_active"),
+        ({"department_id": 1}, 100, "ix_employees_department_id"),
+        ({"position_id": 1}, None, "ix_employees_position_id"),
+        ({"name": "Ana"}, None, "ix_employees_name"),
+    ],
+)
+def test_listing_uses_index(employee_id, filters, after, index):
+    with captured_selects() as statements:
+        list(EmployeeListing(filters, after=after))
+    assert index in query_plan(*statements[-1])
+
+@pytest.mark.parametrize("q", [None, "an"])
+@pytest.mark.parametrize("after", [False, True])
+def test_project_candidates_use_name_index(employee_id, q, after):
+    async def load():
+        with SessionLocal() as db:
+            return await load_candidates(SyncSessionAdapter(db), 1, q, employee_id if after else None, 20)
+
+    with captured_selects() as statements:
+        asyncio.run(load())
+    plan = query_plan(*statements[-1])
+    assert "ix_employees_name" in plan
+    assert "TEMP B-TREE" not in plan  # já sai na ordem do índice
+
+def test_purge_uses_deleted_at_index():
+    with captured_selects() as statements:
+        purge_deleted(engine, batch_size=1000)
+    # Próximo lote da fila de limpeza: SELECT employees.id ... WHERE deleted_at IS NOT NULL LIMIT ?
+    pending = [
+        statement for statement in statements
+        if "FROM employees" in statement[0] and "deleted_at IS NOT NULL" in statement[0] and "LIMIT" in statement[0]
+    ]
+    assert pending
+    assert "ix_employees_deleted_at" in query_plan(*pending[0])
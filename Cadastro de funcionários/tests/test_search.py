@@ -0,0 +1,79 @@
+# tests/test_search.py
+import html
+import re
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app.database import SessionLocal, engine
+from app.models import Employee
+
+# --- Busca textual: paginação por cursor (rank, id) ---
+
+URL = "/employees/search"
+
+@pytest.fixture(scope="module")
+def found():
+    """Sete funcionários com o mesmo termo (ranks empatados e diferentes); retorna (termo, emails)"""
+    term = f"Busca{time.time_ns()}"
+    people = [(term, f"nome{i}.{term}@x.com".lower()) for i in range(4)]  # termo no nome (e no email)
+    people += [("Outro", f"{term}.{i}@x.com".lower()) for i in range(3)]  # termo só no email
+    with SessionLocal() as db:
+        db.add_all([Employee(name=name, email=email) for name, email in people])
+        db.commit()
+    return term, {email for _, email in people}
+
+def _page(client, url: str, term: str) -> tuple[list[str], str | None, str | None]:
+    """(emails na ordem da página, link da próxima, link da anterior)"""
+    response = client.get(url)
+    assert response.status_code == 200
+    text = response.text
+    emails = re.findall(rf"[\w.]*{term.lower()}[\w.]*@x\.com", text)
+    links = {
+        label: html.unescape(href)
+        for href, label in re.findall(r'<a href="([^"]+)" class="button-new">[^<]*?(Anteriores|Próximos)', text)
+    }
+    return list(dict.fromkeys(emails)), links.get("Próximos"), links.get("Anteriores")
+
+def test_pages_cover_every_result_once_in_rank_order(client, found):
+    term, emails = found
+    everything, next_url, prev_url = _page(client, f"{URL}?q={term}&limit=100", term)
+    assert set(everything) == emails
+    assert (next_url, prev_url) == (None, None)
+
+    pages, url = [], f"{URL}?q={term}&limit=3"
+    while url:
+        page, url, prev_url = _page(client, url, term)
+        assert (prev_url is None) == (not pages)
+        pages.append(page)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == everything
+
+    # E de volta, pelos links "Anteriores"
+    back = []
+    while prev_url:
+        page, _, prev_url = _page(client, prev_url, term)
+        back.append(page)
+    assert back == pages[-2::-1]
+
+def test_search_does_not_use_offset(client, found):
+    term, _ = found
+    _, next_url, _ = _page(client, f"{URL}?q={term}&limit=2", term)
+    offsets = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # O SQLite sempre escreve 'LIMIT ? OFFSET ?' (o OFFSET é o último parâmetro)
+        if "OFFSET" in statement.upper():
+            offsets.append(parameters[-1])
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        _page(client, next_url, term)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert all(offset == 0 for offset in offsets)
+
+@pytest.mark.parametrize("cursor", ["x", "1.5", "nan:3", "1.5:x"])
+def test_invalid_cursor_is_bad_request(client, cursor):
+    assert client.get(URL, params={"q": "ana", "after": cursor}).status_code == 400
@@ -0,0 +1,91 @@
+# tests/test_softdelete.py
+import time
+
+import pytest
+from sqlalchemy import select
+
+from app.database import SessionLocal, engine
+from app.models import Department, Employee, Project, employee_project_association as membership
+from app.softdelete import purge_deleted
+
+# --- Exclusão lógica: o filtro global e a limpeza ---
+
+@pytest.fixture
+def staff():
+    """Departamento com dois funcionários ('Oculto<sufixo> 0/1'); retorna (sufixo, departamento, ids)"""
+    suffix = time.time_ns()
+    with SessionLocal() as db:
+        department = Department(name=f"Oculto {suffix}")
+        employees = [
+            Employee(name=f"Oculto{suffix} {i}", email=f"oculto{i}.{suffix}@x.com", salary=1000, department=department)
+            for i in range(2)
+        ]
+        db.add_all(employees)
+        db.commit()
+        return suffix, department.id, [employee.id for employee in employees]
+
+def _headcount(client, department_id: int) -> int:
+    departments = client.get("/api/v1/dashboard").json()["departments"]
+    return next((group["headcount"] for group in departments if group["key"] == department_id), 0)
+
+def test_deleted_employee_is_hidden_everywhere(client, staff):
+    suffix, department_id, (kept, gone) = staff
+    kept_email, gone_email = f"oculto0.{suffix}@x.com", f"oculto1.{suffix}@x.com"
+    assert _headcount(client, department_id) == 2
+
+    assert client.delete(f"/employees/{gone}").status_code == 204
+
+    pages = {
+        "listagem": client.get("/employees", params={"name": f"Oculto{suffix}"}).text,
+        "busca": client.get("/employees/search", params={"q": f"Oculto{suffix}"}).text,
+        "exportação": client.get("/employees/export", params={"format": "csv", "name": f"Oculto{suffix}"}).text,
+    }
+    for name, page in pages.items():
+        assert kept_email in page, name
+        assert gone_email not in page, name
+    assert client.get(f"/employees/{gone}").status_code == 404
+    assert _headcount(client, department_id) == 1
+    with SessionLocal() as db:
+        assert db.get(Employee, gone) is None
+        assert db.scalar(
+            select(Employee.deleted_at).where(Employee.id == gone).execution_options(include_deleted=True)
+        ) is not None
+
+def test_recreating_deleted_department_restores_it(client):
+    name = f"Restaurado {time.time_ns()}"
+    client.post("/departments", data={"name": name})
+    with SessionLocal() as db:
+        department_id = db.scalar(select(Department.id).where(Department.name == name))
+
+    client.delete(f"/departments/{department_id}")
+    assert name not in client.get("/departments").text
+    client.post("/departments", data={"name": name})
+
+    with SessionLocal() as db:
+        restored = db.scalars(
+            select(Department).where(Department.name == name).execution_options(include_deleted=True)
+        ).all()
+        assert [(department.id, department.deleted_at) for department in restored] == [(department_id, None)]
+    assert name in client.get("/departments").text
+
+def test_purge_detaches_employees_and_removes_memberships(client, staff):
+    suffix, department_id, (kept, gone) = staff
+    with SessionLocal() as db:
+        project = Project(name=f"Limpeza {suffix}")
+        project.employees = [db.get(Employee, kept), db.get(Employee, gone)]
+        db.add(project)
+        db.commit()
+        project_id = project.id
+
+    client.delete(f"/employees/{gone}")
+    client.delete(f"/departments/{department_id}")
+    report = purge_deleted(engine, batch_size=1)
+
+    assert report["employees"] >= 1 and report["memberships"] >= 1 and report["detached"] >= 1
+    with engine.connect() as conn:
+        assert conn.scalar(select(Employee.id).where(Employee.id == gone)) is None
+        assert conn.scalar(select(Department.id).where(Department.id == department_id)) is None
+        assert conn.scalar(select(Employee.department_id).where(Employee.id == kept)) is None
+        assert conn.execute(
+            select(membership.c.employee_id).where(membership.c.project_id == project_id)
+        ).scalars().all() == [kept]